@@ -0,0 +1,84 @@
+"""
+HomeCare Management System - Export Memory Benchmark
+Professional Care Coordination Platform
+
+Streams care action exports in each format from databases of increasing
+size and reports rows per second and the peak Python memory allocated
+while streaming, which should not grow with the row count.
+
+    python benchmarks/export_memory.py [--rows 20000 200000]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def seed(app, rows):
+    """Insert care actions spread over five years with one Core statement per batch"""
+    from models import db, CareAction, CareTask, Client, User
+    with app.app_context():
+        client = Client.query.filter_by(name='Benchmark Client').first()
+        if client is None:
+            client = Client(name='Benchmark Client', status='active')
+            db.session.add(client)
+            db.session.commit()
+        user = User.query.filter_by(username='Jess').one()
+        task = CareTask.query.first()
+        now, today = datetime.now(), date.today()
+        for start in range(0, rows, 10000):
+            db.session.execute(db.insert(CareAction), [{
+                'client_id': client.id, 'performed_by_id': user.id, 'task_id': task.id,
+                'task_name': task.name, 'task_category': task.category,
+                'action_date': today - timedelta(days=index % 1826), 'notes': 'Benchmark visit',
+                'status': 'completed', 'priority': 'normal', 'created_at': now, 'updated_at': now
+            } for index in range(start, min(start + 10000, rows))])
+        db.session.commit()
+        return user.id
+
+def stream(app, user_id, export_format):
+    """Download one export; return (rows per second, MB sent, peak MB allocated)"""
+    client = app.test_client()
+    with client.session_transaction(base_url='https://localhost') as session:
+        session['_user_id'] = str(user_id)
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(f'/export/care_actions.{export_format}?include_archived=1', base_url='https://localhost')
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, size / 1e6, peak / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[20000, 200000])
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    print(f'{"rows":>10}{"format":>8}{"seconds":>10}{"MB sent":>10}{"peak MB":>10}')
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'homecare.db')}"
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'bootstrap'],
+                       cwd=ROOT, env=os.environ, check=True, capture_output=True)
+        from app import create_app
+        app = create_app('production')
+        seeded = 0
+        for rows in sorted(args.rows):
+            # The database grows to each size in turn
+            user_id = seed(app, rows - seeded)
+            seeded = rows
+            for export_format in ('csv', 'ndjson', 'excel'):
+                # tracemalloc slows Python down several times; compare seconds between runs only
+                elapsed, sent, peak = stream(app, user_id, export_format)
+                print(f'{rows:>10}{export_format:>8}{elapsed:>10.1f}{sent:>10.1f}{peak:>10.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+HomeCare Management System - SQLite Concurrency Benchmark
+Professional Care Coordination Platform
+
+Submits quick_log forms from several worker processes (each with several
+threads, like gunicorn gthread workers) against one SQLite file, with the
+connection tuning off and on, and reports write throughput and failures.
+
+    python benchmarks/sqlite_concurrency.py [--workers 4] [--threads 4] [--requests 50]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETUP = '''
+from app import create_app
+from models import db, Client, User, CareTask
+app = create_app('production')
+with app.app_context():
+    client = Client(name='Benchmark Client', status='active')
+    db.session.add(client)
+    db.session.commit()
+    user = User.query.filter_by(username='Jess').one()
+    tasks = [task.id for task in CareTask.query.limit(3)]
+    print(client.id, user.id, ','.join(map(str, tasks)))
+'''
+
+WORKER = '''
+import json, threading, time
+from app import create_app
+app = create_app('production')
+client_id, user_id, task_ids = {client_id}, {user_id}, {task_ids!r}
+results = []
+
+def submit():
+    client = app.test_client()
+    with client.session_transaction(base_url='https://localhost') as session:
+        session['_user_id'] = str(user_id)
+    for _ in range({requests}):
+        start = time.perf_counter()
+        response = client.post('/actions/quick-log', base_url='https://localhost', data={{
+            'client_id': client_id, 'task_ids': task_ids, 'action_date': '2025-01-15',
+            'action_time': '09:30', 'notes': 'Benchmark visit'
+        }})
+        logged = response.status_code == 302 and 'quick-log' not in response.headers['Location']
+        results.append((logged, time.perf_counter() - start))
+
+threads = [threading.Thread(target=submit) for _ in range({threads})]
+time.sleep(max(0, {start_at} - time.time()))
+started = time.perf_counter()
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+print(json.dumps({{'elapsed': time.perf_counter() - started,
+                  'ok': sum(1 for ok, _ in results if ok),
+                  'failed': sum(1 for ok, _ in results if not ok),
+                  'latencies': [seconds for ok, seconds in results if ok]}}))
+'''
+
+def run(env, args, setup):
+    """Run the workers at once; return requests per second, failures and p95 latency"""
+    client_id, user_id, task_ids = setup
+    code = WORKER.format(client_id=client_id, user_id=user_id, task_ids=task_ids, threads=args.threads,
+                         requests=args.requests, start_at=time.time() + 3)
+    processes = [subprocess.Popen([sys.executable, '-c', code], cwd=ROOT, env=env,
+                                  stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+                 for _ in range(args.workers)]
+    outputs = [json.loads(process.communicate()[0].strip().splitlines()[-1]) for process in processes]
+    elapsed = max(output['elapsed'] for output in outputs)
+    ok = sum(output['ok'] for output in outputs)
+    failed = sum(output['failed'] for output in outputs)
+    latencies = sorted(seconds for output in outputs for seconds in output['latencies'])
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    return ok / elapsed, failed, p95
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=50, help='quick_log submissions per thread')
+    args = parser.parse_args()
+
+    total = args.workers * args.threads * args.requests
+    print(f'{args.workers} worker(s) x {args.threads} thread(s) x {args.requests} quick_log '
+          f'submissions = {total} (3 care actions each)')
+    print(f'{"SQLite connections":<22}{"req/s":>10}{"failed":>10}{"p95 ms":>10}')
+    for label, tuning in (('default', 'false'), ('tuned (WAL)', 'true')):
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, SQLITE_TUNING=tuning,
+                       DATABASE_URL=f"sqlite:///{os.path.join(directory, 'homecare.db')}")
+            subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'bootstrap'],
+                           cwd=ROOT, env=env, check=True, capture_output=True)
+            output = subprocess.run([sys.executable, '-c', SETUP], cwd=ROOT, env=env, check=True,
+                                    capture_output=True, text=True).stdout
+            client_id, user_id, task_ids = output.strip().splitlines()[-1].split()
+            throughput, failed, p95 = run(env, args, (int(client_id), int(user_id), task_ids))
+        print(f'{label:<22}{throughput:>10.1f}{failed:>10}{p95 * 1000:>10.1f}')
+
+if __name__ == '__main__':
+    main()
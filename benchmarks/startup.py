@@ -0,0 +1,64 @@
+"""
+HomeCare Management System - Startup Benchmark
+Professional Care Coordination Platform
+
+Measures cold boot time of create_app() in fresh interpreters against an
+already-bootstrapped SQLite database, with and without the schema creation
+and seeding queries that create_app used to run on every start.
+
+    python benchmarks/startup.py [--runs 10]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT = '''
+import time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+if {legacy}:
+    # What create_app did on every start before flask bootstrap existed
+    from models import db, User, CareTask, DEFAULT_CARE_TASKS
+    with app.app_context():
+        db.create_all()
+        for task in DEFAULT_CARE_TASKS:
+            CareTask.query.filter_by(name=task['name']).first()
+        User.query.count()
+finished = time.perf_counter()
+print(imported - start, finished - imported)
+'''
+
+def boot_time(env, legacy):
+    """Run one cold boot in a fresh interpreter; return import and factory seconds"""
+    output = subprocess.run([sys.executable, '-c', BOOT.format(legacy=legacy)],
+                            cwd=ROOT, env=env, check=True, capture_output=True, text=True).stdout
+    return [float(value) for value in output.strip().splitlines()[-1].split()]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'homecare.db')}")
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'bootstrap'],
+                       cwd=ROOT, env=env, check=True, capture_output=True)
+
+        print(f'{"create_app":<28}{"import ms":>12}{"factory ms":>12}{"total ms":>12}')
+        for label, legacy in (('with schema/seed (before)', True), ('bootstrapped (after)', False)):
+            runs = [boot_time(env, legacy) for _ in range(args.runs)]
+            imports = statistics.median(run[0] for run in runs) * 1000
+            factory = statistics.median(run[1] for run in runs) * 1000
+            total = statistics.median(sum(run) for run in runs) * 1000
+            print(f'{label:<28}{imports:>12.1f}{factory:>12.1f}{total:>12.1f}')
+
+if __name__ == '__main__':
+    main()
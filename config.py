@@ -4,6 +4,8 @@ from dotenv import load_dotenv
 basedir = os.path.abspath(os.path.dirname(__file__))
 load_dotenv()
 
+cpu_count = os.cpu_count() or 1
+
 class Config:
     """Base configuration"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
@@ -13,8 +15,153 @@ class Config:
     GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY') or ''
     DEBUG = os.environ.get('DEBUG', 'True').lower() == 'true'
     
+    # Blueprints to register; None registers all of them. A worker serving
+    # only part of the app can skip importing the rest.
+    BLUEPRINTS = None
+    
     # Pagination
     ACTIONS_PER_PAGE = 50
+    PAGINATION_TOTAL = 'exact'  # exact, approximate, none; overridable with ?total=
+    PAGINATION_TOTALS = {
+        'actions.list_actions': 'approximate',
+        'clients.client_actions': 'approximate'
+    }
+    PAGINATION_COUNT_LIMIT = 1000  # rows counted before an approximate total stops
+    BULK_INGEST_MAX_ROWS = 1000  # rows accepted by the JSON batch endpoints
+    
+    # JSON API (/api/v1) for the field client
+    API_PAGE_SIZE = 100
+    API_MAX_PAGE_SIZE = 500
+    API_BATCH_MAX_IDS = 200
+    
+    # Data export: rows fetched per server-side cursor batch and per streamed chunk
+    EXPORT_BATCH_SIZE = 1000
+    
+    # Vitals trends (/api/vitals-trends)
+    VITALS_TREND_DAYS = 90  # days of assessments analysed by default
+    VITALS_ROLLING_WINDOW = 3  # assessments per rolling mean
+    VITALS_SPARKLINE_POINTS = 12  # latest readings returned per metric
+    
+    # Early-warning scores (/api/at-risk), kept current on commit; run
+    # "flask risk rescore" daily so readings and incidents age out
+    RISK_ASSESSMENT_DAYS = 30  # days a reading still counts towards the score
+    RISK_INCIDENT_DAYS = 14  # days an incident's severity counts
+    RISK_LIST_LIMIT = 20  # clients returned by default
+    
+    # Care plan schedules: recurring care plan tasks become scheduled tasks for
+    # a rolling horizon; run "flask schedule materialize" daily to extend it
+    SCHEDULE_HORIZON_DAYS = 14
+    SCHEDULE_PREVIEW_MAX_DAYS = 92  # longest window /tasks/occurrences expands
+    SCHEDULE_BATCH_SIZE = 1000  # generated tasks per insert statement
+    
+    # Route planning (/tasks/route): straight-line distances between clients,
+    # stretched by ROUTE_DETOUR_FACTOR for roads and driven at ROUTE_SPEED_KMH
+    ROUTE_SPEED_KMH = 30
+    ROUTE_DETOUR_FACTOR = 1.3
+    ROUTE_DAY_START = '08:00'
+    ROUTE_DAY_END = '20:00'
+    ROUTE_TIME_WINDOW_MINUTES = 30  # a timed visit may start this long before or after its time
+    ROUTE_VISIT_MINUTES = 30  # visit length when no care plan task gives one
+    ROUTE_TIME_BUDGET = 0.5  # seconds of route improvement per request
+    
+    # Visit assignment (/tasks/assignments): every visit/caregiver pair costs
+    # the travel minutes from the caregiver's usual area, plus these minutes
+    # for each missed client preference, less the bonus for a regular client
+    ASSIGNMENT_CAREGIVER_ROLES = ('caregiver',)
+    ASSIGNMENT_DAILY_MINUTES = 480  # visit minutes a caregiver may be given per day
+    ASSIGNMENT_HISTORY_DAYS = 28  # visits that set a caregiver's area and regular clients
+    ASSIGNMENT_GENDER_PENALTY = 60
+    ASSIGNMENT_LANGUAGE_PENALTY = 45
+    ASSIGNMENT_CONTINUITY_BONUS = 20
+    ASSIGNMENT_UNASSIGNED_COST = 1000  # per normal priority visit left without a caregiver
+    ASSIGNMENT_TIME_BUDGET = 2.0  # seconds of solving per proposal
+    # Task name or category -> skills or certifications a caregiver needs one of
+    ASSIGNMENT_REQUIRED_SKILLS = {
+        'Medication Administration': ('Medication Administration', 'CNA', 'LPN', 'RN'),
+        'Specialized Care': ('CNA', 'LPN', 'RN')
+    }
+    
+    # Background jobs: a queue kept in the jobs table, worked by threads in each
+    # web process; set JOB_WORKER_THREADS=0 when "flask jobs work" runs separately,
+    # as the Procfile web entry does for its worker process
+    JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', 2))
+    JOB_POLL_INTERVAL = 5  # seconds idle workers wait before looking for queued jobs
+    JOB_PROGRESS_INTERVAL = 2  # seconds between progress writes of a running job
+    JOB_HEARTBEAT_INTERVAL = 30  # seconds between heartbeats and sweeps
+    JOB_STALE_AFTER = 300  # running jobs without a heartbeat for this long are requeued
+    JOB_MAX_ATTEMPTS = 2
+    JOB_RESULTS_DIR = os.environ.get('JOB_RESULTS_DIR')  # default: <instance>/job_results
+    JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL', 86400))  # seconds results stay downloadable
+    JOB_DAILY_KINDS = ('risk_rescore',)  # queued once a day by the job supervisor
+    
+    # HTTP caching: views with validators answer 304 to a matching
+    # If-None-Match. Cache-Control for those views, with per-endpoint overrides.
+    HTTP_CACHE_CONTROL = 'private, no-cache'
+    HTTP_CACHE_CONTROLS = {
+        'main.api_stats': 'private, max-age=15',
+        'main.api_cache_stats': 'no-store',
+        'main.api_pool_stats': 'no-store',
+        'main.download_export': 'private, no-store',
+        'jobs.list_jobs': 'no-store',
+        'jobs.job_status': 'no-store',
+        'jobs.download_job': 'private, no-store',
+        'auth.login': 'no-store'
+    }
+    
+    # Snapshot caching
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'local'  # local, redis
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL') or 'redis://localhost:6379/0'
+    CACHE_MAX_ENTRIES = 128
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 60))  # seconds
+    REFERENCE_CACHE_TTL = int(os.environ.get('REFERENCE_CACHE_TTL', 300))  # seconds
+    
+    # Warn at startup when the schema is behind; run "flask bootstrap" to migrate
+    SCHEMA_CHECK_ON_STARTUP = True
+    
+    # Serving: gunicorn workers and threads per worker (see gunicorn.conf.py)
+    WEB_WORKERS = int(os.environ.get('WEB_CONCURRENCY', cpu_count * 2 + 1))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', min(8, max(2, cpu_count))))
+    
+    # Connection pool per worker; every thread can hold a connection, and
+    # overflow absorbs bursts such as shift-change logging
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', WEB_THREADS))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', WEB_THREADS))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))  # seconds to wait for a connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # seconds before reconnecting
+    DB_POOL_PRE_PING = True
+    DB_POOL_SLOW_CHECKOUT = 0.05  # seconds; longer checkout waits are counted as slow
+    
+    # Read replicas (comma-separated URLs). Listed read-only endpoints query
+    # a replica; writes and a user's reads right after a write use the primary.
+    SQLALCHEMY_REPLICAS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',')
+                           if url.strip()]
+    REPLICA_ENDPOINTS = {
+        'main.analytics', 'main.api_stats', 'main.api_vitals_trends', 'main.api_at_risk',
+        'main.download_export', 'tasks.plan_occurrences', 'tasks.caregiver_route', 'tasks.propose_assignments',
+        'clients.list_clients', 'actions.list_actions', 'tasks.list_tasks', 'tasks.overdue_tasks',
+        'employees.list_employees', 'employees.list_users'
+    }
+    REPLICA_MAX_LAG = int(os.environ.get('REPLICA_MAX_LAG', 5))  # seconds of staleness tolerated
+    REPLICA_CHECK_INTERVAL = 10  # seconds between replica health and lag probes
+    
+    # SQLite tuning applied to each new connection (services/sqlite.py).
+    # WAL lets caregivers read while another request writes; NORMAL sync is
+    # safe in WAL mode and only risks the last commits on power loss.
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', 'true').lower() == 'true'
+    SQLITE_PRAGMAS = {
+        'busy_timeout': 5000,  # milliseconds to wait for a lock
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),  # bytes
+        'cache_size': -int(os.environ.get('SQLITE_CACHE_KB', 64000)),  # negative means KiB
+        'temp_store': 'memory'
+    }
+    SQLITE_MAINTENANCE_INTERVAL = int(os.environ.get('SQLITE_MAINTENANCE_INTERVAL', 600))  # seconds, 0 disables
+    SQLITE_CHECKPOINT_MODE = 'PASSIVE'
+    
+    # Statement budgets per request, enforced when TESTING
+    QUERY_BUDGET = None
+    QUERY_BUDGETS = {}
     
     # Session configuration
     SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
@@ -38,6 +185,19 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    SCHEMA_CHECK_ON_STARTUP = False
+    SQLITE_MAINTENANCE_INTERVAL = 0
+    JOB_WORKER_THREADS = 0
+    QUERY_BUDGET = 10
+    # Including the one ETag validator statement per view and, for the list
+    # filters, the three reference data statements on a cold cache
+    QUERY_BUDGETS = {
+        'actions.list_actions': 7,
+        'tasks.list_tasks': 7,
+        'tasks.overdue_tasks': 4,
+        'clients.view_client': 5,
+        'employees.view_employee': 7
+    }
 
 config = {
     'development': DevelopmentConfig,
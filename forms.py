@@ -101,6 +101,13 @@ class EmployeeForm(FlaskForm):
     ], default='active')
     skills = TextAreaField('Skills (one per line)', validators=[Optional()])
     certifications = TextAreaField('Certifications (one per line)', validators=[Optional()])
+    gender = SelectField('Gender', choices=[
+        ('', 'Not Specified'),
+        ('male', 'Male'),
+        ('female', 'Female'),
+        ('other', 'Other')
+    ], validators=[Optional()])
+    languages = TextAreaField('Languages Spoken (one per line)', validators=[Optional()])
     emergency_contact = StringField('Emergency Contact', validators=[Optional(), Length(max=200)])
     
     submit = SubmitField('Save Employee')
@@ -483,11 +490,12 @@ class ExportForm(FlaskForm):
     ], validators=[DataRequired()])
     format = SelectField('Format', choices=[
         ('csv', 'CSV'),
-        ('excel', 'Excel'),
-        ('pdf', 'PDF')
+        ('ndjson', 'JSON Lines'),
+        ('excel', 'Excel')
     ], default='csv')
     date_from = DateField('From Date', validators=[Optional()])
     date_to = DateField('To Date', validators=[Optional()])
     include_archived = BooleanField('Include Archived Records')
+    background = BooleanField('Build in the Background')
     
     submit = SubmitField('Export Data')
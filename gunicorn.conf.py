@@ -0,0 +1,28 @@
+"""
+HomeCare Management System - Gunicorn Configuration
+Professional Care Coordination Platform
+"""
+
+import os
+from config import Config
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+worker_class = 'gthread'
+timeout = int(os.environ.get('WEB_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Load the app once in the master so workers share its memory; each worker
+# then drops the pooled connections it inherited (see post_fork)
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+def post_fork(server, worker):
+    """Give each worker its own database connections"""
+    from services.pool import dispose_engines
+    from wsgi import app
+    dispose_engines(app)
@@ -9,8 +9,9 @@ from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
 from collections import defaultdict
+from services.replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(UserMixin, db.Model):
     """User model for authentication and role management"""
@@ -45,7 +46,7 @@ class User(UserMixin, db.Model):
     # Relationships
     clients = db.relationship('Client', backref='assigned_caregiver', lazy='dynamic', cascade='all, delete-orphan')
     care_actions = db.relationship('CareAction', backref='performed_by', lazy='dynamic', cascade='all, delete-orphan')
-    scheduled_tasks = db.relationship('ScheduledTask', backref='assigned_to', lazy='dynamic', cascade='all, delete-orphan')
+    scheduled_tasks = db.relationship('ScheduledTask', backref='assigned_to', lazy='dynamic', cascade='all, delete-orphan', foreign_keys='ScheduledTask.assigned_to_id')
     
     def set_password(self, password):
         """Hash and set password"""
@@ -69,12 +70,32 @@ class User(UserMixin, db.Model):
         """Check if user can manage clients"""
         return self.role in ['admin', 'developer', 'supervisor', 'caregiver']
     
+    def can_export_data(self):
+        """Check if user can export records in bulk"""
+        return self.role in ['admin', 'developer', 'supervisor']
+    
+    def can_manage_reports(self):
+        """Check if user can generate and review care reports"""
+        return self.role in ['admin', 'developer', 'supervisor']
+    
+    def can_plan_schedules(self):
+        """Check if user can generate care plan schedules and change planned visits"""
+        return self.role in ['admin', 'developer', 'supervisor']
+    
+    def can_edit_users(self):
+        """Check if user can manage other users"""
+        return self.is_admin or self.can_manage_users or self.role in ['admin', 'developer']
+    
     def __repr__(self):
         return f'<User {self.username}>'
 
 class Client(db.Model):
     """Client model for home care recipients"""
     __tablename__ = 'clients'
+    __table_args__ = (
+        db.Index('ix_clients_status_created_at', 'status', 'created_at'),
+        db.Index('ix_clients_status_care_level', 'status', 'care_level'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -174,6 +195,10 @@ class Client(db.Model):
 class CareAction(db.Model):
     """Care action model for logging care activities"""
     __tablename__ = 'care_actions'
+    __table_args__ = (
+        db.Index('ix_care_actions_client_id_action_date', 'client_id', 'action_date'),
+        db.Index('ix_care_actions_action_date', 'action_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
@@ -242,12 +267,21 @@ class CareTask(db.Model):
 class ScheduledTask(db.Model):
     """Scheduled task model for future care planning"""
     __tablename__ = 'scheduled_tasks'
+    __table_args__ = (
+        db.Index('ix_scheduled_tasks_status_scheduled_date', 'status', 'scheduled_date'),
+        db.Index('ix_scheduled_tasks_assigned_to_id_status', 'assigned_to_id', 'status'),
+        db.Index('uq_scheduled_tasks_occurrence', 'care_plan_task_id', 'occurrence_date', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
     assigned_to_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     task_id = db.Column(db.Integer, db.ForeignKey('care_tasks.id'), nullable=False)
     
+    # Care plan occurrence this task was generated from, if any
+    care_plan_task_id = db.Column(db.Integer, db.ForeignKey('care_plan_tasks.id', ondelete='SET NULL'), nullable=True)
+    occurrence_date = db.Column(db.Date)  # recurrence date, kept when an override moves scheduled_date
+    
     # Task details
     task_name = db.Column(db.String(200), nullable=False)
     task_category = db.Column(db.String(100))
@@ -303,10 +337,17 @@ class Employee(db.Model):
     certifications = db.Column(db.Text)  # JSON string of certifications
     emergency_contact = db.Column(db.String(200))
     
+    # Matched against client care preferences
+    gender = db.Column(db.String(10))  # male, female, other
+    languages = db.Column(db.Text)  # JSON string of spoken languages
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Relationships
+    user = db.relationship('User', backref=db.backref('employee', uselist=False))
+    
     def get_skills_list(self):
         """Get skills as a list"""
         if self.skills:
@@ -327,6 +368,16 @@ class Employee(db.Model):
         """Set certifications from a list"""
         self.certifications = json.dumps(certs_list)
     
+    def get_languages_list(self):
+        """Get spoken languages as a list"""
+        if self.languages:
+            return json.loads(self.languages)
+        return []
+    
+    def set_languages_list(self, languages_list):
+        """Set spoken languages from a list"""
+        self.languages = json.dumps(languages_list)
+    
     def __repr__(self):
         return f'<Employee {self.user.username}>'
 
@@ -394,9 +445,39 @@ class CarePlanTask(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Relationships
+    exceptions = db.relationship('CarePlanTaskException', backref='care_plan_task', lazy='dynamic',
+                                 cascade='all, delete-orphan')
+    
     def __repr__(self):
         return f'<CarePlanTask {self.task_name}>'
 
+class CarePlanTaskException(db.Model):
+    """Skipped or changed occurrence of a recurring care plan task"""
+    __tablename__ = 'care_plan_task_exceptions'
+    __table_args__ = (
+        db.UniqueConstraint('care_plan_task_id', 'occurrence_date', name='uq_care_plan_task_exceptions_occurrence'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    care_plan_task_id = db.Column(db.Integer, db.ForeignKey('care_plan_tasks.id'), nullable=False)
+    occurrence_date = db.Column(db.Date, nullable=False)
+    action = db.Column(db.String(20), nullable=False, default='skip')  # skip, override
+    
+    # Overrides; None keeps the care plan's value
+    scheduled_date = db.Column(db.Date)
+    scheduled_time = db.Column(db.Time)
+    assigned_to_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    priority = db.Column(db.String(20))
+    notes = db.Column(db.Text)
+    
+    created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CarePlanTaskException {self.care_plan_task_id} {self.occurrence_date} {self.action}>'
+
 class MedicalAssessment(db.Model):
     """Medical assessment model for health monitoring"""
     __tablename__ = 'medical_assessments'
@@ -672,64 +753,192 @@ class WeatherData(db.Model):
     def __repr__(self):
         return f'<WeatherData {self.condition} at {self.location_latitude}, {self.location_longitude}>'
 
+class CareActionRollup(db.Model):
+    """Daily care action counts maintained from care_actions"""
+    __tablename__ = 'care_action_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('rollup_date', 'client_id', 'task_category', 'priority', 'status',
+                            name='uq_care_action_rollups_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    rollup_date = db.Column(db.Date, nullable=False)
+    client_id = db.Column(db.Integer, nullable=False)
+    task_category = db.Column(db.String(100), nullable=False, default='')
+    priority = db.Column(db.String(20), nullable=False, default='')
+    status = db.Column(db.String(20), nullable=False, default='')
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CareActionRollup {self.rollup_date} client {self.client_id}: {self.row_count}>'
+
+class ScheduledTaskRollup(db.Model):
+    """Daily scheduled task counts maintained from scheduled_tasks"""
+    __tablename__ = 'scheduled_task_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('rollup_date', 'client_id', 'task_category', 'priority', 'status',
+                            name='uq_scheduled_task_rollups_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    rollup_date = db.Column(db.Date, nullable=False)
+    client_id = db.Column(db.Integer, nullable=False)
+    task_category = db.Column(db.String(100), nullable=False, default='')
+    priority = db.Column(db.String(20), nullable=False, default='')
+    status = db.Column(db.String(20), nullable=False, default='')
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ScheduledTaskRollup {self.rollup_date} client {self.client_id}: {self.row_count}>'
+
+class SchemaVersion(db.Model):
+    """Schema versions applied by flask bootstrap"""
+    __tablename__ = 'schema_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SchemaVersion {self.version}>'
+
+class Job(db.Model):
+    """Background job queued for the job workers"""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_id', 'status', 'id'),
+        db.Index('ix_jobs_created_by_id_created_at', 'created_by_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # export, ...
+    params = db.Column(db.Text)  # JSON keyword arguments for the job handler
+    status = db.Column(db.String(20), default='queued')  # queued, running, completed, failed, cancelled, expired
+    created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+
+    # Progress
+    progress = db.Column(db.Integer, default=0)
+    total = db.Column(db.Integer)
+    message = db.Column(db.String(200))
+    cancel_requested = db.Column(db.Boolean, default=False)
+    attempts = db.Column(db.Integer, default=0)
+    worker = db.Column(db.String(100))
+    error = db.Column(db.Text)
+
+    # Result file
+    result_path = db.Column(db.String(500))
+    result_name = db.Column(db.String(200))
+    result_mimetype = db.Column(db.String(100))
+    result_size = db.Column(db.Integer)
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+
+    created_by = db.relationship('User', backref='jobs')
+
+    def get_params(self):
+        """Get the handler keyword arguments"""
+        return json.loads(self.params) if self.params else {}
+
+    def is_finished(self):
+        """Check if the job will not run again"""
+        return self.status in ['completed', 'failed', 'cancelled', 'expired']
+
+    def percent_complete(self):
+        """Get progress as a percentage, None while the total is unknown"""
+        if self.status == 'completed':
+            return 100
+        if not self.total:
+            return None
+        return min(100, int(self.progress * 100 / self.total))
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
+
+class ClientRiskScore(db.Model):
+    """Current early-warning score of a client, maintained by services.risk"""
+    __tablename__ = 'client_risk_scores'
+    __table_args__ = (
+        db.Index('ix_client_risk_scores_score', 'score'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, nullable=False, unique=True)
+    score = db.Column(db.Integer, nullable=False, default=0)
+    risk_level = db.Column(db.String(20), nullable=False, default='low')  # low, low_medium, medium, high
+    red_flag = db.Column(db.Boolean, default=False)  # a single parameter scored 3
+    components = db.Column(db.Text)  # JSON {parameter: {"value": ..., "points": ...}}
+    assessment_date = db.Column(db.Date)  # latest assessment scored
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def get_components(self):
+        """Get the points and values behind the score"""
+        return json.loads(self.components) if self.components else {}
+
+    def __repr__(self):
+        return f'<ClientRiskScore client {self.client_id}: {self.score} {self.risk_level}>'
+
+DEFAULT_CARE_TASKS = [
+    # Personal Care
+    {'name': 'Personal Hygiene Assistance', 'category': 'Personal Care', 'is_common': True, 'description': 'Assist with daily hygiene routines'},
+    {'name': 'Bathing Assistance', 'category': 'Personal Care', 'is_common': True, 'description': 'Help with bathing and showering'},
+    {'name': 'Dressing Assistance', 'category': 'Personal Care', 'is_common': True, 'description': 'Help with getting dressed and undressed'},
+    {'name': 'Grooming Assistance', 'category': 'Personal Care', 'is_common': True, 'description': 'Assist with hair care, shaving, and grooming'},
+    {'name': 'Toileting Assistance', 'category': 'Personal Care', 'is_common': True, 'description': 'Help with bathroom needs'},
+    {'name': 'Mobility Assistance', 'category': 'Personal Care', 'is_common': True, 'description': 'Help with walking and movement'},
+    
+    # Medical Care
+    {'name': 'Medication Administration', 'category': 'Medical Care', 'is_common': True, 'description': 'Administer prescribed medications'},
+    {'name': 'Vital Signs Check', 'category': 'Medical Care', 'is_common': True, 'description': 'Monitor blood pressure, pulse, temperature'},
+    {'name': 'Blood Pressure Monitoring', 'category': 'Medical Care', 'is_common': True, 'description': 'Regular blood pressure checks'},
+    {'name': 'Blood Sugar Testing', 'category': 'Medical Care', 'is_common': True, 'description': 'Monitor blood glucose levels'},
+    {'name': 'Wound Care', 'category': 'Medical Care', 'is_common': False, 'description': 'Clean and dress wounds'},
+    {'name': 'Injection Administration', 'category': 'Medical Care', 'is_common': False, 'description': 'Give injections as prescribed'},
+    {'name': 'Physical Therapy Exercises', 'category': 'Medical Care', 'is_common': False, 'description': 'Assist with prescribed exercises'},
+    {'name': 'Respiratory Care', 'category': 'Medical Care', 'is_common': False, 'description': 'Assist with breathing treatments'},
+    
+    # Daily Living
+    {'name': 'Meal Preparation', 'category': 'Daily Living', 'is_common': True, 'description': 'Prepare nutritious meals'},
+    {'name': 'Feeding Assistance', 'category': 'Daily Living', 'is_common': True, 'description': 'Help with eating and drinking'},
+    {'name': 'Housekeeping', 'category': 'Daily Living', 'is_common': True, 'description': 'Light housekeeping tasks'},
+    {'name': 'Laundry', 'category': 'Daily Living', 'is_common': True, 'description': 'Wash and fold clothes'},
+    {'name': 'Shopping', 'category': 'Daily Living', 'is_common': True, 'description': 'Grocery and personal shopping'},
+    {'name': 'Transportation', 'category': 'Daily Living', 'is_common': True, 'description': 'Transport to appointments'},
+    {'name': 'Appointment Scheduling', 'category': 'Daily Living', 'is_common': True, 'description': 'Schedule medical appointments'},
+    {'name': 'Medication Pickup', 'category': 'Daily Living', 'is_common': True, 'description': 'Pick up prescriptions'},
+    
+    # Emotional Support
+    {'name': 'Companionship', 'category': 'Emotional Support', 'is_common': True, 'description': 'Provide social interaction and companionship'},
+    {'name': 'Social Activities', 'category': 'Emotional Support', 'is_common': True, 'description': 'Engage in recreational activities'},
+    {'name': 'Mental Health Check', 'category': 'Emotional Support', 'is_common': True, 'description': 'Monitor emotional well-being'},
+    {'name': 'Family Communication', 'category': 'Emotional Support', 'is_common': False, 'description': 'Facilitate family communication'},
+    {'name': 'Crisis Intervention', 'category': 'Emotional Support', 'is_common': False, 'description': 'Provide crisis support'},
+    
+    # Safety & Monitoring
+    {'name': 'Safety Assessment', 'category': 'Safety & Monitoring', 'is_common': True, 'description': 'Assess home safety conditions'},
+    {'name': 'Fall Risk Assessment', 'category': 'Safety & Monitoring', 'is_common': True, 'description': 'Evaluate fall risk factors'},
+    {'name': 'Home Safety Check', 'category': 'Safety & Monitoring', 'is_common': True, 'description': 'Check for safety hazards'},
+    {'name': 'Emergency Response', 'category': 'Safety & Monitoring', 'is_common': False, 'description': 'Respond to emergency situations'},
+    {'name': 'Security Check', 'category': 'Safety & Monitoring', 'is_common': False, 'description': 'Verify home security'},
+    
+    # Specialized Care
+    {'name': 'Dementia Care', 'category': 'Specialized Care', 'is_common': False, 'description': 'Specialized dementia support'},
+    {'name': 'Alzheimer\'s Support', 'category': 'Specialized Care', 'is_common': False, 'description': 'Alzheimer\'s specific care'},
+    {'name': 'Disability Support', 'category': 'Specialized Care', 'is_common': False, 'description': 'Support for physical disabilities'},
+    {'name': 'Palliative Care', 'category': 'Specialized Care', 'is_common': False, 'description': 'End-of-life comfort care'},
+    {'name': 'Hospice Support', 'category': 'Specialized Care', 'is_common': False, 'description': 'Hospice care assistance'},
+    {'name': 'Rehabilitation Support', 'category': 'Specialized Care', 'is_common': False, 'description': 'Post-injury rehabilitation'}
+]
+
 def init_default_care_tasks(db):
-    """Initialize default care tasks"""
-    default_tasks = [
-        # Personal Care
-        {'name': 'Personal Hygiene Assistance', 'category': 'Personal Care', 'common': True, 'description': 'Assist with daily hygiene routines'},
-        {'name': 'Bathing Assistance', 'category': 'Personal Care', 'common': True, 'description': 'Help with bathing and showering'},
-        {'name': 'Dressing Assistance', 'category': 'Personal Care', 'common': True, 'description': 'Help with getting dressed and undressed'},
-        {'name': 'Grooming Assistance', 'category': 'Personal Care', 'common': True, 'description': 'Assist with hair care, shaving, and grooming'},
-        {'name': 'Toileting Assistance', 'category': 'Personal Care', 'common': True, 'description': 'Help with bathroom needs'},
-        {'name': 'Mobility Assistance', 'category': 'Personal Care', 'common': True, 'description': 'Help with walking and movement'},
-        
-        # Medical Care
-        {'name': 'Medication Administration', 'category': 'Medical Care', 'common': True, 'description': 'Administer prescribed medications'},
-        {'name': 'Vital Signs Check', 'category': 'Medical Care', 'common': True, 'description': 'Monitor blood pressure, pulse, temperature'},
-        {'name': 'Blood Pressure Monitoring', 'category': 'Medical Care', 'common': True, 'description': 'Regular blood pressure checks'},
-        {'name': 'Blood Sugar Testing', 'category': 'Medical Care', 'common': True, 'description': 'Monitor blood glucose levels'},
-        {'name': 'Wound Care', 'category': 'Medical Care', 'common': False, 'description': 'Clean and dress wounds'},
-        {'name': 'Injection Administration', 'category': 'Medical Care', 'common': False, 'description': 'Give injections as prescribed'},
-        {'name': 'Physical Therapy Exercises', 'category': 'Medical Care', 'common': False, 'description': 'Assist with prescribed exercises'},
-        {'name': 'Respiratory Care', 'category': 'Medical Care', 'common': False, 'description': 'Assist with breathing treatments'},
-        
-        # Daily Living
-        {'name': 'Meal Preparation', 'category': 'Daily Living', 'common': True, 'description': 'Prepare nutritious meals'},
-        {'name': 'Feeding Assistance', 'category': 'Daily Living', 'common': True, 'description': 'Help with eating and drinking'},
-        {'name': 'Housekeeping', 'category': 'Daily Living', 'common': True, 'description': 'Light housekeeping tasks'},
-        {'name': 'Laundry', 'category': 'Daily Living', 'common': True, 'description': 'Wash and fold clothes'},
-        {'name': 'Shopping', 'category': 'Daily Living', 'common': True, 'description': 'Grocery and personal shopping'},
-        {'name': 'Transportation', 'category': 'Daily Living', 'common': True, 'description': 'Transport to appointments'},
-        {'name': 'Appointment Scheduling', 'category': 'Daily Living', 'common': True, 'description': 'Schedule medical appointments'},
-        {'name': 'Medication Pickup', 'category': 'Daily Living', 'common': True, 'description': 'Pick up prescriptions'},
-        
-        # Emotional Support
-        {'name': 'Companionship', 'category': 'Emotional Support', 'common': True, 'description': 'Provide social interaction and companionship'},
-        {'name': 'Social Activities', 'category': 'Emotional Support', 'common': True, 'description': 'Engage in recreational activities'},
-        {'name': 'Mental Health Check', 'category': 'Emotional Support', 'common': True, 'description': 'Monitor emotional well-being'},
-        {'name': 'Family Communication', 'category': 'Emotional Support', 'common': False, 'description': 'Facilitate family communication'},
-        {'name': 'Crisis Intervention', 'category': 'Emotional Support', 'common': False, 'description': 'Provide crisis support'},
-        
-        # Safety & Monitoring
-        {'name': 'Safety Assessment', 'category': 'Safety & Monitoring', 'common': True, 'description': 'Assess home safety conditions'},
-        {'name': 'Fall Risk Assessment', 'category': 'Safety & Monitoring', 'common': True, 'description': 'Evaluate fall risk factors'},
-        {'name': 'Home Safety Check', 'category': 'Safety & Monitoring', 'common': True, 'description': 'Check for safety hazards'},
-        {'name': 'Emergency Response', 'category': 'Safety & Monitoring', 'common': False, 'description': 'Respond to emergency situations'},
-        {'name': 'Security Check', 'category': 'Safety & Monitoring', 'common': False, 'description': 'Verify home security'},
-        
-        # Specialized Care
-        {'name': 'Dementia Care', 'category': 'Specialized Care', 'common': False, 'description': 'Specialized dementia support'},
-        {'name': 'Alzheimer\'s Support', 'category': 'Specialized Care', 'common': False, 'description': 'Alzheimer\'s specific care'},
-        {'name': 'Disability Support', 'category': 'Specialized Care', 'common': False, 'description': 'Support for physical disabilities'},
-        {'name': 'Palliative Care', 'category': 'Specialized Care', 'common': False, 'description': 'End-of-life comfort care'},
-        {'name': 'Hospice Support', 'category': 'Specialized Care', 'common': False, 'description': 'Hospice care assistance'},
-        {'name': 'Rehabilitation Support', 'category': 'Specialized Care', 'common': False, 'description': 'Post-injury rehabilitation'}
-    ]
-    
-    for task_data in default_tasks:
-        existing_task = CareTask.query.filter_by(name=task_data['name']).first()
-        if not existing_task:
-            task = CareTask(**task_data)
-            db.session.add(task)
-    
-    db.session.commit()
+    """Insert any missing default care tasks in one bulk statement; the caller commits"""
+    names = [task['name'] for task in DEFAULT_CARE_TASKS]
+    existing = {row[0] for row in db.session.query(CareTask.name).filter(CareTask.name.in_(names))}
+    missing = [task for task in DEFAULT_CARE_TASKS if task['name'] not in existing]
+    if missing:
+        db.session.execute(db.insert(CareTask), missing)
+    return len(missing)
@@ -3,11 +3,30 @@ HomeCare Management System - Routes Package
 Professional Care Coordination Platform
 """
 
-from .main import main_bp
-from .auth import auth_bp
-from .clients import clients_bp
-from .actions import actions_bp
-from .tasks import tasks_bp
-from .employees import employees_bp
-
-__all__ = ['main_bp', 'auth_bp', 'clients_bp', 'actions_bp', 'tasks_bp', 'employees_bp']
\ No newline at end of file
+import importlib
+
+# Blueprint name -> (module, URL prefix); modules import when first asked for
+BLUEPRINTS = {
+    'main_bp': ('.main', None),
+    'auth_bp': ('.auth', '/auth'),
+    'clients_bp': ('.clients', '/clients'),
+    'actions_bp': ('.actions', '/actions'),
+    'tasks_bp': ('.tasks', '/tasks'),
+    'employees_bp': ('.employees', '/employees'),
+    'api_bp': ('.api', '/api/v1'),
+    'jobs_bp': ('.jobs', '/jobs')
+}
+
+def __getattr__(name):
+    if name not in BLUEPRINTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    blueprint = getattr(importlib.import_module(BLUEPRINTS[name][0], __name__), name)
+    globals()[name] = blueprint
+    return blueprint
+
+def register_blueprints(app, names=None):
+    """Import and register blueprints, all of them by default"""
+    for name in names or BLUEPRINTS:
+        app.register_blueprint(__getattr__(name), url_prefix=BLUEPRINTS[name][1])
+
+__all__ = list(BLUEPRINTS)
@@ -3,19 +3,26 @@ HomeCare Management System - Care Action Routes
 Professional Care Coordination Platform
 """
 
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
+from flask import Blueprint, current_app, render_template, request, jsonify, flash, redirect, url_for
 from flask_login import login_required, current_user
-from models import db, CareAction, Client, CareTask
-from forms import CareActionForm
+from models import db, Client, CareAction, CareTask
+from services.imports import lazy_import
+from services.http_cache import not_modified
+from services.ingest import ingest_care_actions
+from services.pagination import paginate_request
+from services.reference import reference_data, get_care_task, populate_choices
+from services.serializers import model_to_dict, wants_json
 from datetime import datetime, timedelta
 
+# WTForms and its validators load on the first form request
+forms = lazy_import('forms')
+
 actions_bp = Blueprint('actions', __name__)
 
 @actions_bp.route('/')
 @login_required
 def list_actions():
     """List all care actions"""
-    page = request.args.get('page', 1, type=int)
     per_page = 20
     
     # Get filter parameters
@@ -51,12 +58,18 @@ def list_actions():
     if priority_filter != 'all':
         query = query.filter_by(priority=priority_filter)
     
-    actions = query.order_by(CareAction.action_date.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
+    cached = not_modified(query, Client, CareTask)
+    if cached:
+        return cached
+    
+    actions = paginate_request(query, [(CareAction.action_date, True), (CareAction.id, True)], per_page)
+    
+    if wants_json():
+        return jsonify(actions.to_dict(model_to_dict))
     
     # Get filter options
-    clients = Client.query.filter_by(status='active').order_by(Client.name).all()
-    tasks = CareTask.query.filter_by(is_active=True).order_by(CareTask.name).all()
+    clients = reference_data().clients
+    tasks = reference_data().active_tasks
     
     return render_template('actions/list.html',
                          actions=actions,
@@ -72,19 +85,16 @@ def list_actions():
 @login_required
 def add_action():
     """Add new care action"""
-    form = CareActionForm()
-    
-    # Populate client and task choices
-    form.client_id.choices = [(c.id, c.name) for c in Client.query.filter_by(status='active').order_by(Client.name).all()]
-    form.task_id.choices = [(t.id, f"{t.name} ({t.category})") for t in CareTask.query.filter_by(is_active=True).order_by(CareTask.name).all()]
+    form = populate_choices(forms.CareActionForm())
     
     if form.validate_on_submit():
+        care_task = get_care_task(form.task_id.data)
         action = CareAction(
             client_id=form.client_id.data,
             performed_by_id=current_user.id,
             task_id=form.task_id.data,
-            task_name=CareTask.query.get(form.task_id.data).name,
-            task_category=CareTask.query.get(form.task_id.data).category,
+            task_name=care_task.name,
+            task_category=care_task.category,
             action_date=form.action_date.data,
             action_time=form.action_time.data,
             notes=form.notes.data,
@@ -104,6 +114,10 @@ def add_action():
 @login_required
 def view_action(id):
     """View care action details"""
+    cached = not_modified(CareAction.query.filter_by(id=id),
+                          Client.query.filter(Client.id.in_(db.select(CareAction.client_id).filter_by(id=id))))
+    if cached:
+        return cached
     action = CareAction.query.get_or_404(id)
     return render_template('actions/view.html', action=action)
 
@@ -112,17 +126,14 @@ def view_action(id):
 def edit_action(id):
     """Edit care action"""
     action = CareAction.query.get_or_404(id)
-    form = CareActionForm(obj=action)
-    
-    # Populate client and task choices
-    form.client_id.choices = [(c.id, c.name) for c in Client.query.filter_by(status='active').order_by(Client.name).all()]
-    form.task_id.choices = [(t.id, f"{t.name} ({t.category})") for t in CareTask.query.filter_by(is_active=True).order_by(CareTask.name).all()]
+    form = populate_choices(forms.CareActionForm(obj=action))
     
     if form.validate_on_submit():
+        care_task = get_care_task(form.task_id.data)
         action.client_id = form.client_id.data
         action.task_id = form.task_id.data
-        action.task_name = CareTask.query.get(form.task_id.data).name
-        action.task_category = CareTask.query.get(form.task_id.data).category
+        action.task_name = care_task.name
+        action.task_category = care_task.category
         action.action_date = form.action_date.data
         action.action_time = form.action_time.data
         action.notes = form.notes.data
@@ -169,40 +180,42 @@ def quick_log():
             flash('Please fill in all required fields', 'error')
             return redirect(url_for('actions.quick_log'))
         
-        try:
-            action_date = datetime.strptime(action_date, '%Y-%m-%d').date()
-            action_time = datetime.strptime(action_time, '%H:%M').time() if action_time else None
-        except ValueError:
-            flash('Invalid date or time format', 'error')
-            return redirect(url_for('actions.quick_log'))
-        
-        # Create actions for each task
-        created_count = 0
-        for task_id in task_ids:
-            if task_id.strip():
-                task = CareTask.query.get(int(task_id.strip()))
-                if task:
-                    action = CareAction(
-                        client_id=int(client_id),
-                        performed_by_id=current_user.id,
-                        task_id=task.id,
-                        task_name=task.name,
-                        task_category=task.category,
-                        action_date=action_date,
-                        action_time=action_time,
-                        notes=notes,
-                        priority='normal',
-                        status='completed'
-                    )
-                    db.session.add(action)
-                    created_count += 1
-        
+        # Create actions for each task in one insert
+        rows = [{
+            'client_id': client_id,
+            'task_id': task_id.strip(),
+            'action_date': action_date,
+            'action_time': action_time,
+            'notes': notes
+        } for task_id in task_ids if task_id.strip()]
+        result = ingest_care_actions(rows, current_user.id)
         db.session.commit()
-        flash(f'{created_count} care actions have been logged successfully!', 'success')
+        
+        if result.errors:
+            flash(f"{len(result.errors)} care actions could not be logged: {result.errors[0]['errors'][0]}", 'error')
+        if not result.created:
+            return redirect(url_for('actions.quick_log'))
+        flash(f'{len(result.created)} care actions have been logged successfully!', 'success')
         return redirect(url_for('actions.list_actions'))
     
     # Get clients and tasks for the form
-    clients = Client.query.filter_by(status='active').order_by(Client.name).all()
-    tasks = CareTask.query.filter_by(is_active=True).order_by(CareTask.category, CareTask.name).all()
+    clients = reference_data().clients
+    tasks = reference_data().tasks_by_category
     
     return render_template('actions/quick_log.html', clients=clients, tasks=tasks)
+
+@actions_bp.route('/batch', methods=['POST'])
+@login_required
+def batch_log():
+    """Log a batch of care actions from JSON in one request"""
+    payload = request.get_json(silent=True)
+    rows = payload.get('actions') if isinstance(payload, dict) else None
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        return jsonify({'error': 'Expected a JSON object with an "actions" list'}), 400
+    if len(rows) > current_app.config['BULK_INGEST_MAX_ROWS']:
+        return jsonify({'error': f"At most {current_app.config['BULK_INGEST_MAX_ROWS']} actions per batch"}), 400
+    
+    result = ingest_care_actions(rows, current_user.id, atomic=bool(payload.get('atomic')))
+    db.session.commit()
+    
+    return jsonify(result.to_dict()), 201 if result.created else 400
@@ -0,0 +1,163 @@
+"""
+HomeCare Management System - JSON API Routes
+Professional Care Coordination Platform
+
+Read API for the field client. Queries run on the app's pooled session, so
+a request holds a connection only while its statements run.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import login_required
+from werkzeug.exceptions import HTTPException
+from models import db, Client, CareAction, ScheduledTask
+from services.serializers import model_fields, to_json_value
+
+api_bp = Blueprint('api', __name__)
+
+# URL name -> model served under /api/v1/<name>
+RESOURCES = {
+    'clients': Client,
+    'care-actions': CareAction,
+    'scheduled-tasks': ScheduledTask
+}
+
+class ApiError(Exception):
+    """Client error reported as a JSON body"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+@api_bp.errorhandler(ApiError)
+def handle_api_error(error):
+    return jsonify({'error': error.message}), error.status
+
+@api_bp.errorhandler(HTTPException)
+def handle_http_error(error):
+    return jsonify({'error': error.description}), error.code
+
+def _resource(name):
+    if name not in RESOURCES:
+        raise ApiError(f'Unknown resource {name}', 404)
+    return RESOURCES[name]
+
+def _parse_ids(value):
+    """Parse a comma-separated ID list, keeping the order given"""
+    try:
+        ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        raise ApiError('ids must be comma-separated integers')
+    if len(ids) > current_app.config['API_BATCH_MAX_IDS']:
+        raise ApiError(f"At most {current_app.config['API_BATCH_MAX_IDS']} ids per request")
+    return ids
+
+def _parse_fields(model, value):
+    """Get the columns for a sparse fieldset; id is always included"""
+    available = model_fields(model)
+    if not value:
+        return available
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise ApiError(f"Unknown field(s) for {model.__tablename__}: {', '.join(unknown)}")
+    return ['id'] + [field for field in fields if field != 'id']
+
+def _parse_int(name, default=None):
+    value = request.args.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f'{name} must be an integer')
+
+def _select(model, fields):
+    return db.select(*[getattr(model, field) for field in fields])
+
+def _to_dicts(result):
+    return [{key: to_json_value(value) for key, value in row._mapping.items()} for row in result]
+
+def _fetch_ids(model, ids, fields):
+    """Load rows by ID in the order asked for, and the IDs not found"""
+    result = db.session.execute(_select(model, fields).where(model.id.in_(ids)))
+    by_id = {item['id']: item for item in _to_dicts(result)}
+    return [by_id[id] for id in ids if id in by_id], [id for id in ids if id not in by_id]
+
+def _fetch_page(model, fields, after, limit, client_id, updated_since):
+    """Load the next page of rows by ascending ID"""
+    query = _select(model, fields).order_by(model.id).limit(limit + 1)
+    if after is not None:
+        query = query.where(model.id > after)
+    if client_id is not None and model is not Client:
+        query = query.where(model.client_id == client_id)
+    if updated_since is not None:
+        query = query.where(model.updated_at >= updated_since)
+    items = _to_dicts(db.session.execute(query))
+    has_more = len(items) > limit
+    items = items[:limit]
+    return items, items[-1]['id'] if has_more else None
+
+def conditional_json(payload):
+    """Build a JSON response with an ETag, or a 304 when the client has it"""
+    body = json.dumps(payload, separators=(',', ':'), default=str).encode()
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(hashlib.sha1(body).hexdigest())
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+@api_bp.route('/<resource>')
+@login_required
+def list_resource(resource):
+    """Get rows by ?ids=1,2,3 or page through them with ?after=<id>&limit=
+
+    ?fields=a,b limits the columns returned. Pages can be narrowed with
+    ?client_id= and ?updated_since=<ISO datetime> for incremental sync.
+    """
+    model = _resource(resource)
+    fields = _parse_fields(model, request.args.get('fields'))
+    if 'ids' in request.args:
+        items, missing = _fetch_ids(model, _parse_ids(request.args['ids']), fields)
+        return conditional_json({'items': items, 'missing': missing})
+
+    limit = min(_parse_int('limit', current_app.config['API_PAGE_SIZE']), current_app.config['API_MAX_PAGE_SIZE'])
+    if limit < 1:
+        raise ApiError('limit must be positive')
+    updated_since = request.args.get('updated_since')
+    if updated_since:
+        try:
+            updated_since = datetime.fromisoformat(updated_since)
+        except ValueError:
+            raise ApiError('updated_since must be an ISO 8601 datetime')
+    items, next_after = _fetch_page(model, fields, _parse_int('after'), limit,
+                                          _parse_int('client_id'), updated_since or None)
+    return conditional_json({'items': items, 'next_after': next_after})
+
+@api_bp.route('/<resource>/<int:id>')
+@login_required
+def get_resource(resource, id):
+    """Get one row, with ?fields= for a sparse fieldset"""
+    model = _resource(resource)
+    items, _ = _fetch_ids(model, [id], _parse_fields(model, request.args.get('fields')))
+    if not items:
+        raise ApiError(f'{resource} {id} not found', 404)
+    return conditional_json(items[0])
+
+@api_bp.route('/batch')
+@login_required
+def batch():
+    """Get rows of several resources in one round trip
+
+    ?clients=1,2&care-actions=5,6 with optional fields[clients]=id,name.
+    """
+    lookups = {name: (model, _parse_ids(request.args[name]),
+                      _parse_fields(model, request.args.get(f'fields[{name}]')))
+               for name, model in RESOURCES.items() if request.args.get(name)}
+    if not lookups:
+        raise ApiError(f"Give ids for at least one of: {', '.join(RESOURCES)}")
+    results = [_fetch_ids(*lookup) for lookup in lookups.values()]
+    return conditional_json({name: {'items': items, 'missing': missing}
+                             for name, (items, missing) in zip(lookups, results)})
@@ -6,7 +6,10 @@ Professional Care Coordination Platform
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from models import db, User
-from forms import LoginForm
+from services.imports import lazy_import
+
+# WTForms and its validators load on the first form request
+forms = lazy_import('forms')
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -16,7 +19,7 @@ def login():
     if current_user.is_authenticated:
         return redirect(url_for('main.dashboard'))
     
-    form = LoginForm()
+    form = forms.LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
         
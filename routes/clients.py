@@ -6,16 +6,22 @@ Professional Care Coordination Platform
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from flask_login import login_required, current_user
 from models import db, Client, CareAction, ScheduledTask
-from forms import ClientForm
+from services.http_cache import not_modified
+from services.imports import lazy_import
+from services.pagination import paginate_request
+from services.search import search, search_client_ids
+from services.serializers import model_to_dict, wants_json
 from datetime import datetime, timedelta
 
+# WTForms and its validators load on the first form request
+forms = lazy_import('forms')
+
 clients_bp = Blueprint('clients', __name__)
 
 @clients_bp.route('/')
 @login_required
 def list_clients():
     """List all clients"""
-    page = request.args.get('page', 1, type=int)
     per_page = 20
     
     # Get filter parameters
@@ -32,27 +38,68 @@ def list_clients():
     if care_level_filter != 'all':
         query = query.filter_by(care_level=care_level_filter)
     
+    search_snippets = {}
+    order_by = [(Client.created_at, True), (Client.id, True)]
     if search_query:
-        query = query.filter(
-            Client.name.contains(search_query) |
-            Client.description.contains(search_query)
-        )
+        # Ranked full-text match over client details and care notes
+        search_snippets = search_client_ids(search_query)
+        ranked_ids = list(search_snippets)
+        query = query.filter(Client.id.in_(ranked_ids))
+        if ranked_ids:
+            rank = db.case({client_id: position for position, client_id in enumerate(ranked_ids)},
+                           value=Client.id)
+            order_by = [(rank, False), (Client.id, False)]
+    
+    # Search results also depend on care notes
+    cached = not_modified(query, CareAction) if search_query else not_modified(query)
+    if cached:
+        return cached
     
-    clients = query.order_by(Client.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    clients = paginate_request(query, order_by, per_page)
+    
+    if wants_json():
+        return jsonify(clients.to_dict(model_to_dict))
     
     return render_template('clients/list.html', 
                          clients=clients,
                          status_filter=status_filter,
                          care_level_filter=care_level_filter,
-                         search_query=search_query)
+                         search_query=search_query,
+                         search_snippets=search_snippets)
+
+@clients_bp.route('/search')
+@login_required
+def search_clients():
+    """JSON search over clients and care notes"""
+    search_query = request.args.get('q', '')
+    doc_type = request.args.get('type', 'all')
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    
+    doc_types = ('client', 'care_note') if doc_type == 'all' else (doc_type,)
+    results = search(search_query, doc_types=doc_types, limit=limit)
+    
+    # Attach client names in one query
+    client_ids = {result['client_id'] for result in results}
+    names = dict(db.session.query(Client.id, Client.name).filter(Client.id.in_(client_ids)).all()) if client_ids else {}
+    
+    return jsonify({
+        'query': search_query,
+        'results': [{
+            'type': result['doc_type'],
+            'id': result['doc_id'],
+            'client_id': result['client_id'],
+            'client_name': names.get(result['client_id']),
+            'title': result['title'],
+            'snippet': str(result['snippet']),
+            'rank': round(float(result['rank']), 4)
+        } for result in results]
+    })
 
 @clients_bp.route('/add', methods=['GET', 'POST'])
 @login_required
 def add_client():
     """Add new client"""
-    form = ClientForm()
+    form = forms.ClientForm()
     
     if form.validate_on_submit():
         client = Client(
@@ -85,6 +132,10 @@ def add_client():
 @login_required
 def view_client(id):
     """View client details"""
+    cached = not_modified(Client.query.filter_by(id=id), CareAction.query.filter_by(client_id=id),
+                          ScheduledTask.query.filter_by(client_id=id))
+    if cached:
+        return cached
     client = Client.query.get_or_404(id)
     
     # Get recent care actions
@@ -109,7 +160,7 @@ def view_client(id):
 def edit_client(id):
     """Edit client"""
     client = Client.query.get_or_404(id)
-    form = ClientForm(obj=client)
+    form = forms.ClientForm(obj=client)
     
     if form.validate_on_submit():
         client.name = form.name.data
@@ -157,13 +208,17 @@ def delete_client(id):
 @login_required
 def client_actions(id):
     """View client's care actions"""
+    cached = not_modified(Client.query.filter_by(id=id), CareAction.query.filter_by(client_id=id))
+    if cached:
+        return cached
     client = Client.query.get_or_404(id)
-    page = request.args.get('page', 1, type=int)
     per_page = 20
     
-    actions = CareAction.query.filter_by(client_id=id)\
-        .order_by(CareAction.action_date.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
+    actions = paginate_request(CareAction.query.filter_by(client_id=id),
+                               [(CareAction.action_date, True), (CareAction.id, True)], per_page)
+    
+    if wants_json():
+        return jsonify(actions.to_dict(model_to_dict))
     
     return render_template('clients/actions.html', client=client, actions=actions)
 
@@ -171,12 +226,16 @@ def client_actions(id):
 @login_required
 def client_tasks(id):
     """View client's scheduled tasks"""
+    cached = not_modified(Client.query.filter_by(id=id), ScheduledTask.query.filter_by(client_id=id))
+    if cached:
+        return cached
     client = Client.query.get_or_404(id)
-    page = request.args.get('page', 1, type=int)
     per_page = 20
     
-    tasks = ScheduledTask.query.filter_by(client_id=id)\
-        .order_by(ScheduledTask.scheduled_date.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
+    tasks = paginate_request(ScheduledTask.query.filter_by(client_id=id),
+                             [(ScheduledTask.scheduled_date, True), (ScheduledTask.id, True)], per_page)
+    
+    if wants_json():
+        return jsonify(tasks.to_dict(model_to_dict))
     
     return render_template('clients/tasks.html', client=client, tasks=tasks)
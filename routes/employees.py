@@ -6,9 +6,15 @@ Professional Care Coordination Platform
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from flask_login import login_required, current_user
 from models import db, Employee, User, CareAction, ScheduledTask
-from forms import EmployeeForm, UserForm
+from services.http_cache import not_modified
+from services.imports import lazy_import
+from services.pagination import paginate_request
+from services.serializers import model_to_dict, wants_json
 from datetime import datetime, timedelta
 
+# WTForms and its validators load on the first form request
+forms = lazy_import('forms')
+
 employees_bp = Blueprint('employees', __name__)
 
 @employees_bp.route('/')
@@ -39,6 +45,10 @@ def list_employees():
             User.username.contains(search_query)
         )
     
+    cached = not_modified(query)
+    if cached:
+        return cached
+    
     employees = query.order_by(User.first_name, User.last_name)\
         .paginate(page=page, per_page=per_page, error_out=False)
     
@@ -59,11 +69,11 @@ def list_employees():
 @login_required
 def add_employee():
     """Add new employee"""
-    if not current_user.can_manage_users():
+    if not current_user.can_edit_users():
         flash('You do not have permission to add employees', 'error')
         return redirect(url_for('employees.list_employees'))
     
-    form = EmployeeForm()
+    form = forms.EmployeeForm()
     
     # Populate user choices (users without employee records)
     existing_employee_user_ids = db.session.query(Employee.user_id).all()
@@ -79,6 +89,7 @@ def add_employee():
         # Parse skills and certifications
         skills = [skill.strip() for skill in form.skills.data.split('\n') if skill.strip()]
         certifications = [cert.strip() for cert in form.certifications.data.split('\n') if cert.strip()]
+        languages = [language.strip() for language in form.languages.data.split('\n') if language.strip()]
         
         employee = Employee(
             user_id=form.user_id.data,
@@ -87,11 +98,13 @@ def add_employee():
             position=form.position.data,
             hire_date=form.hire_date.data,
             status=form.status.data,
+            gender=form.gender.data or None,
             emergency_contact=form.emergency_contact.data
         )
         
         employee.set_skills_list(skills)
         employee.set_certifications_list(certifications)
+        employee.set_languages_list(languages)
         
         db.session.add(employee)
         db.session.commit()
@@ -139,12 +152,12 @@ def view_employee(id):
 @login_required
 def edit_employee(id):
     """Edit employee"""
-    if not current_user.can_manage_users():
+    if not current_user.can_edit_users():
         flash('You do not have permission to edit employees', 'error')
         return redirect(url_for('employees.list_employees'))
     
     employee = Employee.query.get_or_404(id)
-    form = EmployeeForm(obj=employee)
+    form = forms.EmployeeForm(obj=employee)
     
     # Populate user choices
     form.user_id.choices = [(u.id, u.get_full_name()) for u in 
@@ -153,11 +166,13 @@ def edit_employee(id):
     # Pre-populate skills and certifications
     form.skills.data = '\n'.join(employee.get_skills_list())
     form.certifications.data = '\n'.join(employee.get_certifications_list())
+    form.languages.data = '\n'.join(employee.get_languages_list())
     
     if form.validate_on_submit():
         # Parse skills and certifications
         skills = [skill.strip() for skill in form.skills.data.split('\n') if skill.strip()]
         certifications = [cert.strip() for cert in form.certifications.data.split('\n') if cert.strip()]
+        languages = [language.strip() for language in form.languages.data.split('\n') if language.strip()]
         
         employee.user_id = form.user_id.data
         employee.employee_id = form.employee_id.data
@@ -165,11 +180,13 @@ def edit_employee(id):
         employee.position = form.position.data
         employee.hire_date = form.hire_date.data
         employee.status = form.status.data
+        employee.gender = form.gender.data or None
         employee.emergency_contact = form.emergency_contact.data
         employee.updated_at = datetime.utcnow()
         
         employee.set_skills_list(skills)
         employee.set_certifications_list(certifications)
+        employee.set_languages_list(languages)
         
         db.session.commit()
         
@@ -182,7 +199,7 @@ def edit_employee(id):
 @login_required
 def delete_employee(id):
     """Delete employee"""
-    if not current_user.can_manage_users():
+    if not current_user.can_edit_users():
         flash('You do not have permission to delete employees', 'error')
         return redirect(url_for('employees.list_employees'))
     
@@ -199,15 +216,20 @@ def delete_employee(id):
 @login_required
 def list_users():
     """List all users"""
-    if not current_user.can_manage_users():
+    if not current_user.can_edit_users():
         flash('You do not have permission to view users', 'error')
         return redirect(url_for('main.dashboard'))
     
-    page = request.args.get('page', 1, type=int)
     per_page = 20
     
-    users = User.query.order_by(User.created_at.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
+    cached = not_modified(User)
+    if cached:
+        return cached
+    
+    users = paginate_request(User.query, [(User.created_at, True), (User.id, True)], per_page)
+    
+    if wants_json():
+        return jsonify(users.to_dict(model_to_dict))
     
     return render_template('employees/users.html', users=users)
 
@@ -215,11 +237,11 @@ def list_users():
 @login_required
 def add_user():
     """Add new user"""
-    if not current_user.can_manage_users():
+    if not current_user.can_edit_users():
         flash('You do not have permission to add users', 'error')
         return redirect(url_for('employees.list_users'))
     
-    form = UserForm()
+    form = forms.UserForm()
     
     if form.validate_on_submit():
         user = User(
@@ -249,7 +271,7 @@ def add_user():
 @login_required
 def view_user(id):
     """View user details"""
-    if not current_user.can_manage_users():
+    if not current_user.can_edit_users():
         flash('You do not have permission to view users', 'error')
         return redirect(url_for('main.dashboard'))
     
@@ -260,12 +282,12 @@ def view_user(id):
 @login_required
 def edit_user(id):
     """Edit user"""
-    if not current_user.can_manage_users():
+    if not current_user.can_edit_users():
         flash('You do not have permission to edit users', 'error')
         return redirect(url_for('employees.list_users'))
     
     user = User.query.get_or_404(id)
-    form = UserForm(obj=user)
+    form = forms.UserForm(obj=user)
     
     if form.validate_on_submit():
         user.username = form.username.data
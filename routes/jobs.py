@@ -0,0 +1,106 @@
+"""
+HomeCare Management System - Background Job Routes
+Professional Care Coordination Platform
+
+JSON endpoints to queue jobs, poll their progress, cancel them and
+download their results.
+"""
+
+import os
+from flask import Blueprint, abort, jsonify, request, send_file, url_for
+from flask_login import login_required, current_user
+from werkzeug.exceptions import HTTPException
+from models import db, Job
+from services.imports import lazy_import
+from services.serializers import to_json_value
+
+# Job handlers and their registry load with the first job request
+job_queue = lazy_import('services.jobs')
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.errorhandler(HTTPException)
+def handle_http_error(error):
+    return jsonify({'error': error.description}), error.code
+
+def job_to_dict(job):
+    """Serialize a job's status for polling"""
+    data = {field: to_json_value(getattr(job, field)) for field in (
+        'id', 'kind', 'status', 'progress', 'total', 'message', 'error', 'result_name', 'result_size',
+        'created_at', 'started_at', 'finished_at', 'expires_at')}
+    data['percent'] = job.percent_complete()
+    data['params'] = job.get_params()
+    data['status_url'] = url_for('jobs.job_status', id=job.id)
+    data['download_url'] = url_for('jobs.download_job', id=job.id) \
+        if job.status == 'completed' and job.result_path else None
+    return data
+
+def _get_job(id):
+    """Get a job the current user may see; other users' jobs are hidden unless an admin asks"""
+    job = db.session.get(Job, id)
+    if job is None or (job.created_by_id != current_user.id and not current_user.can_edit_users()):
+        abort(404, f'Job {id} not found')
+    return job
+
+@jobs_bp.route('/')
+@login_required
+def list_jobs():
+    """Get the current user's recent jobs, optionally ?kind= and ?status="""
+    query = Job.query.filter_by(created_by_id=current_user.id)
+    for field in ('kind', 'status'):
+        if request.args.get(field):
+            query = query.filter(getattr(Job, field) == request.args[field])
+    jobs = query.order_by(Job.id.desc()).limit(50).all()
+    return jsonify({'items': [job_to_dict(job) for job in jobs]})
+
+@jobs_bp.route('/', methods=['POST'])
+@login_required
+def create_job():
+    """Queue a job from a JSON body {"kind": ..., "params": {...}}"""
+    data = request.get_json(silent=True) or {}
+    kind, params = data.get('kind'), data.get('params') or {}
+    if kind not in job_queue.JOB_TYPES:
+        abort(400, f"kind must be one of: {', '.join(job_queue.JOB_TYPES)}")
+    if not isinstance(params, dict):
+        abort(400, 'params must be an object')
+    permission = job_queue.JOB_TYPES[kind][2]
+    if permission and not getattr(current_user, permission)():
+        abort(403, f'You do not have permission to run {kind} jobs')
+    try:
+        job = job_queue.enqueue(kind, params, current_user)
+    except ValueError as error:
+        abort(400, str(error))
+    response = jsonify(job_to_dict(job))
+    response.status_code = 202
+    response.headers['Location'] = url_for('jobs.job_status', id=job.id)
+    return response
+
+@jobs_bp.route('/<int:id>')
+@login_required
+def job_status(id):
+    """Get a job's status and progress"""
+    return jsonify(job_to_dict(_get_job(id)))
+
+@jobs_bp.route('/<int:id>/cancel', methods=['POST'])
+@login_required
+def cancel(id):
+    """Cancel a queued job, or ask a running one to stop at its next progress report"""
+    job = _get_job(id)
+    if not job_queue.cancel_job(job.id):
+        abort(409, f'Job {id} is already {job.status}')
+    db.session.expire(job)
+    response = jsonify(job_to_dict(job))
+    response.status_code = 202
+    return response
+
+@jobs_bp.route('/<int:id>/download')
+@login_required
+def download_job(id):
+    """Download a completed job's result file"""
+    job = _get_job(id)
+    if job.status == 'expired':
+        abort(410, f'The result of job {id} has expired')
+    if job.status != 'completed' or not job.result_path or not os.path.exists(job.result_path):
+        abort(404, f'Job {id} has no result to download')
+    return send_file(job.result_path, mimetype=job.result_mimetype, as_attachment=True,
+                     download_name=job.result_name, max_age=0)
@@ -3,12 +3,27 @@ HomeCare Management System - Main Routes
 Professional Care Coordination Platform
 """
 
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
+from flask import (Blueprint, Response, abort, current_app, render_template, request, jsonify, flash, redirect,
+                   stream_with_context, url_for)
 from flask_login import login_required, current_user
-from models import db, Client, CareAction, ScheduledTask, CareTask, User
+from models import db, Client, CareAction, ScheduledTask, CareTask, User, Job, MedicalAssessment, ClientRiskScore
+from sqlalchemy.orm import joinedload
+from services.cache import get_cache, cache_stats
+from services.pool import pool_stats
+from services.http_cache import not_modified
+from services.imports import lazy_import
 from datetime import datetime, timedelta
 import json
 
+# WTForms and its validators load on the first form request
+forms = lazy_import('forms')
+# Metrics code loads on first use rather than at worker boot
+care_metrics = lazy_import('services.metrics')
+exports = lazy_import('services.exports')
+jobs = lazy_import('services.jobs')
+vitals = lazy_import('services.vitals')
+risk = lazy_import('services.risk')
+
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/')
@@ -16,24 +31,29 @@ main_bp = Blueprint('main', __name__)
 @login_required
 def dashboard():
     """Main dashboard"""
+    today = datetime.now().date()
+    snapshot = get_cache('dashboard').get_or_build(today.isoformat(), lambda: build_dashboard_snapshot(today))
+    return render_template('dashboard.html', **snapshot)
+
+def build_dashboard_snapshot(today):
+    """Build the dashboard data as plain values that can be cached"""
     # Get recent data
     recent_clients = Client.query.filter_by(status='active').order_by(Client.created_at.desc()).limit(5).all()
-    recent_actions = CareAction.query.order_by(CareAction.action_date.desc()).limit(10).all()
-    upcoming_tasks = ScheduledTask.query.filter(
+    recent_actions = CareAction.query.options(
+        joinedload(CareAction.client),
+        joinedload(CareAction.performed_by)
+    ).order_by(CareAction.action_date.desc()).limit(10).all()
+    upcoming_tasks = ScheduledTask.query.options(
+        joinedload(ScheduledTask.client),
+        joinedload(ScheduledTask.assigned_to)
+    ).filter(
         ScheduledTask.status == 'pending',
-        ScheduledTask.scheduled_date >= datetime.now().date()
+        ScheduledTask.scheduled_date >= today
     ).order_by(ScheduledTask.scheduled_date.asc()).limit(10).all()
     
     # Get statistics
-    total_clients = Client.query.filter_by(status='active').count()
-    total_actions_today = CareAction.query.filter(
-        CareAction.action_date == datetime.now().date()
-    ).count()
-    pending_tasks = ScheduledTask.query.filter_by(status='pending').count()
-    urgent_tasks = ScheduledTask.query.filter(
-        ScheduledTask.priority == 'urgent',
-        ScheduledTask.status == 'pending'
-    ).count()
+    totals = care_metrics.calculate_totals(['active_clients', 'pending_tasks', 'urgent_tasks'])
+    totals.update(care_metrics.calculate_totals(['care_actions'], today, today))
     
     # Get care level distribution
     care_levels = db.session.query(
@@ -64,16 +84,39 @@ def dashboard():
     # Sort by date
     recent_activity.sort(key=lambda x: x['date'], reverse=True)
     
-    return render_template('dashboard.html',
-                         recent_clients=recent_clients,
-                         recent_actions=recent_actions,
-                         upcoming_tasks=upcoming_tasks,
-                         total_clients=total_clients,
-                         total_actions_today=total_actions_today,
-                         pending_tasks=pending_tasks,
-                         urgent_tasks=urgent_tasks,
-                         care_levels=care_levels,
-                         recent_activity=recent_activity)
+    return {
+        'recent_clients': [{
+            'id': client.id,
+            'name': client.name,
+            'care_level': client.care_level,
+            'care_level_class': client.get_care_level_class(),
+            'status': client.status,
+            'status_class': client.get_status_class()
+        } for client in recent_clients],
+        'recent_actions': [{
+            'id': action.id,
+            'task_name': action.task_name,
+            'client_name': action.client.name,
+            'action_date': action.action_date,
+            'priority': action.priority,
+            'priority_class': action.get_priority_class()
+        } for action in recent_actions],
+        'upcoming_tasks': [{
+            'id': task.id,
+            'task_name': task.task_name,
+            'client_name': task.client.name,
+            'scheduled_date': task.scheduled_date,
+            'scheduled_time': task.scheduled_time,
+            'priority': task.priority,
+            'priority_class': task.get_priority_class()
+        } for task in upcoming_tasks],
+        'total_clients': totals['active_clients'],
+        'total_actions_today': totals['care_actions'],
+        'pending_tasks': totals['pending_tasks'],
+        'urgent_tasks': totals['urgent_tasks'],
+        'care_levels': [tuple(row) for row in care_levels],
+        'recent_activity': recent_activity
+    }
 
 @main_bp.route('/analytics')
 @login_required
@@ -91,11 +134,8 @@ def analytics():
         start_date = (datetime.now() - timedelta(days=30)).date()
         end_date = datetime.now().date()
     
-    # Get clients for the organization
-    clients = Client.query.filter_by(status='active').all()
-    
     # Calculate metrics
-    metrics = calculate_care_metrics(clients, start_date, end_date, group_by)
+    metrics = care_metrics.calculate_care_metrics(start_date, end_date, group_by)
     
     return render_template('analytics.html',
                          start_date=start_date,
@@ -103,70 +143,149 @@ def analytics():
                          group_by=group_by,
                          metrics=metrics)
 
-def calculate_care_metrics(clients, start_date, end_date, group_by):
-    """Calculate care metrics for analytics"""
-    data = {
-        'active_clients': [],
-        'care_actions': [],
-        'scheduled_tasks': [],
-        'urgent_cases': []
-    }
-    
-    if group_by == 'days':
-        current = start_date
-        while current <= end_date:
-            next_day = current + timedelta(days=1)
-            
-            # Calculate metrics for this day
-            active_clients = len([c for c in clients if c.created_at.date() <= current])
-            
-            care_actions = CareAction.query.filter(
-                CareAction.action_date >= current,
-                CareAction.action_date < next_day
-            ).count()
-            
-            scheduled_tasks = ScheduledTask.query.filter(
-                ScheduledTask.scheduled_date >= current,
-                ScheduledTask.scheduled_date < next_day
-            ).count()
-            
-            urgent_cases = len([c for c in clients if c.care_level == 'urgent'])
-            
-            data['active_clients'].append({
-                'date': current.strftime('%Y-%m-%d'),
-                'value': active_clients
-            })
-            data['care_actions'].append({
-                'date': current.strftime('%Y-%m-%d'),
-                'value': care_actions
-            })
-            data['scheduled_tasks'].append({
-                'date': current.strftime('%Y-%m-%d'),
-                'value': scheduled_tasks
-            })
-            data['urgent_cases'].append({
-                'date': current.strftime('%Y-%m-%d'),
-                'value': urgent_cases
-            })
-            
-            current = next_day
-    
-    return data
-
 @main_bp.route('/api/stats')
 @login_required
 def api_stats():
     """API endpoint for dashboard statistics"""
+    today = datetime.now().date()
+    cached = not_modified(Client, ScheduledTask, CareAction.query.filter(CareAction.action_date == today))
+    if cached:
+        return cached
+    totals = care_metrics.calculate_totals(['active_clients', 'pending_tasks', 'urgent_tasks'])
+    totals.update(care_metrics.calculate_totals(['care_actions'], today, today))
+    
     stats = {
-        'total_clients': Client.query.filter_by(status='active').count(),
-        'total_actions_today': CareAction.query.filter(
-            CareAction.action_date == datetime.now().date()
-        ).count(),
-        'pending_tasks': ScheduledTask.query.filter_by(status='pending').count(),
-        'urgent_tasks': ScheduledTask.query.filter(
-            ScheduledTask.priority == 'urgent',
-            ScheduledTask.status == 'pending'
-        ).count()
+        'total_clients': totals['active_clients'],
+        'total_actions_today': totals['care_actions'],
+        'pending_tasks': totals['pending_tasks'],
+        'urgent_tasks': totals['urgent_tasks']
     }
     
     return jsonify(stats)
+
+@main_bp.route('/api/vitals-trends')
+@login_required
+def api_vitals_trends():
+    """API endpoint for per-client vitals trends and sparklines, deteriorating clients first
+    
+    Takes ?days= of history, ?client_id= (repeatable) and ?flagged=1 for
+    deteriorating clients only.
+    """
+    config = current_app.config
+    days = min(request.args.get('days', config['VITALS_TREND_DAYS'], type=int) or config['VITALS_TREND_DAYS'], 3650)
+    client_ids = request.args.getlist('client_id', type=int) or None
+    
+    assessments = MedicalAssessment.query.filter(
+        MedicalAssessment.assessment_date >= datetime.now().date() - timedelta(days=days))
+    if client_ids:
+        assessments = assessments.filter(MedicalAssessment.client_id.in_(client_ids))
+    cached = not_modified(assessments)
+    if cached:
+        return cached
+    
+    summaries = vitals.vitals_trends(days, client_ids, flagged_only=request.args.get('flagged') == '1',
+                                     window=config['VITALS_ROLLING_WINDOW'],
+                                     sparkline_points=config['VITALS_SPARKLINE_POINTS'])
+    return jsonify({
+        'days': days,
+        'deteriorating': sum(1 for summary in summaries if summary['deteriorating']),
+        'clients': summaries
+    })
+
+@main_bp.route('/api/at-risk')
+@login_required
+def api_at_risk():
+    """API endpoint ranking active clients by their stored early-warning score
+    
+    Takes ?limit= and ?level= to list only clients at that risk level or
+    above (low_medium, medium or high).
+    """
+    config = current_app.config
+    limit = min(request.args.get('limit', config['RISK_LIST_LIMIT'], type=int) or config['RISK_LIST_LIMIT'], 500)
+    scores = ClientRiskScore.query.join(Client, Client.id == ClientRiskScore.client_id) \
+        .filter(Client.status == 'active')
+    level = request.args.get('level')
+    if level:
+        if level not in risk.RISK_LEVELS:
+            return jsonify({'error': f"level must be one of: {', '.join(risk.RISK_LEVELS)}"}), 400
+        scores = scores.filter(ClientRiskScore.risk_level.in_(risk.RISK_LEVELS[risk.RISK_LEVELS.index(level):]))
+    cached = not_modified(scores, Client)
+    if cached:
+        return cached
+    
+    level_rank = db.case({name: rank for rank, name in enumerate(risk.RISK_LEVELS)},
+                         value=ClientRiskScore.risk_level)
+    ranked = scores.with_entities(ClientRiskScore, Client.name) \
+        .order_by(level_rank.desc(), ClientRiskScore.score.desc(), ClientRiskScore.client_id) \
+        .limit(limit).all()
+    return jsonify({'clients': [risk.score_to_dict(score, name) for score, name in ranked]})
+
+@main_bp.route('/api/cache-stats')
+@login_required
+def api_cache_stats():
+    """API endpoint for snapshot cache hit and miss counters"""
+    return jsonify(cache_stats())
+
+@main_bp.route('/api/pool-stats')
+@login_required
+def api_pool_stats():
+    """API endpoint for connection pool occupancy and checkout waits"""
+    return jsonify(pool_stats())
+
+@main_bp.route('/export', methods=['GET', 'POST'])
+@login_required
+def export_data():
+    """Choose what to export; the download itself streams from download_export"""
+    if not current_user.can_export_data():
+        flash('You do not have permission to export data', 'error')
+        return redirect(url_for('main.dashboard'))
+    
+    form = forms.ExportForm()
+    if form.validate_on_submit():
+        if form.background.data:
+            job = jobs.enqueue('export', {
+                'export_type': form.export_type.data,
+                'export_format': form.format.data,
+                'date_from': form.date_from.data,
+                'date_to': form.date_to.data,
+                'include_archived': form.include_archived.data
+            }, current_user)
+            flash(f'Export queued as job {job.id}; it will be listed below when ready', 'success')
+            return redirect(url_for('main.export_data'))
+        return redirect(url_for('main.download_export',
+                                export_type=form.export_type.data,
+                                export_format=form.format.data,
+                                date_from=form.date_from.data.isoformat() if form.date_from.data else None,
+                                date_to=form.date_to.data.isoformat() if form.date_to.data else None,
+                                include_archived=1 if form.include_archived.data else None))
+    
+    recent_jobs = Job.query.filter_by(created_by_id=current_user.id, kind='export') \
+        .order_by(Job.id.desc()).limit(10).all()
+    return render_template('export.html', form=form, jobs=recent_jobs)
+
+@main_bp.route('/export/<export_type>.<export_format>')
+@login_required
+def download_export(export_type, export_format):
+    """Stream an export as it is read from the database
+    
+    Takes ?date_from= and ?date_to= (YYYY-MM-DD) and ?include_archived=1.
+    """
+    if not current_user.can_export_data():
+        flash('You do not have permission to export data', 'error')
+        return redirect(url_for('main.dashboard'))
+    if export_type not in exports.EXPORTS or export_format not in exports.FORMATS:
+        abort(404)
+    
+    try:
+        date_from, date_to = [datetime.strptime(request.args[name], '%Y-%m-%d').date() if request.args.get(name) else None
+                              for name in ('date_from', 'date_to')]
+    except ValueError:
+        flash('Export dates must be in YYYY-MM-DD format', 'error')
+        return redirect(url_for('main.export_data'))
+    
+    chunks, mimetype, filename = exports.stream_export(
+        export_type, export_format, date_from, date_to,
+        include_archived=request.args.get('include_archived') == '1',
+        batch_size=current_app.config['EXPORT_BATCH_SIZE'])
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
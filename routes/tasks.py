@@ -3,11 +3,22 @@ HomeCare Management System - Task Routes
 Professional Care Coordination Platform
 """
 
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
+from flask import Blueprint, current_app, render_template, request, jsonify, flash, redirect, url_for
 from flask_login import login_required, current_user
-from models import db, ScheduledTask, Client, CareTask, User
-from forms import ScheduledTaskForm, QuickScheduleForm
-from datetime import datetime, timedelta
+from models import db, Client, User, ScheduledTask
+from services.http_cache import not_modified
+from services.imports import lazy_import
+from services.ingest import PRIORITIES, ingest_scheduled_tasks
+from services.pagination import paginate_request
+from services.reference import reference_data, get_care_task, populate_choices
+from services.serializers import model_to_dict, to_json_value, wants_json
+from datetime import date, datetime, timedelta
+
+# WTForms and its validators load on the first form request
+forms = lazy_import('forms')
+assignment = lazy_import('services.assignment')
+recurrence = lazy_import('services.recurrence')
+route_planner = lazy_import('services.route_planner')
 
 tasks_bp = Blueprint('tasks', __name__)
 
@@ -15,7 +26,6 @@ tasks_bp = Blueprint('tasks', __name__)
 @login_required
 def list_tasks():
     """List all scheduled tasks"""
-    page = request.args.get('page', 1, type=int)
     per_page = 20
     
     # Get filter parameters
@@ -55,12 +65,18 @@ def list_tasks():
         except ValueError:
             pass
     
-    tasks = query.order_by(ScheduledTask.scheduled_date.asc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
+    cached = not_modified(query, Client, User)
+    if cached:
+        return cached
+    
+    tasks = paginate_request(query, [(ScheduledTask.scheduled_date, False), (ScheduledTask.id, False)], per_page)
+    
+    if wants_json():
+        return jsonify(tasks.to_dict(model_to_dict))
     
     # Get filter options
-    clients = Client.query.filter_by(status='active').order_by(Client.name).all()
-    users = User.query.filter_by(is_active=True).order_by(User.first_name, User.last_name).all()
+    clients = reference_data().clients
+    users = reference_data().caregivers
     
     return render_template('tasks/list.html',
                          tasks=tasks,
@@ -77,20 +93,16 @@ def list_tasks():
 @login_required
 def add_task():
     """Add new scheduled task"""
-    form = ScheduledTaskForm()
-    
-    # Populate choices
-    form.client_id.choices = [(c.id, c.name) for c in Client.query.filter_by(status='active').order_by(Client.name).all()]
-    form.assigned_to_id.choices = [(u.id, u.get_full_name()) for u in User.query.filter_by(is_active=True).order_by(User.first_name, User.last_name).all()]
-    form.task_id.choices = [(t.id, f"{t.name} ({t.category})") for t in CareTask.query.filter_by(is_active=True).order_by(CareTask.name).all()]
+    form = populate_choices(forms.ScheduledTaskForm())
     
     if form.validate_on_submit():
+        care_task = get_care_task(form.task_id.data)
         task = ScheduledTask(
             client_id=form.client_id.data,
             assigned_to_id=form.assigned_to_id.data,
             task_id=form.task_id.data,
-            task_name=CareTask.query.get(form.task_id.data).name,
-            task_category=CareTask.query.get(form.task_id.data).category,
+            task_name=care_task.name,
+            task_category=care_task.category,
             scheduled_date=form.scheduled_date.data,
             scheduled_time=form.scheduled_time.data,
             priority=form.priority.data,
@@ -109,6 +121,10 @@ def add_task():
 @login_required
 def view_task(id):
     """View scheduled task details"""
+    cached = not_modified(ScheduledTask.query.filter_by(id=id),
+                          Client.query.filter(Client.id.in_(db.select(ScheduledTask.client_id).filter_by(id=id))))
+    if cached:
+        return cached
     task = ScheduledTask.query.get_or_404(id)
     return render_template('tasks/view.html', task=task)
 
@@ -117,19 +133,15 @@ def view_task(id):
 def edit_task(id):
     """Edit scheduled task"""
     task = ScheduledTask.query.get_or_404(id)
-    form = ScheduledTaskForm(obj=task)
-    
-    # Populate choices
-    form.client_id.choices = [(c.id, c.name) for c in Client.query.filter_by(status='active').order_by(Client.name).all()]
-    form.assigned_to_id.choices = [(u.id, u.get_full_name()) for u in User.query.filter_by(is_active=True).order_by(User.first_name, User.last_name).all()]
-    form.task_id.choices = [(t.id, f"{t.name} ({t.category})") for t in CareTask.query.filter_by(is_active=True).order_by(CareTask.name).all()]
+    form = populate_choices(forms.ScheduledTaskForm(obj=task))
     
     if form.validate_on_submit():
+        care_task = get_care_task(form.task_id.data)
         task.client_id = form.client_id.data
         task.assigned_to_id = form.assigned_to_id.data
         task.task_id = form.task_id.data
-        task.task_name = CareTask.query.get(form.task_id.data).name
-        task.task_category = CareTask.query.get(form.task_id.data).category
+        task.task_name = care_task.name
+        task.task_category = care_task.category
         task.scheduled_date = form.scheduled_date.data
         task.scheduled_time = form.scheduled_time.data
         task.priority = form.priority.data
@@ -201,10 +213,7 @@ def delete_task(id):
 @login_required
 def quick_schedule():
     """Quick task scheduling"""
-    form = QuickScheduleForm()
-    
-    # Populate choices
-    form.client_id.choices = [(c.id, c.name) for c in Client.query.filter_by(status='active').order_by(Client.name).all()]
+    form = populate_choices(forms.QuickScheduleForm())
     
     if form.validate_on_submit():
         task_ids = [int(tid.strip()) for tid in form.task_ids.data.split(',') if tid.strip()]
@@ -213,45 +222,184 @@ def quick_schedule():
             flash('Please select at least one task', 'error')
             return redirect(url_for('tasks.quick_schedule'))
         
-        # Create tasks for each selected task
-        created_count = 0
-        for task_id in task_ids:
-            task = CareTask.query.get(task_id)
-            if task:
-                scheduled_task = ScheduledTask(
-                    client_id=form.client_id.data,
-                    assigned_to_id=current_user.id,
-                    task_id=task.id,
-                    task_name=task.name,
-                    task_category=task.category,
-                    scheduled_date=form.scheduled_date.data,
-                    scheduled_time=form.scheduled_time.data,
-                    priority=form.priority.data,
-                    notes=form.notes.data
-                )
-                db.session.add(scheduled_task)
-                created_count += 1
-        
+        # Create tasks for each selected task in one insert
+        rows = [{
+            'client_id': form.client_id.data,
+            'task_id': task_id,
+            'scheduled_date': form.scheduled_date.data,
+            'scheduled_time': form.scheduled_time.data,
+            'priority': form.priority.data,
+            'notes': form.notes.data
+        } for task_id in task_ids]
+        result = ingest_scheduled_tasks(rows, current_user.id)
         db.session.commit()
-        flash(f'{created_count} tasks have been scheduled successfully!', 'success')
+        
+        if result.errors:
+            flash(f"{len(result.errors)} tasks could not be scheduled: {result.errors[0]['errors'][0]}", 'error')
+        if not result.created:
+            return redirect(url_for('tasks.quick_schedule'))
+        flash(f'{len(result.created)} tasks have been scheduled successfully!', 'success')
         return redirect(url_for('tasks.list_tasks'))
     
     # Get tasks for selection
-    tasks = CareTask.query.filter_by(is_active=True).order_by(CareTask.category, CareTask.name).all()
+    tasks = reference_data().tasks_by_category
     
     return render_template('tasks/quick_schedule.html', form=form, tasks=tasks)
 
+@tasks_bp.route('/batch', methods=['POST'])
+@login_required
+def batch_schedule():
+    """Schedule a batch of tasks from JSON in one request"""
+    payload = request.get_json(silent=True)
+    rows = payload.get('tasks') if isinstance(payload, dict) else None
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        return jsonify({'error': 'Expected a JSON object with a "tasks" list'}), 400
+    if len(rows) > current_app.config['BULK_INGEST_MAX_ROWS']:
+        return jsonify({'error': f"At most {current_app.config['BULK_INGEST_MAX_ROWS']} tasks per batch"}), 400
+    
+    result = ingest_scheduled_tasks(rows, current_user.id, atomic=bool(payload.get('atomic')))
+    db.session.commit()
+    
+    return jsonify(result.to_dict()), 201 if result.created else 400
+
+@tasks_bp.route('/occurrences')
+@login_required
+def plan_occurrences():
+    """Preview the care plan occurrences of a window without scheduling them
+    
+    Takes ?start= (YYYY-MM-DD, default today), ?days= and ?client_id=
+    (repeatable). Occurrences already generated give their scheduled_task_id.
+    """
+    config = current_app.config
+    try:
+        start = date.fromisoformat(request.args['start']) if request.args.get('start') else datetime.now().date()
+    except ValueError:
+        return jsonify({'error': 'start must be a YYYY-MM-DD date'}), 400
+    days = min(request.args.get('days', config['SCHEDULE_HORIZON_DAYS'], type=int) or config['SCHEDULE_HORIZON_DAYS'],
+               config['SCHEDULE_PREVIEW_MAX_DAYS'])
+    end = start + timedelta(days=days - 1)
+    client_ids = request.args.getlist('client_id', type=int) or None
+    
+    generated = recurrence.materialized_occurrences(start, end, client_ids)
+    occurrences = []
+    for occurrence in recurrence.expand_occurrences(start, end, client_ids):
+        occurrence['scheduled_task_id'] = generated.get((occurrence['care_plan_task_id'],
+                                                         occurrence['occurrence_date']))
+        occurrences.append({name: to_json_value(value) for name, value in occurrence.items()})
+    return jsonify({'start': start.isoformat(), 'end': end.isoformat(), 'occurrences': occurrences})
+
+@tasks_bp.route('/occurrences/exceptions', methods=['POST'])
+@login_required
+def occurrence_exception():
+    """Skip, override or restore one care plan occurrence from JSON
+    
+    Takes care_plan_task_id, occurrence_date and action (skip, override or
+    clear); overrides may give scheduled_date, scheduled_time (HH:MM),
+    assigned_to_id, priority and notes.
+    """
+    if not current_user.can_plan_schedules():
+        return jsonify({'error': 'You do not have permission to change planned visits'}), 403
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    action = data.get('action')
+    if action not in ('skip', 'override', 'clear'):
+        return jsonify({'error': 'action must be one of skip, override, clear'}), 400
+    try:
+        plan_task_id = int(data['care_plan_task_id'])
+        occurrence_date = date.fromisoformat(data['occurrence_date'])
+        overrides = {
+            'scheduled_date': date.fromisoformat(data['scheduled_date']) if data.get('scheduled_date') else None,
+            'scheduled_time': datetime.strptime(data['scheduled_time'], '%H:%M').time()
+            if data.get('scheduled_time') else None,
+            'assigned_to_id': int(data['assigned_to_id']) if data.get('assigned_to_id') else None,
+            'priority': data.get('priority') or None,
+            'notes': data.get('notes') or None
+        }
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'care_plan_task_id and occurrence_date are required; '
+                                 'dates are YYYY-MM-DD and times HH:MM'}), 400
+    if overrides['priority'] not in (None,) + PRIORITIES:
+        return jsonify({'error': f"priority must be one of {', '.join(PRIORITIES)}"}), 400
+    if overrides['assigned_to_id'] and db.session.get(User, overrides['assigned_to_id']) is None:
+        return jsonify({'error': f"user {overrides['assigned_to_id']} does not exist"}), 400
+    
+    try:
+        exception, task = recurrence.set_occurrence_exception(plan_task_id, occurrence_date,
+                                                              None if action == 'clear' else action,
+                                                              current_user.id, **overrides)
+    except ValueError as error:
+        db.session.rollback()
+        return jsonify({'error': str(error)}), 400
+    db.session.flush()
+    # Serialized before the commit expires them
+    result = {
+        'exception': model_to_dict(exception) if exception else None,
+        'scheduled_task': model_to_dict(task) if task else None
+    }
+    db.session.commit()
+    return jsonify(result)
+
+@tasks_bp.route('/route')
+@login_required
+def caregiver_route():
+    """Suggest the order of a caregiver's visits for a day
+    
+    Takes ?caregiver= (default: the current user; others' routes need
+    schedule planning rights), ?date= (YYYY-MM-DD, default today), ?start=
+    (HH:MM) and ?start_lat=&start_lng= for where the caregiver sets out.
+    """
+    caregiver_id = request.args.get('caregiver', current_user.id, type=int)
+    if caregiver_id != current_user.id and not current_user.can_plan_schedules():
+        return jsonify({'error': "You do not have permission to plan other caregivers' routes"}), 403
+    try:
+        day = date.fromisoformat(request.args['date']) if request.args.get('date') else datetime.now().date()
+        start_time = datetime.strptime(request.args['start'], '%H:%M').time() if request.args.get('start') else None
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD and start HH:MM'}), 400
+    start_lat = request.args.get('start_lat', type=float)
+    start_lng = request.args.get('start_lng', type=float)
+    start_location = (start_lat, start_lng) if start_lat is not None and start_lng is not None else None
+    return jsonify(route_planner.caregiver_route(caregiver_id, day, start_time, start_location))
+
+@tasks_bp.route('/assignments')
+@login_required
+def propose_assignments():
+    """Propose caregivers for a day's visits without changing any task
+    
+    Takes ?date= (YYYY-MM-DD, default today) and ?scope=unstaffed (visits
+    whose caregiver is no longer available, the default) or all; repeated
+    ?task_id= plans just the visits of those tasks.
+    """
+    if not current_user.can_plan_schedules():
+        return jsonify({'error': 'You do not have permission to assign visits'}), 403
+    try:
+        day = date.fromisoformat(request.args['date']) if request.args.get('date') else datetime.now().date()
+    except ValueError:
+        return jsonify({'error': 'date must be a YYYY-MM-DD date'}), 400
+    scope = request.args.get('scope', 'unstaffed')
+    if scope not in assignment.SCOPES:
+        return jsonify({'error': f"scope must be one of {', '.join(assignment.SCOPES)}"}), 400
+    task_ids = request.args.getlist('task_id', type=int) or None
+    return jsonify(assignment.propose_assignments(day, scope, task_ids))
+
 @tasks_bp.route('/overdue')
 @login_required
 def overdue_tasks():
     """List overdue tasks"""
-    page = request.args.get('page', 1, type=int)
     per_page = 20
     
-    overdue_tasks = ScheduledTask.query.filter(
+    query = ScheduledTask.query.filter(
         ScheduledTask.status == 'pending',
         ScheduledTask.scheduled_date < datetime.now().date()
-    ).order_by(ScheduledTask.scheduled_date.asc())\
-    .paginate(page=page, per_page=per_page, error_out=False)
+    )
+    cached = not_modified(query)
+    if cached:
+        return cached
+    overdue_tasks = paginate_request(query, [(ScheduledTask.scheduled_date, False), (ScheduledTask.id, False)],
+                                     per_page)
+    
+    if wants_json():
+        return jsonify(overdue_tasks.to_dict(model_to_dict))
     
     return render_template('tasks/overdue.html', tasks=overdue_tasks)
@@ -0,0 +1,4 @@
+"""
+HomeCare Management System - Services Package
+Professional Care Coordination Platform
+"""
@@ -0,0 +1,484 @@
+"""
+HomeCare Management System - Visit Assignment
+Professional Care Coordination Platform
+
+Proposes caregivers for a day's visits across the whole agency. Each
+visit/caregiver pair gets a cost in minutes: travel from the caregiver's
+usual area plus penalties for missed gender and language preferences, less
+a bonus for a client they already know. Caregivers lacking a required
+skill are ruled out and each has a cap on daily visit minutes. A caregiver
+cannot take two visits whose times overlap once the drive between them is
+added, whether both are proposed or one is a visit they keep.
+
+Visits have different lengths, so the caps make this a generalized
+assignment problem. Like the Hungarian method it works with dual prices:
+each caregiver's minutes get a price, raised while they are overbooked
+(Lagrangian relaxation), so every visit can simply take its cheapest
+caregiver at current prices. The priced assignment is then repaired to
+fit the caps and the visit times and improved with single moves and
+pairwise swaps until the time budget runs out. The prices also give a lower bound on the best
+possible cost, reported with the proposal.
+"""
+
+from datetime import timedelta
+from time import perf_counter
+import numpy as np
+from flask import current_app
+from models import db, Client, CarePlanTask, Employee, ScheduledTask, User
+from services.route_planner import haversine_matrix, minutes, travel_minutes
+
+# How much more leaving a visit unassigned costs, by task priority
+PRIORITY_WEIGHTS = {'normal': 1, 'high': 2, 'urgent': 4}
+
+# Pricing rounds before the assignment is repaired and improved
+PRICING_ROUNDS = 200
+
+# Replan scopes: visits whose caregiver is unavailable, or every pending visit
+SCOPES = ('unstaffed', 'all')
+
+class Caregiver:
+    """A caregiver who can take visits, with what the costs are built from"""
+
+    def __init__(self, user, employee, qualifications, languages):
+        self.id = user.id
+        self.name = user.get_full_name()
+        self.gender = employee.gender if employee else None
+        self.qualifications = qualifications
+        self.languages = languages
+        self.latitude = None
+        self.longitude = None
+        self.kept_minutes = 0
+        self.kept_visits = []
+        self.clients = set()
+
+def load_caregivers(day):
+    """Get the active caregivers with their qualifications, usual area and regular clients
+
+    A caregiver's area is the centre of the clients of their visits in the
+    ASSIGNMENT_HISTORY_DAYS up to the day, weighted by visit count; those
+    clients are their regular clients.
+    """
+    config = current_app.config
+    rows = db.session.execute(
+        db.select(User, Employee).outerjoin(Employee, Employee.user_id == User.id)
+        .where(User.is_active.is_(True), User.status == 'active',
+               User.role.in_(config['ASSIGNMENT_CAREGIVER_ROLES']),
+               db.or_(Employee.id.is_(None), Employee.status == 'active'))
+        .order_by(User.id)).all()
+    caregivers = {}
+    for user, employee in rows:
+        if user.id in caregivers:
+            continue
+        qualifications = set()
+        languages = set()
+        if employee:
+            qualifications = {name.strip().lower()
+                              for name in employee.get_skills_list() + employee.get_certifications_list()}
+            languages = {name.strip().lower() for name in employee.get_languages_list()}
+        caregivers[user.id] = Caregiver(user, employee, qualifications, languages)
+    if not caregivers:
+        return caregivers
+
+    history = db.session.execute(
+        db.select(ScheduledTask.assigned_to_id, ScheduledTask.client_id, db.func.count(),
+                  Client.latitude, Client.longitude)
+        .join(Client, Client.id == ScheduledTask.client_id)
+        .where(ScheduledTask.scheduled_date.between(day - timedelta(days=config['ASSIGNMENT_HISTORY_DAYS']), day),
+               ScheduledTask.status != 'cancelled')
+        .group_by(ScheduledTask.assigned_to_id, ScheduledTask.client_id)).all()
+    areas = {}
+    for caregiver_id, client_id, visits, latitude, longitude in history:
+        caregiver = caregivers.get(caregiver_id)
+        if caregiver is None:
+            continue
+        caregiver.clients.add(client_id)
+        if latitude is not None and longitude is not None:
+            totals = areas.setdefault(caregiver_id, [0.0, 0.0, 0])
+            totals[0] += latitude * visits
+            totals[1] += longitude * visits
+            totals[2] += visits
+    for caregiver_id, (latitudes, longitudes, visits) in areas.items():
+        caregivers[caregiver_id].latitude = latitudes / visits
+        caregivers[caregiver_id].longitude = longitudes / visits
+    return caregivers
+
+def required_skills(task_name, category):
+    """Qualifications of which a caregiver needs one for a task, empty when anyone will do"""
+    required = current_app.config['ASSIGNMENT_REQUIRED_SKILLS']
+    return tuple(name.lower() for name in required.get(task_name) or required.get(category) or ())
+
+def load_visits(day, caregivers, scope='unstaffed', task_ids=None):
+    """Split a day's pending tasks into visits to assign and caregivers' kept minutes
+
+    Tasks for the same client, time and caregiver make one visit. The
+    visits to assign are those with a given task when task_ids are given,
+    else those whose caregiver is unavailable, or all of them for the
+    'all' scope. The rest stay with their caregiver, taking up their minutes
+    and times.
+    """
+    config = current_app.config
+    rows = db.session.execute(
+        db.select(ScheduledTask.id, ScheduledTask.task_name, ScheduledTask.task_category,
+                  ScheduledTask.scheduled_time, ScheduledTask.priority, ScheduledTask.assigned_to_id,
+                  ScheduledTask.client_id, Client.name, Client.latitude, Client.longitude,
+                  Client.preferred_caregiver_gender, Client.preferred_language, CarePlanTask.duration_minutes)
+        .join(Client, Client.id == ScheduledTask.client_id)
+        .outerjoin(CarePlanTask, CarePlanTask.id == ScheduledTask.care_plan_task_id)
+        .where(ScheduledTask.scheduled_date == day, ScheduledTask.status == 'pending')
+        .order_by(ScheduledTask.scheduled_time.is_(None), ScheduledTask.scheduled_time, ScheduledTask.id)).all()
+    visits = {}
+    for row in rows:
+        key = (row.client_id, row.scheduled_time, row.assigned_to_id)
+        visit = visits.get(key)
+        if visit is None:
+            visit = visits[key] = {
+                'client_id': row.client_id, 'client_name': row.name, 'latitude': row.latitude,
+                'longitude': row.longitude, 'preferred_gender': row.preferred_caregiver_gender or None,
+                'preferred_language': row.preferred_language or None, 'scheduled_time': row.scheduled_time,
+                'current_assigned_to_id': row.assigned_to_id, 'priority': 'normal', 'task_ids': [],
+                'task_names': [], 'requirements': set(), 'duration_minutes': 0}
+        visit['task_ids'].append(row.id)
+        visit['task_names'].append(row.task_name)
+        visit['duration_minutes'] += row.duration_minutes or config['ROUTE_VISIT_MINUTES']
+        if PRIORITY_WEIGHTS.get(row.priority, 1) > PRIORITY_WEIGHTS[visit['priority']]:
+            visit['priority'] = row.priority
+        skills = required_skills(row.task_name, row.task_category)
+        if skills:
+            visit['requirements'].add(skills)
+
+    selected = set(task_ids or ())
+    to_assign = []
+    for visit in visits.values():
+        if selected:
+            replan = not selected.isdisjoint(visit['task_ids'])
+        else:
+            replan = scope == 'all' or visit['current_assigned_to_id'] not in caregivers
+        if replan:
+            to_assign.append(visit)
+        elif visit['current_assigned_to_id'] in caregivers:
+            caregiver = caregivers[visit['current_assigned_to_id']]
+            caregiver.kept_minutes += visit['duration_minutes']
+            caregiver.kept_visits.append(visit)
+    return to_assign
+
+def _timings(visits):
+    """Start and end minutes, latitudes and longitudes of visits, NaN when unknown"""
+    timings = np.full((4, len(visits)), np.nan)
+    for index, visit in enumerate(visits):
+        if visit['scheduled_time'] is not None:
+            timings[0, index] = minutes(visit['scheduled_time'])
+            timings[1, index] = timings[0, index] + visit['duration_minutes']
+        if visit['latitude'] is not None and visit['longitude'] is not None:
+            timings[2, index], timings[3, index] = visit['latitude'], visit['longitude']
+    return timings
+
+def visit_clashes(visits, others, config=None):
+    """Which visits one caregiver could not make both of, visits x others
+
+    Two timed visits clash when one does not end, plus the drive to the
+    other, before the other starts. Untimed visits clash with nothing.
+    """
+    config = config or current_app.config
+    clashes = np.zeros((len(visits), len(others)), dtype=bool)
+    if not len(visits) or not len(others):
+        return clashes
+    first, second = _timings(visits), _timings(others)
+    # Without both locations the drive is unknown and counts as none
+    travel = np.nan_to_num(travel_minutes(
+        haversine_matrix(first[2], first[3], second[2], second[3]), config))
+    with np.errstate(invalid='ignore'):
+        # NaN times compare False, so untimed visits never clash
+        return (first[1][:, None] + travel > second[0][None, :]) & \
+            (second[1][None, :] + travel > first[0][:, None])
+
+class AssignmentProblem:
+    """Visit/caregiver costs and capacities, in minutes
+
+    cost[i, j] is the cost of caregiver j taking visit i, infinite when
+    they cannot; leaving visit i unassigned costs unassigned[i]. Visit i
+    lasts duration[i] and caregiver j has capacity[j] minutes left. When
+    clashes[i, k] no caregiver may take both visits i and k.
+    """
+
+    def __init__(self, cost, unassigned, duration, capacity, clashes=None):
+        self.size, self.caregivers = cost.shape
+        # The last column is "unassigned", which never runs out of room
+        self.cost = np.hstack([cost, unassigned[:, None]])
+        self.duration = duration
+        self.capacity = capacity
+        self.clashes = np.zeros((self.size, self.size), dtype=bool) if clashes is None else clashes.copy()
+        np.fill_diagonal(self.clashes, False)
+        self.rows = np.arange(self.size)
+
+    def total(self, assignment):
+        return float(self.cost[self.rows, assignment].sum())
+
+    def loads(self, assignment):
+        taken = assignment < self.caregivers
+        return np.bincount(assignment[taken], weights=self.duration[taken], minlength=self.caregivers)
+
+    def busy(self, assignment):
+        """busy[i, j]: how many of caregiver j's visits clash with visit i; unassigned is never busy"""
+        busy = np.zeros((self.size, self.caregivers + 1), dtype=np.intp)
+        taken = assignment < self.caregivers
+        np.add.at(busy.T, assignment[taken], self.clashes[taken])
+        return busy
+
+    def _place(self, busy, visit, source, target):
+        """Update busy for a visit moving from one caregiver to another"""
+        if source < self.caregivers:
+            busy[:, source] -= self.clashes[:, visit]
+        if target < self.caregivers:
+            busy[:, target] += self.clashes[:, visit]
+
+    def priced(self, prices):
+        """Costs with each caregiver's minutes charged at their price"""
+        costs = self.cost.copy()
+        costs[:, :self.caregivers] += self.duration[:, None] * prices[None, :]
+        return costs
+
+    def price(self, deadline, rounds=PRICING_ROUNDS):
+        """Find caregiver prices by subgradient steps on the Lagrangian dual
+
+        Visit clashes are relaxed away, which keeps the bound valid. Returns the prices giving the best lower bound, that bound and the
+        number of rounds run.
+        """
+        prices = np.zeros(self.caregivers)
+        best_prices, lower_bound = prices, -np.inf
+        finite = self.cost[np.isfinite(self.cost)]
+        step = max(float(np.median(np.abs(finite))), 1.0) / max(float(self.duration.mean()), 1.0)
+        scale = np.maximum(self.capacity, float(self.duration.mean()))
+        done = 0
+        for done in range(1, rounds + 1):
+            costs = self.priced(prices)
+            assignment = np.argmin(costs, axis=1)
+            bound = costs[self.rows, assignment].sum() - prices @ self.capacity
+            if bound > lower_bound:
+                best_prices, lower_bound = prices, bound
+            excess = self.loads(assignment) - self.capacity
+            if not (excess > 0).any() and not (prices[excess < 0] > 0).any():
+                # Every cap holds and only full caregivers are priced: optimal
+                break
+            prices = np.maximum(prices + step / (1 + done / 10) * excess / scale, 0.0)
+            if perf_counter() > deadline:
+                break
+        return best_prices, float(lower_bound), done
+
+    def repair(self, costs):
+        """Give each visit its cheapest caregiver at the given costs that still has room and time
+
+        Visits that lose most by not getting their first choice go first.
+        """
+        order = np.sort(costs, axis=1)
+        regret = order[:, 1] - order[:, 0] if self.caregivers else np.zeros(self.size)
+        room = self.capacity.astype(np.float64).copy()
+        assignment = np.full(self.size, self.caregivers, dtype=np.intp)
+        busy = self.busy(assignment)
+        for visit in np.argsort(-np.nan_to_num(regret, posinf=np.finfo(np.float64).max), kind='stable'):
+            fits = np.append(room >= self.duration[visit], True) & (busy[visit] == 0)
+            choice = int(np.argmin(np.where(fits, costs[visit], np.inf)))
+            assignment[visit] = choice
+            if choice < self.caregivers:
+                room[choice] -= self.duration[visit]
+                self._place(busy, visit, self.caregivers, choice)
+        return assignment
+
+    def move(self, assignment, room, busy):
+        """Move visits to cheaper caregivers with room and time; returns the number moved"""
+        fits = (np.append(room, np.inf)[None, :] >= self.duration[:, None]) & (busy == 0)
+        gains = np.where(fits, self.cost[self.rows, assignment][:, None] - self.cost, -np.inf)
+        targets = np.argmax(gains, axis=1)
+        best = gains[self.rows, targets]
+        moved = 0
+        for visit in np.flatnonzero(best > 1e-9)[np.argsort(-best[best > 1e-9], kind='stable')]:
+            target = targets[visit]
+            if target < self.caregivers and (room[target] < self.duration[visit] or busy[visit, target]):
+                continue
+            source = assignment[visit]
+            if source < self.caregivers:
+                room[source] += self.duration[visit]
+            if target < self.caregivers:
+                room[target] -= self.duration[visit]
+            self._place(busy, visit, source, target)
+            assignment[visit] = target
+            moved += 1
+        return moved
+
+    def swap(self, assignment, room, busy):
+        """Exchange visits between caregivers where both fit and the total drops
+
+        Applies the best non-overlapping swaps found; returns how many.
+        """
+        current = self.cost[self.rows, assignment]
+        crossed = self.cost[:, assignment]  # crossed[i, k]: visit i taking k's caregiver
+        with np.errstate(invalid='ignore'):
+            gains = current[:, None] + current[None, :] - crossed - crossed.T
+        slack = np.append(room, np.inf)[assignment]
+        exchange = self.duration[None, :] - self.duration[:, None]  # k's minutes less i's
+        fits = (slack[:, None] - exchange >= 0) & (slack[None, :] + exchange >= 0)
+        # Visit i joins k's caregiver as k leaves, so a clash with k itself does not count
+        joining = busy[:, assignment] - self.clashes
+        fits &= (joining <= 0) & (joining.T <= 0)
+        gains = np.where(fits & (assignment[:, None] != assignment[None, :]), gains, -np.inf)
+        gains[np.isnan(gains)] = -np.inf
+        first, second = np.nonzero(np.triu(gains > 1e-9, 1))
+        if not len(first):
+            return 0
+        touched = set()
+        swapped = 0
+        for index in np.argsort(-gains[first, second], kind='stable'):
+            i, k = int(first[index]), int(second[index])
+            a, b = int(assignment[i]), int(assignment[k])
+            if a in touched or b in touched:
+                continue
+            touched.update((a, b))
+            difference = self.duration[k] - self.duration[i]
+            if a < self.caregivers:
+                room[a] -= difference
+            if b < self.caregivers:
+                room[b] += difference
+            self._place(busy, i, a, b)
+            self._place(busy, k, b, a)
+            assignment[i], assignment[k] = b, a
+            swapped += 1
+        return swapped
+
+    def improve(self, assignment, deadline):
+        """Apply moves and swaps until neither helps or time runs out"""
+        room = self.capacity - self.loads(assignment)
+        busy = self.busy(assignment)
+        while perf_counter() < deadline:
+            if not self.move(assignment, room, busy) and \
+                    (perf_counter() >= deadline or not self.swap(assignment, room, busy)):
+                break
+        return assignment
+
+    def solve(self, time_budget):
+        """Get (assignment, cost, lower bound, pricing rounds); caregivers index 0..n-1, n is unassigned"""
+        deadline = perf_counter() + time_budget
+        if not self.size:
+            return np.zeros(0, dtype=np.intp), 0.0, 0.0, 0
+        prices, lower_bound, rounds = self.price(perf_counter() + time_budget / 2)
+        assignment = self.improve(self.repair(self.priced(prices)), deadline)
+        return assignment, self.total(assignment), lower_bound, rounds
+
+def visit_costs(visits, caregivers):
+    """Build the cost matrix and the parts explaining it
+
+    Returns (cost, distance km, gender mismatch, language mismatch, regular
+    client, qualified), each visits x caregivers.
+    """
+    config = current_app.config
+    count = len(caregivers)
+    based = np.array([caregiver.latitude is not None for caregiver in caregivers])
+    located = np.array([visit['latitude'] is not None and visit['longitude'] is not None for visit in visits])
+    distance = np.full((len(visits), count), np.nan)
+    if based.any() and located.any():
+        distance[np.ix_(located, based)] = haversine_matrix(
+            [visit['latitude'] for visit in visits if visit['latitude'] is not None and visit['longitude'] is not None],
+            [visit['longitude'] for visit in visits if visit['latitude'] is not None and visit['longitude'] is not None],
+            [caregiver.latitude for caregiver in caregivers if caregiver.latitude is not None],
+            [caregiver.longitude for caregiver in caregivers if caregiver.latitude is not None])
+    # Unknown distances cost the visit's average, so they neither win nor lose
+    known = ~np.isnan(distance)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        average = np.where(known.any(axis=1), np.nansum(distance, axis=1) / known.sum(axis=1), 0.0)
+    travel = travel_minutes(np.where(known, distance, average[:, None]), config)
+
+    genders = np.array([caregiver.gender or '' for caregiver in caregivers], dtype=object)
+    preferred = np.array([visit['preferred_gender'] or '' for visit in visits], dtype=object)
+    gender_miss = (preferred[:, None] != '') & (preferred[:, None] != genders[None, :])
+
+    language_miss = np.zeros((len(visits), count), dtype=bool)
+    for language in {visit['preferred_language'] for visit in visits} - {None}:
+        speaks = np.array([language.strip().lower() in caregiver.languages for caregiver in caregivers], dtype=bool)
+        rows = np.array([visit['preferred_language'] == language for visit in visits])
+        language_miss[rows] = ~speaks
+
+    regular = np.array([[visit['client_id'] in caregiver.clients for caregiver in caregivers]
+                        for visit in visits], dtype=bool).reshape(len(visits), count)
+
+    qualified = np.ones((len(visits), count), dtype=bool)
+    eligible = {}
+    for index, visit in enumerate(visits):
+        for skills in visit['requirements']:
+            if skills not in eligible:
+                eligible[skills] = np.array([not caregiver.qualifications.isdisjoint(skills)
+                                             for caregiver in caregivers], dtype=bool)
+            qualified[index] &= eligible[skills]
+
+    cost = travel + config['ASSIGNMENT_GENDER_PENALTY'] * gender_miss + \
+        config['ASSIGNMENT_LANGUAGE_PENALTY'] * language_miss - config['ASSIGNMENT_CONTINUITY_BONUS'] * regular
+    cost = np.where(qualified, cost, np.inf)
+    return cost, distance, gender_miss, language_miss, regular, qualified
+
+def propose_assignments(day, scope='unstaffed', task_ids=None):
+    """Propose a caregiver for each visit of a day that needs one, without saving anything
+
+    See load_visits() for which visits are planned. The result lists each
+    visit with its current and proposed caregiver and why, visits that got
+    no caregiver, every caregiver's minutes and the solver's figures.
+    """
+    config = current_app.config
+    caregivers = load_caregivers(day)
+    visits = load_visits(day, caregivers, scope, task_ids)
+    staff = list(caregivers.values())
+
+    cost, distance, gender_miss, language_miss, regular, qualified = visit_costs(visits, staff)
+    # A caregiver cannot take a visit clashing with one they keep
+    kept = np.zeros(cost.shape, dtype=bool)
+    for position, caregiver in enumerate(staff):
+        kept[:, position] = visit_clashes(visits, caregiver.kept_visits, config).any(axis=1)
+    cost = np.where(kept, np.inf, cost)
+    duration = np.array([visit['duration_minutes'] for visit in visits], dtype=np.float64)
+    capacity = np.array([max(config['ASSIGNMENT_DAILY_MINUTES'] - caregiver.kept_minutes, 0)
+                         for caregiver in staff], dtype=np.float64)
+    unassigned = np.array([config['ASSIGNMENT_UNASSIGNED_COST'] * PRIORITY_WEIGHTS.get(visit['priority'], 1)
+                           for visit in visits], dtype=np.float64)
+    problem = AssignmentProblem(cost, unassigned, duration, capacity, visit_clashes(visits, visits, config))
+    started = perf_counter()
+    assignment, total, lower_bound, rounds = problem.solve(config['ASSIGNMENT_TIME_BUDGET'])
+    elapsed = perf_counter() - started
+
+    proposals, left = [], []
+    for position, visit in enumerate(visits):
+        entry = {
+            'client_id': visit['client_id'], 'client_name': visit['client_name'],
+            'scheduled_time': visit['scheduled_time'].strftime('%H:%M') if visit['scheduled_time'] else None,
+            'task_ids': visit['task_ids'], 'task_names': visit['task_names'], 'priority': visit['priority'],
+            'duration_minutes': visit['duration_minutes'],
+            'current_assigned_to_id': visit['current_assigned_to_id']
+        }
+        choice = int(assignment[position])
+        if choice == len(staff):
+            entry['reason'] = 'no qualified caregiver' if not qualified[position].any() \
+                else 'no qualified caregiver has time left'
+            left.append(entry)
+            continue
+        caregiver = staff[choice]
+        entry.update(
+            assigned_to_id=caregiver.id, assigned_to_name=caregiver.name,
+            changed=caregiver.id != visit['current_assigned_to_id'],
+            distance_km=None if np.isnan(distance[position, choice]) else round(float(distance[position, choice]), 2),
+            cost=round(float(cost[position, choice]), 1), regular_client=bool(regular[position, choice]),
+            gender_preference_met=not gender_miss[position, choice],
+            language_preference_met=not language_miss[position, choice])
+        proposals.append(entry)
+
+    loads = problem.loads(assignment) if len(visits) else np.zeros(len(staff))
+    return {
+        'date': day.isoformat(),
+        'scope': 'tasks' if task_ids else scope,
+        'proposals': proposals,
+        'unassigned': left,
+        'caregivers': [{
+            'id': caregiver.id, 'name': caregiver.name,
+            'kept_minutes': caregiver.kept_minutes, 'proposed_minutes': int(loads[position]),
+            'capacity_minutes': config['ASSIGNMENT_DAILY_MINUTES'],
+            'visits': int((assignment == position).sum())
+        } for position, caregiver in enumerate(staff)],
+        'solver': {
+            'visits': len(visits), 'caregivers': len(staff), 'pricing_rounds': rounds,
+            'cost': round(total, 1), 'lower_bound': round(lower_bound, 1), 'seconds': round(elapsed, 3)
+        }
+    }
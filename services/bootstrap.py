@@ -0,0 +1,173 @@
+"""
+HomeCare Management System - Database Bootstrap
+Professional Care Coordination Platform
+"""
+
+import click
+from flask.cli import with_appcontext
+from models import db, User, CareTask, Employee, Job, ClientRiskScore, ScheduledTask, CarePlanTaskException, SchemaVersion, init_default_care_tasks
+from services.changes import mark_changed
+
+# Bump when a release needs a migration, and add the step to MIGRATIONS
+SCHEMA_VERSION = 5
+
+def _add_risk_scores(connection):
+    """Create the early-warning scores table and score the existing caseload"""
+    from services.risk import rescore_clients
+    ClientRiskScore.__table__.create(connection, checkfirst=True)
+    rescore_clients(connection=connection)
+
+def _add_columns(connection, table, names):
+    """Add the named model columns a table lacks, with their foreign keys"""
+    existing = {column['name'] for column in db.inspect(connection).get_columns(table.name)}
+    for name in names:
+        if name in existing:
+            continue
+        column = table.c[name]
+        definition = f'{name} {column.type.compile(connection.dialect)}'
+        for foreign_key in column.foreign_keys:
+            definition += f' REFERENCES {foreign_key.column.table.name} ({foreign_key.column.name})'
+            if foreign_key.ondelete:
+                definition += f' ON DELETE {foreign_key.ondelete}'
+        connection.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {definition}')
+
+def _add_care_plan_occurrences(connection):
+    """Link scheduled tasks to the care plan occurrence they were generated from"""
+    table = ScheduledTask.__table__
+    _add_columns(connection, table, ('care_plan_task_id', 'occurrence_date'))
+    for index in table.indexes:
+        if index.name == 'uq_scheduled_tasks_occurrence':
+            index.create(connection, checkfirst=True)
+    CarePlanTaskException.__table__.create(connection, checkfirst=True)
+
+# Version -> (description, function(connection)) bringing the previous
+# version up to this one. Version 1 is the schema as created by create_all.
+# create_all runs first, so steps adding tables must tolerate them existing.
+MIGRATIONS = {
+    2: ('add background jobs table', lambda connection: Job.__table__.create(connection, checkfirst=True)),
+    3: ('add client early-warning scores', _add_risk_scores),
+    4: ('add care plan occurrences and exceptions', _add_care_plan_occurrences),
+    5: ('add employee gender and languages',
+        lambda connection: _add_columns(connection, Employee.__table__, ('gender', 'languages')))
+}
+
+def current_schema_version(bind=None):
+    """Get the applied schema version, 0 for an empty or unversioned database"""
+    bind = bind or db.engine
+    with bind.connect() as connection:
+        if not db.inspect(connection).has_table(SchemaVersion.__tablename__):
+            return 0
+        # The table column, not the mapped attribute, so a check at startup
+        # does not configure every mapper
+        table = SchemaVersion.__table__
+        return connection.execute(db.select(db.func.max(table.c.version))).scalar() or 0
+
+def migrate():
+    """Create or upgrade the schema to SCHEMA_VERSION
+
+    Returns the list of steps applied, empty when already up to date.
+    """
+    from services.indexes import create_missing_indexes
+    from services.rollups import rebuild_rollups
+    from services.search import rebuild_search_index
+
+    steps = []
+    version = current_schema_version()
+    if version >= SCHEMA_VERSION:
+        return steps
+
+    with db.engine.connect() as connection:
+        adopting = version == 0 and db.inspect(connection).has_table(User.__tablename__)
+    # Replica binds get the schema by copying the primary, never from here
+    db.create_all(bind_key=None)
+    if version == 0:
+        steps.append('adopted existing database' if adopting else 'created schema')
+        version = 1
+        with db.engine.begin() as connection:
+            connection.execute(SchemaVersion.__table__.insert().values(version=version))
+
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        description, upgrade = MIGRATIONS[target]
+        with db.engine.begin() as connection:
+            upgrade(connection)
+            connection.execute(SchemaVersion.__table__.insert().values(version=target))
+        steps.append(f'{target}: {description}')
+
+    if adopting:
+        # A database created before versioning, now with the columns the
+        # migrations add: create the indexes it lacks and backfill the
+        # derived tables
+        create_missing_indexes()
+        rebuild_rollups()
+        rebuild_search_index()
+        db.session.commit()
+    return steps
+
+def create_default_users():
+    """Create the default accounts when there are no users yet"""
+    if db.session.query(User.id).first() is not None:
+        return []
+    jess = User(
+        username='Jess',
+        email='jess@homecare.com',
+        role='admin',
+        first_name='Jess',
+        last_name='Admin',
+        organization_id='Jess'
+    )
+    jess.set_password('JessCard2025!')
+    gbtech = User(
+        username='GBTech',
+        email='gbtech@homecare.com',
+        role='developer',
+        first_name='GBTech',
+        last_name='Developer',
+        organization_id='GBTech'
+    )
+    gbtech.set_password('1q2w3e!Q@W#E')
+    db.session.add_all([jess, gbtech])
+    return [jess, gbtech]
+
+def seed():
+    """Insert default care tasks and users that are missing"""
+    created_tasks = init_default_care_tasks(db)
+    if created_tasks:
+        mark_changed(db.session, CareTask)
+    created_users = create_default_users()
+    db.session.commit()
+    return created_tasks, created_users
+
+def bootstrap(seed_data=True):
+    """Bring the database to the current schema and seed it; safe to repeat"""
+    steps = migrate()
+    created_tasks, created_users = seed() if seed_data else (0, [])
+    return steps, created_tasks, created_users
+
+def check_schema(app):
+    """Warn when the database schema is behind this release"""
+    with app.app_context():
+        version = current_schema_version()
+    if version < SCHEMA_VERSION:
+        app.logger.warning('Database schema is at version %s, expected %s; run "flask bootstrap"',
+                           version, SCHEMA_VERSION)
+    return version
+
+@click.command('bootstrap')
+@click.option('--no-seed', is_flag=True, help='Only create or migrate the schema.')
+@with_appcontext
+def bootstrap_command(no_seed):
+    """Create or migrate the schema and seed default data"""
+    steps, created_tasks, created_users = bootstrap(seed_data=not no_seed)
+    for step in steps:
+        click.echo(f'Schema: {step}')
+    click.echo(f'Schema version {current_schema_version()}')
+    if not no_seed:
+        click.echo(f'{created_tasks} default care task(s) added')
+        for user in created_users:
+            click.echo(f'Created default user {user.username} ({user.role})')
+
+def init_bootstrap(app):
+    """Register the bootstrap command and check the schema version"""
+    app.cli.add_command(bootstrap_command)
+    if app.config['SCHEMA_CHECK_ON_STARTUP']:
+        check_schema(app)
@@ -0,0 +1,187 @@
+"""
+HomeCare Management System - Snapshot Cache
+Professional Care Coordination Platform
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from services.changes import on_commit
+
+class LocalCacheBackend:
+    """In-process cache backend with TTL expiry and LRU eviction
+
+    Generation counters are kept apart from the entries, so evicting
+    entries can never reset one.
+    """
+
+    name = 'local'
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get a value, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting the least recently used entries"""
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_generation(self, name):
+        """Get a cache's generation counter, 0 before its first bump"""
+        with self._lock:
+            return self._generations.get(name, 0)
+
+    def bump_generation(self, name):
+        """Atomically increment a cache's generation counter"""
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+            return self._generations[name]
+
+    def size(self):
+        """Get the number of stored entries"""
+        with self._lock:
+            return len(self._entries)
+
+class RedisCacheBackend:
+    """Shared cache backend for deployments with several worker processes
+
+    Pickled entries live under <prefix>snapshot: and generation counters,
+    plain INCR integers, under <prefix>generation:.
+    """
+
+    name = 'redis'
+    scan_count = 1000
+
+    def __init__(self, url, prefix='homecare:', max_entries=None):
+        import redis  # Optional dependency, only needed for the shared backend
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        """Get a value, or None when missing or expired"""
+        data = self.client.get(f'{self.prefix}snapshot:{key}')
+        return pickle.loads(data) if data is not None else None
+
+    def set(self, key, value, ttl=None):
+        """Store a value; Redis handles expiry and eviction"""
+        self.client.set(f'{self.prefix}snapshot:{key}', pickle.dumps(value), ex=ttl or None)
+
+    def get_generation(self, name):
+        """Get a cache's generation counter, 0 before its first bump"""
+        return int(self.client.get(f'{self.prefix}generation:{name}') or 0)
+
+    def bump_generation(self, name):
+        """Atomically increment a cache's generation counter"""
+        return self.client.incr(f'{self.prefix}generation:{name}')
+
+    def size(self):
+        """Get the number of stored entries
+
+        Counted with SCAN in batches, since KEYS blocks the server while it
+        walks the whole keyspace.
+        """
+        return sum(1 for _ in self.client.scan_iter(match=f'{self.prefix}snapshot:*', count=self.scan_count))
+
+# Backend name -> factory(app); a backend provides get, set, get_generation,
+# bump_generation and size like the two above
+CACHE_BACKENDS = {
+    'local': lambda app: LocalCacheBackend(app.config['CACHE_MAX_ENTRIES']),
+    'redis': lambda app: RedisCacheBackend(app.config['CACHE_REDIS_URL'])
+}
+
+def register_cache_backend(name, factory):
+    """Make a shared backend available through the CACHE_BACKEND setting"""
+    CACHE_BACKENDS[name] = factory
+
+class SnapshotCache:
+    """Named cache of pre-built page snapshots with hit and miss counters
+
+    Invalidation bumps a generation counter stored in the backend, so every
+    process sharing the backend stops serving old snapshots at once.
+    """
+
+    def __init__(self, name, backend, ttl, models=()):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.models = tuple(models)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_or_build(self, key, builder):
+        """Get a snapshot, building and storing it on a miss"""
+        full_key = f'{self.name}:{self.backend.get_generation(self.name)}:{key}'
+        value = self.backend.get(full_key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = builder()
+        self.backend.set(full_key, value, self.ttl)
+        return value
+
+    def invalidate(self):
+        """Drop every stored snapshot"""
+        self.invalidations += 1
+        self.backend.bump_generation(self.name)
+
+    def stats(self):
+        """Get cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'entries': self.backend.size(),
+            'ttl': self.ttl
+        }
+
+def get_cache(name):
+    """Get a snapshot cache registered on the current app"""
+    return current_app.extensions['snapshot_caches'][name]
+
+def cache_stats():
+    """Get counters for every snapshot cache on the current app"""
+    return {name: cache.stats() for name, cache in current_app.extensions['snapshot_caches'].items()}
+
+def _invalidate_on_commit(changes):
+    """Invalidate caches whose source models were committed"""
+    if not has_app_context():
+        return
+    for cache in current_app.extensions.get('snapshot_caches', {}).values():
+        if changes.touches(*cache.models):
+            cache.invalidate()
+
+def init_cache(app):
+    """Create the app's snapshot caches from configuration"""
+    from models import User, Client, CareAction, ScheduledTask
+    backend = CACHE_BACKENDS[app.config['CACHE_BACKEND']](app)
+    app.extensions['snapshot_caches'] = {
+        'dashboard': SnapshotCache('dashboard', backend, app.config['DASHBOARD_CACHE_TTL'],
+                                   models=(User, Client, CareAction, ScheduledTask))
+    }
+    on_commit(_invalidate_on_commit)
@@ -0,0 +1,88 @@
+"""
+HomeCare Management System - Committed Change Tracking
+Professional Care Coordination Platform
+"""
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+PENDING_KEY = 'homecare_pending_changes'
+
+_commit_listeners = []
+
+class ChangeSet:
+    """Models and clients touched by one committed transaction"""
+
+    def __init__(self):
+        self.models = set()
+        self.client_ids = {}
+
+    def add(self, model, client_ids=()):
+        """Record a change to a model, optionally for specific clients"""
+        self.models.add(model)
+        ids = self.client_ids.setdefault(model, set())
+        ids.update(client_id for client_id in client_ids if client_id is not None)
+
+    def touches(self, *models):
+        """Check whether any of the given models changed"""
+        return any(model in self.models for model in models)
+
+    def clients_for(self, *models):
+        """Get the client IDs changed across the given models"""
+        ids = set()
+        for model in models:
+            ids.update(self.client_ids.get(model, ()))
+        return ids
+
+    def __bool__(self):
+        return bool(self.models)
+
+    def __repr__(self):
+        return f'<ChangeSet {sorted(model.__name__ for model in self.models)}>'
+
+def on_commit(callback):
+    """Register a callback receiving the ChangeSet of every commit"""
+    if callback not in _commit_listeners:
+        _commit_listeners.append(callback)
+    return callback
+
+def pending_changes(session):
+    """Get the changes recorded so far in a session's transaction"""
+    return session.info.setdefault(PENDING_KEY, ChangeSet())
+
+def mark_changed(session, model, client_ids=()):
+    """Record a change made outside the ORM unit of work, e.g. bulk inserts"""
+    pending_changes(session).add(model, client_ids)
+
+def _client_id(obj):
+    """Get the client a row belongs to"""
+    if type(obj).__tablename__ == 'clients':
+        return obj.id
+    return getattr(obj, 'client_id', None)
+
+def _record_flush(session, flush_context):
+    """Collect the models written by a flush"""
+    changes = pending_changes(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        changes.add(type(obj), (_client_id(obj),))
+
+def _dispatch_commit(session):
+    """Hand the committed changes to every listener"""
+    changes = session.info.pop(PENDING_KEY, None)
+    if not changes:
+        return
+    for callback in list(_commit_listeners):
+        callback(changes)
+
+def _discard_changes(session, *args):
+    """Forget changes from a rolled back transaction"""
+    session.info.pop(PENDING_KEY, None)
+
+def init_change_tracking():
+    """Register the session listeners that track committed changes"""
+    if not event.contains(Session, 'after_flush', _record_flush):
+        event.listen(Session, 'after_flush', _record_flush)
+        event.listen(Session, 'after_commit', _dispatch_commit)
+        event.listen(Session, 'after_rollback', _discard_changes)
@@ -0,0 +1,34 @@
+"""
+HomeCare Management System - Deferred Service Hooks
+Professional Care Coordination Platform
+
+Registers the commands, commit listeners and worker threads of services
+that load on demand, without importing them: the job handlers, report
+generation, risk scoring and schedule generation stay out of worker boot.
+"""
+
+import importlib
+from models import IncidentReport, MedicalAssessment
+from services.changes import on_commit
+from services.imports import LazyGroup
+
+# Command group name -> (module, group attribute, help)
+DEFERRED_COMMANDS = {
+    'jobs': ('services.jobs', 'jobs_cli', 'Background job queue.'),
+    'reports': ('services.reports', 'reports_cli', 'Generate care reports.'),
+    'risk': ('services.risk', 'risk_cli', 'Maintain client early-warning scores.'),
+    'schedule': ('services.recurrence', 'schedule_cli', 'Generate scheduled tasks from care plans.')
+}
+
+def _rescore_on_commit(changes):
+    """Load risk scoring only once a commit touches what it scores"""
+    if changes.touches(MedicalAssessment, IncidentReport):
+        importlib.import_module('services.risk').rescore_on_commit(changes)
+
+def init_deferred_services(app):
+    """Register the deferred commands and listeners, and start job workers if configured"""
+    for name, (import_name, attribute, help_text) in DEFERRED_COMMANDS.items():
+        app.cli.add_command(LazyGroup(name, import_name, attribute, help=help_text))
+    on_commit(_rescore_on_commit)
+    if app.config['JOB_WORKER_THREADS']:
+        importlib.import_module('services.jobs').start_workers(app)
@@ -0,0 +1,226 @@
+"""
+HomeCare Management System - Streaming Data Export
+Professional Care Coordination Platform
+
+Exports stream rows from a server-side cursor through a writer that yields
+chunks as it goes, so memory use stays flat however many rows match.
+"""
+
+import csv
+import io
+import json
+import re
+import zipfile
+from datetime import date, timedelta
+from flask import current_app
+from xml.sax.saxutils import escape
+from models import db, Client, CareAction, ScheduledTask, MedicalAssessment, CareReport, IncidentReport
+from services.serializers import model_fields, to_json_value
+
+# Export type -> (model, column date filters apply to, (status column, archived statuses))
+EXPORTS = {
+    'clients': (Client, Client.created_at, (Client.status, ('discharged',))),
+    'care_actions': (CareAction, CareAction.action_date, (CareAction.status, ('cancelled',))),
+    'scheduled_tasks': (ScheduledTask, ScheduledTask.scheduled_date, (ScheduledTask.status, ('cancelled',))),
+    'medical_assessments': (MedicalAssessment, MedicalAssessment.assessment_date, None),
+    'care_reports': (CareReport, CareReport.report_date, None),
+    'incident_reports': (IncidentReport, IncidentReport.incident_date, (IncidentReport.status, ('closed',)))
+}
+
+# Leading characters spreadsheet apps treat as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# Characters not allowed in XML 1.0 documents
+INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+XLSX_MAX_CELL = 32767
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    )
+}
+
+XLSX_SHEET_START = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+XLSX_SHEET_END = b'</sheetData></worksheet>'
+
+def _csv_value(value):
+    value = to_json_value(value)
+    if value is None:
+        return ''
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def write_csv(fields, rows, batch_size):
+    """Yield CSV text a batch of rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([_csv_value(value) for value in row])
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def write_ndjson(fields, rows, batch_size):
+    """Yield one JSON object per line, a batch of rows at a time"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(fields, (to_json_value(value) for value in row))), default=str))
+        if len(lines) >= batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c t="n"><v>{value}</v></c>'
+    text = INVALID_XML.sub('', str(to_json_value(value)))[:XLSX_MAX_CELL]
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+def _xlsx_row(values):
+    return ('<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>').encode()
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream that hands out what was written since the last drain"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def write_xlsx(fields, rows, batch_size):
+    """Yield an XLSX workbook with one sheet, zipped as it is written
+
+    Cells use inline strings, so no shared string table has to be held.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(XLSX_SHEET_START)
+            sheet.write(_xlsx_row(fields))
+            for count, row in enumerate(rows, start=1):
+                sheet.write(_xlsx_row(row))
+                if count % batch_size == 0:
+                    yield sink.drain()
+            sheet.write(XLSX_SHEET_END)
+    yield sink.drain()
+
+# Format -> (writer, MIME type, file extension)
+FORMATS = {
+    'csv': (write_csv, 'text/csv', 'csv'),
+    'ndjson': (write_ndjson, 'application/x-ndjson', 'ndjson'),
+    'excel': (write_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx')
+}
+
+def export_query(export_type, date_from=None, date_to=None, include_archived=False):
+    """Build the select for an export; returns (field names, statement)"""
+    model, date_column, archived = EXPORTS[export_type]
+    fields = model_fields(model)
+    query = db.select(*[getattr(model, field) for field in fields]).order_by(model.id)
+    if date_from:
+        query = query.where(date_column >= date_from)
+    if date_to:
+        if isinstance(date_column.type, db.DateTime):
+            query = query.where(date_column < date_to + timedelta(days=1))
+        else:
+            query = query.where(date_column <= date_to)
+    if archived and not include_archived:
+        column, statuses = archived
+        query = query.where(db.or_(column.is_(None), column.notin_(statuses)))
+    return fields, query
+
+def count_export(export_type, date_from=None, date_to=None, include_archived=False):
+    """Count the rows an export will write"""
+    _, query = export_query(export_type, date_from, date_to, include_archived)
+    return db.session.execute(db.select(db.func.count()).select_from(query.order_by(None).subquery())).scalar()
+
+def stream_export(export_type, export_format, date_from=None, date_to=None, include_archived=False,
+                  batch_size=1000, progress=None):
+    """Get (chunk generator, MIME type, file name) for an export
+
+    Rows are fetched batch_size at a time with yield_per, which uses a
+    server-side cursor where the database supports one. progress, if given,
+    is called with the number of rows read after each batch.
+    """
+    writer, mimetype, extension = FORMATS[export_format]
+    fields, query = export_query(export_type, date_from, date_to, include_archived)
+
+    def rows():
+        result = db.session.execute(query.execution_options(yield_per=batch_size))
+        try:
+            for count, row in enumerate(result, start=1):
+                yield row
+                if progress and count % batch_size == 0:
+                    progress(count)
+        finally:
+            result.close()
+
+    filename = f'{export_type}_{date.today():%Y%m%d}.{extension}'
+    return writer(fields, rows(), batch_size), mimetype, filename
+
+def export_job(context, export_type, export_format, date_from=None, date_to=None, include_archived=False):
+    """Background job handler writing an export to the job's result file"""
+    if export_type not in EXPORTS or export_format not in FORMATS:
+        raise ValueError(f'Unknown export {export_type}.{export_format}')
+    date_from = date.fromisoformat(date_from) if date_from else None
+    date_to = date.fromisoformat(date_to) if date_to else None
+    total = count_export(export_type, date_from, date_to, include_archived)
+    context.progress(0, total, f'Exporting {total} rows')
+    chunks, mimetype, filename = stream_export(export_type, export_format, date_from, date_to, include_archived,
+                                               batch_size=current_app.config['EXPORT_BATCH_SIZE'],
+                                               progress=context.progress)
+    with context.open_result(filename, mimetype) as result:
+        for chunk in chunks:
+            result.write(chunk.encode() if isinstance(chunk, str) else chunk)
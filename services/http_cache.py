@@ -0,0 +1,78 @@
+"""
+HomeCare Management System - HTTP Caching
+Professional Care Coordination Platform
+"""
+
+import hashlib
+from datetime import date
+from flask import current_app, g, request, session
+from flask_login import current_user
+from werkzeug.http import is_resource_modified
+from models import db
+
+def _validator_columns(source):
+    """Get max(updated_at) and the row count of a model or query as scalar subqueries"""
+    model = source if isinstance(source, type) else source.column_descriptions[0]['entity']
+    if hasattr(model, 'updated_at'):
+        last_updated = db.func.max(model.updated_at)
+    else:
+        # Without updated_at only inserts (max id) and deletes (count) show
+        last_updated = db.cast(db.func.max(model.id), db.String)
+    if isinstance(source, type):
+        return [db.select(column).select_from(model).scalar_subquery()
+                for column in (last_updated, db.func.count(model.id))]
+    query = source.order_by(None)
+    return [query.with_entities(column).scalar_subquery() for column in (last_updated, db.func.count(model.id))]
+
+def collect_validators(*sources):
+    """Get (max updated_at, row count) for each source in one statement
+
+    A source is a model, for the whole table, or a query on a model.
+    """
+    row = db.session.execute(db.select(*[column for source in sources
+                                         for column in _validator_columns(source)])).one()
+    return list(zip(row[0::2], row[1::2]))
+
+def make_etag(validators):
+    """Hash the validators with everything else the rendered page depends on"""
+    parts = [request.endpoint, request.full_path, request.headers.get('Accept', ''),
+             str(current_user.get_id()), date.today().isoformat()]
+    parts.extend(f"{'' if updated is None else updated}:{count}" for updated, count in validators)
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+def not_modified(*sources):
+    """Answer 304 when the rows behind a view have not changed
+
+    Call once the view's queries are built and before loading rows, with
+    the queries (or whole models) whose rows the response shows. Returns a
+    304 response to return as is, or None to render; either way the
+    response gets the ETag header. No Last-Modified is sent: max(updated_at)
+    misses deletes and the user, Accept header and date the ETag covers, so
+    If-Modified-Since alone would get stale 304s.
+    """
+    if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+        # A pending flash message is part of the next page rendered
+        return None
+    etag = make_etag(collect_validators(*sources))
+    g.http_etag = etag
+    if not is_resource_modified(request.environ, etag=etag):
+        return current_app.response_class(status=304)
+    return None
+
+def set_cache_headers(response):
+    """Stamp validators and the endpoint's Cache-Control policy on a response"""
+    etag = g.pop('http_etag', None)
+    if etag and response.status_code in (200, 304):
+        response.set_etag(etag)
+        response.vary.update(('Accept', 'Cookie'))
+    config = current_app.config
+    policy = config['HTTP_CACHE_CONTROLS'].get(request.endpoint)
+    if policy is None and etag:
+        policy = config['HTTP_CACHE_CONTROL']
+    if policy and 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = policy
+    return response
+
+def init_http_cache(app):
+    """Register the response header hook"""
+    app.after_request(set_cache_headers)
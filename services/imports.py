@@ -0,0 +1,103 @@
+"""
+HomeCare Management System - Lazy Imports and Import-Time Profiling
+Professional Care Coordination Platform
+"""
+
+import importlib
+import subprocess
+import sys
+import types
+import click
+from flask.cli import AppGroup
+
+# Module name -> LazyModule proxy handed out by lazy_import()
+LAZY_MODULES = {}
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that is imported on first attribute access"""
+
+    def __getattr__(self, attribute):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
+
+def lazy_import(name):
+    """Get a module now but only import it when one of its attributes is used"""
+    if name in sys.modules:
+        return sys.modules[name]
+    if name not in LAZY_MODULES:
+        LAZY_MODULES[name] = LazyModule(name)
+    return LAZY_MODULES[name]
+
+class LazyGroup(AppGroup):
+    """Command group whose commands come from a group in a module imported on first use
+
+    "flask --help" shows the group from its name and help alone; running
+    or listing its commands imports the module.
+    """
+
+    def __init__(self, name, import_name, attribute, **kwargs):
+        super().__init__(name, **kwargs)
+        self.import_name = import_name
+        self.attribute = attribute
+
+    def _group(self):
+        return getattr(importlib.import_module(self.import_name), self.attribute)
+
+    def list_commands(self, ctx):
+        return self._group().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._group().get_command(ctx, name)
+
+def parse_importtime(output):
+    """Parse -X importtime output into (name, self_us, cumulative_us, depth) tuples"""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+def run_importtime(code):
+    """Run code in a fresh interpreter with -X importtime and return its stderr"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise click.ClickException(result.stderr.strip().splitlines()[-1])
+    return result.stderr
+
+BOOT_CODE = '''
+from app import create_app
+app = create_app()
+import sys
+from services.imports import LAZY_MODULES
+print('deferred:' + ','.join(name for name in LAZY_MODULES if name not in sys.modules), file=sys.stderr)
+'''
+
+@click.command('import-profile')
+@click.option('--top', default=25, show_default=True, help='Number of modules to list.')
+@click.option('--sort', 'sort_by', type=click.Choice(['cumulative', 'self']), default='cumulative',
+              show_default=True)
+@click.option('--module', default=None, help='Profile importing this module instead of booting the app.')
+def import_profile_command(top, sort_by, module):
+    """Report which imports dominate a cold boot of the app"""
+    code = f'import {module}' if module else BOOT_CODE
+    output = run_importtime(code)
+    entries = parse_importtime(output)
+    deferred = [line[len('deferred:'):] for line in output.splitlines() if line.startswith('deferred:')]
+
+    total = sum(entry[1] for entry in entries)
+    column = 1 if sort_by == 'self' else 2
+    click.echo(f'{"self ms":>9} {"cumul ms":>9}  module')
+    for name, self_us, cumulative_us, depth in sorted(entries, key=lambda entry: -entry[column])[:top]:
+        click.echo(f'{self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}  {"  " * depth}{name}')
+    click.echo(f'{len(entries)} modules imported in {total / 1000:.1f} ms')
+    if deferred and deferred[0]:
+        click.echo(f'Deferred until first use: {deferred[0].replace(",", ", ")}')
+
+def init_imports(app):
+    """Register the import profiling command"""
+    app.cli.add_command(import_profile_command)
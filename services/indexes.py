@@ -0,0 +1,125 @@
+"""
+HomeCare Management System - Index Migration and Advisor
+Professional Care Coordination Platform
+"""
+
+import click
+from datetime import datetime, timedelta
+from flask.cli import with_appcontext
+from models import db, Client, CareAction, ScheduledTask, User
+
+def create_missing_indexes(bind=None):
+    """Add every declared index that an existing database lacks"""
+    bind = bind or db.engine
+    created = []
+    with bind.begin() as connection:
+        existing = {}
+        inspector = db.inspect(connection)
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing[table.name] = {index['name'] for index in inspector.get_indexes(table.name)}
+            # Indexes on columns a pending migration adds wait for that migration
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for index in table.indexes:
+                if index.name not in existing[table.name] and {column.name for column in index.columns} <= columns:
+                    index.create(connection)
+                    created.append(index.name)
+    return created
+
+def advisor_queries():
+    """Representative queries issued by the blueprints' hot paths"""
+    today = datetime.now().date()
+    return [
+        ('main.dashboard recent clients',
+         Client.query.filter_by(status='active').order_by(Client.created_at.desc()).limit(5)),
+        ('main.dashboard upcoming tasks',
+         ScheduledTask.query.filter(ScheduledTask.status == 'pending', ScheduledTask.scheduled_date >= today)
+         .order_by(ScheduledTask.scheduled_date.asc()).limit(10)),
+        ('main.dashboard care levels',
+         db.session.query(Client.care_level, db.func.count(Client.id))
+         .filter_by(status='active').group_by(Client.care_level)),
+        ('clients.list_clients',
+         Client.query.filter_by(status='active').order_by(Client.created_at.desc()).limit(20)),
+        ('clients.view_client recent actions',
+         CareAction.query.filter_by(client_id=1).order_by(CareAction.action_date.desc()).limit(10)),
+        ('clients.view_client upcoming tasks',
+         ScheduledTask.query.filter(ScheduledTask.client_id == 1, ScheduledTask.status == 'pending',
+                                    ScheduledTask.scheduled_date >= today)
+         .order_by(ScheduledTask.scheduled_date.asc()).limit(10)),
+        ('actions.list_actions',
+         CareAction.query.order_by(CareAction.action_date.desc()).limit(20)),
+        ('actions.list_actions date range',
+         CareAction.query.filter(CareAction.action_date >= today - timedelta(days=30),
+                                 CareAction.action_date <= today)
+         .order_by(CareAction.action_date.desc()).limit(20)),
+        ('tasks.list_tasks by status',
+         ScheduledTask.query.filter_by(status='pending').order_by(ScheduledTask.scheduled_date.asc()).limit(20)),
+        ('tasks.list_tasks by caregiver',
+         ScheduledTask.query.filter_by(assigned_to_id=1, status='pending')
+         .order_by(ScheduledTask.scheduled_date.asc()).limit(20)),
+        ('tasks.overdue_tasks',
+         ScheduledTask.query.filter(ScheduledTask.status == 'pending', ScheduledTask.scheduled_date < today)
+         .order_by(ScheduledTask.scheduled_date.asc()).limit(20)),
+        ('employees.view_employee recent actions',
+         CareAction.query.filter_by(performed_by_id=1).order_by(CareAction.action_date.desc()).limit(10)),
+        ('employees.list_users',
+         User.query.order_by(User.created_at.desc()).limit(20)),
+    ]
+
+def explain(connection, statement):
+    """Get the query plan lines for a statement"""
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True}))
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql).fetchall()
+        return [row[-1] for row in rows]
+    rows = connection.exec_driver_sql('EXPLAIN ' + sql).fetchall()
+    return [' '.join(str(value) for value in row) for row in rows]
+
+def is_full_scan(dialect_name, line):
+    """Check whether a plan line reads a whole table"""
+    if dialect_name == 'sqlite':
+        return line.startswith('SCAN ') and 'INDEX' not in line
+    if dialect_name == 'postgresql':
+        return 'Seq Scan' in line
+    return 'ALL' in line.split()
+
+def advise(connection):
+    """Explain every advisor query and flag full table scans"""
+    report = []
+    for name, query in advisor_queries():
+        plan = explain(connection, query.statement)
+        scans = [line for line in plan if is_full_scan(connection.dialect.name, line)]
+        report.append({'query': name, 'plan': plan, 'full_scans': scans})
+    return report
+
+@click.command('add-indexes')
+@with_appcontext
+def add_indexes_command():
+    """Add declared composite indexes to an existing database"""
+    created = create_missing_indexes()
+    for name in created:
+        click.echo(f'Created index {name}')
+    click.echo(f'{len(created)} index(es) created')
+
+@click.command('index-advisor')
+@click.option('--verbose', is_flag=True, help='Print the full plan for every query.')
+@with_appcontext
+def index_advisor_command(verbose):
+    """Report query plans for the blueprint queries and flag full table scans"""
+    connection = db.session.connection()
+    report = advise(connection)
+    flagged = 0
+    for entry in report:
+        status = 'FULL SCAN' if entry['full_scans'] else 'ok'
+        click.echo(f"[{status}] {entry['query']}")
+        lines = entry['plan'] if verbose else entry['full_scans']
+        for line in lines:
+            click.echo(f'    {line}')
+        flagged += bool(entry['full_scans'])
+    click.echo(f'{flagged} of {len(report)} queries use a full table scan')
+
+def init_indexes(app):
+    """Register the index CLI commands"""
+    app.cli.add_command(add_indexes_command)
+    app.cli.add_command(index_advisor_command)
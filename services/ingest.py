@@ -0,0 +1,205 @@
+"""
+HomeCare Management System - Bulk Ingest
+Professional Care Coordination Platform
+"""
+
+from datetime import date, datetime, time
+from models import db, Client, User, CareTask, CareAction, ScheduledTask
+from services.changes import mark_changed
+from services.rollups import record_rows
+from services.search import index_care_notes
+
+PRIORITIES = ('normal', 'high', 'urgent')
+ACTION_STATUSES = ('completed', 'pending', 'cancelled')
+
+class IngestResult:
+    """Outcome of a batch: one result dict per submitted row, in order"""
+
+    def __init__(self, results):
+        self.results = results
+
+    @property
+    def created(self):
+        return [result for result in self.results if result['status'] == 'created']
+
+    @property
+    def errors(self):
+        return [result for result in self.results if result['status'] == 'error']
+
+    def to_dict(self):
+        return {
+            'created': len(self.created),
+            'errors': len(self.errors),
+            'results': self.results
+        }
+
+def _parse_int(value):
+    if isinstance(value, bool):
+        raise ValueError
+    return int(value)
+
+def _parse_date(value):
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def _parse_time(value):
+    if value in (None, ''):
+        return None
+    if isinstance(value, time):
+        return value
+    return datetime.strptime(value, '%H:%M').time()
+
+def _field(row, name, parse, errors, required=True):
+    """Parse one field of a submitted row, recording any error"""
+    value = row.get(name)
+    if value in (None, ''):
+        if required:
+            errors.append(f'{name} is required')
+        return None
+    try:
+        return parse(value)
+    except (TypeError, ValueError):
+        errors.append(f'{name} is invalid')
+        return None
+
+def _choice(row, name, choices, default, errors):
+    value = row.get(name) or default
+    if value not in choices:
+        errors.append(f"{name} must be one of {', '.join(choices)}")
+    return value
+
+def _existing_ids(column, ids):
+    """Find which of the given IDs exist, in one IN query"""
+    if not ids:
+        return set()
+    return {row[0] for row in db.session.query(column).filter(column.in_(ids))}
+
+def _load_tasks(task_ids):
+    """Resolve care task name and category for every ID in one IN query"""
+    if not task_ids:
+        return {}
+    rows = db.session.query(CareTask.id, CareTask.name, CareTask.category).filter(CareTask.id.in_(task_ids))
+    return {row.id: row for row in rows}
+
+def _bulk_insert(model, rows):
+    """Insert rows with one multi-row statement and return their new IDs"""
+    if not rows:
+        return []
+    now = datetime.utcnow()
+    for row in rows:
+        row['created_at'] = row['updated_at'] = now
+    table = model.__table__
+    if db.session.get_bind().dialect.name == 'sqlite':
+        # SQLite gives ordered RETURNING only one row per statement, but a
+        # multi-row insert assigns rowids in VALUES order, so sort instead
+        return sorted(row[0] for row in db.session.execute(table.insert().returning(table.c.id), rows))
+    statement = table.insert().returning(table.c.id, sort_by_parameter_order=True)
+    return [row[0] for row in db.session.execute(statement, rows)]
+
+def _ingest(model, parsed, atomic):
+    """Insert the valid rows and keep rollups, search and caches in step"""
+    results = []
+    valid = []
+    for index, (row, errors) in enumerate(parsed):
+        if errors:
+            results.append({'index': index, 'status': 'error', 'errors': errors})
+        else:
+            results.append({'index': index, 'status': 'created'})
+            valid.append((index, row))
+
+    if atomic and len(valid) < len(parsed):
+        for index, row in valid:
+            results[index] = {'index': index, 'status': 'skipped'}
+        return IngestResult(results)
+
+    rows = [row for _, row in valid]
+    ids = _bulk_insert(model, rows)
+    for (index, _), new_id in zip(valid, ids):
+        results[index]['id'] = new_id
+    for row, new_id in zip(rows, ids):
+        row['id'] = new_id
+
+    # Bulk statements bypass the flush listeners
+    connection = db.session.connection()
+    record_rows(connection, model, rows)
+    if model is CareAction:
+        index_care_notes(connection, rows)
+    mark_changed(db.session, model, {row['client_id'] for row in rows})
+    return IngestResult(results)
+
+def ingest_care_actions(rows, performed_by_id, atomic=False):
+    """Validate and insert a batch of care actions
+
+    Each row needs client_id, task_id and action_date, and may give
+    action_time, notes, priority and status. Invalid rows are reported and
+    skipped; with atomic=True nothing is inserted unless every row is valid.
+    The caller commits.
+    """
+    parsed = []
+    for row in rows:
+        errors = []
+        values = {
+            'client_id': _field(row, 'client_id', _parse_int, errors),
+            'task_id': _field(row, 'task_id', _parse_int, errors),
+            'action_date': _field(row, 'action_date', _parse_date, errors),
+            'action_time': _field(row, 'action_time', _parse_time, errors, required=False),
+            'notes': row.get('notes') or '',
+            'priority': _choice(row, 'priority', PRIORITIES, 'normal', errors),
+            'status': _choice(row, 'status', ACTION_STATUSES, 'completed', errors),
+            'performed_by_id': performed_by_id
+        }
+        parsed.append((values, errors))
+
+    clients = _existing_ids(Client.id, {values['client_id'] for values, _ in parsed} - {None})
+    tasks = _load_tasks({values['task_id'] for values, _ in parsed} - {None})
+    for values, errors in parsed:
+        if values['client_id'] is not None and values['client_id'] not in clients:
+            errors.append(f"client {values['client_id']} does not exist")
+        task = tasks.get(values['task_id'])
+        if values['task_id'] is not None and task is None:
+            errors.append(f"care task {values['task_id']} does not exist")
+        elif task is not None:
+            values['task_name'] = task.name
+            values['task_category'] = task.category
+
+    return _ingest(CareAction, parsed, atomic)
+
+def ingest_scheduled_tasks(rows, assigned_to_id, atomic=False):
+    """Validate and insert a batch of scheduled tasks
+
+    Each row needs client_id, task_id and scheduled_date, and may give
+    scheduled_time, notes, priority and assigned_to_id (defaulting to the
+    given user). Invalid rows are handled as in ingest_care_actions().
+    """
+    parsed = []
+    for row in rows:
+        errors = []
+        values = {
+            'client_id': _field(row, 'client_id', _parse_int, errors),
+            'task_id': _field(row, 'task_id', _parse_int, errors),
+            'scheduled_date': _field(row, 'scheduled_date', _parse_date, errors),
+            'scheduled_time': _field(row, 'scheduled_time', _parse_time, errors, required=False),
+            'notes': row.get('notes') or '',
+            'priority': _choice(row, 'priority', PRIORITIES, 'normal', errors),
+            'status': 'pending',
+            'assigned_to_id': _field(row, 'assigned_to_id', _parse_int, errors, required=False) or assigned_to_id
+        }
+        parsed.append((values, errors))
+
+    clients = _existing_ids(Client.id, {values['client_id'] for values, _ in parsed} - {None})
+    users = _existing_ids(User.id, {values['assigned_to_id'] for values, _ in parsed})
+    tasks = _load_tasks({values['task_id'] for values, _ in parsed} - {None})
+    for values, errors in parsed:
+        if values['client_id'] is not None and values['client_id'] not in clients:
+            errors.append(f"client {values['client_id']} does not exist")
+        if values['assigned_to_id'] not in users:
+            errors.append(f"user {values['assigned_to_id']} does not exist")
+        task = tasks.get(values['task_id'])
+        if values['task_id'] is not None and task is None:
+            errors.append(f"care task {values['task_id']} does not exist")
+        elif task is not None:
+            values['task_name'] = task.name
+            values['task_category'] = task.category
+
+    return _ingest(ScheduledTask, parsed, atomic)
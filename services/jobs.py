@@ -0,0 +1,396 @@
+"""
+HomeCare Management System - Background Jobs
+Professional Care Coordination Platform
+
+Jobs are rows in the jobs table, so the queue needs no broker. Worker
+threads in each web process, or a separate "flask jobs work" process, claim
+queued rows with a conditional update and write progress back to the row,
+where any process can read it for the status endpoint.
+"""
+
+import glob
+import importlib
+import inspect
+import json
+import os
+import secrets
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy.exc import OperationalError
+from models import db, Job
+
+jobs_cli = AppGroup('jobs', help='Background job queue.')
+
+# Job kind -> (module, handler, User permission method); handlers import
+# when a job of their kind first runs and are called as
+# handler(context, **params) with a JobContext
+JOB_TYPES = {
+    'export': ('services.exports', 'export_job', 'can_export_data'),
+    'care_reports': ('services.reports', 'care_reports_job', 'can_manage_reports'),
+    'schedule': ('services.recurrence', 'materialize_job', 'can_plan_schedules'),
+    'risk_rescore': ('services.risk', 'rescore_job', 'can_manage_clients')
+}
+
+class JobCancelled(Exception):
+    """Raised from JobContext.progress() once a job has been cancelled"""
+
+def job_handler(kind):
+    """Get the handler function for a job kind"""
+    module, name, _ = JOB_TYPES[kind]
+    return getattr(importlib.import_module(module), name)
+
+def results_dir(app=None):
+    """Get the directory result files are written to, creating it if needed"""
+    app = app or current_app
+    path = app.config['JOB_RESULTS_DIR'] or os.path.join(app.instance_path, 'job_results')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _update_job(job_id, *conditions, **values):
+    """Update a job row in its own transaction; returns whether it matched"""
+    with db.engine.begin() as connection:
+        result = connection.execute(db.update(Job).where(Job.id == job_id, *conditions).values(**values))
+    return result.rowcount > 0
+
+def _remove_partial_results(job_ids):
+    directory = results_dir()
+    for job_id in job_ids:
+        for path in glob.glob(os.path.join(directory, f'{job_id}-*.part')):
+            os.remove(path)
+
+class JobContext:
+    """What a running handler uses to report progress and write its result"""
+
+    def __init__(self, job, progress_interval):
+        self.job_id = job.id
+        self.created_by_id = job.created_by_id
+        self.progress_interval = progress_interval
+        self.total = job.total
+        self.result_path = None
+        self.result_name = None
+        self.result_mimetype = None
+        self._reported_at = 0
+
+    def progress(self, done, total=None, message=None, force=False):
+        """Record progress and check for cancellation
+
+        Writes at most once per JOB_PROGRESS_INTERVAL unless forced or the
+        total changes. Raises JobCancelled once the job has been cancelled.
+        """
+        if total is not None and total != self.total:
+            self.total = total
+            force = True
+        now = time.monotonic()
+        if not force and now - self._reported_at < self.progress_interval:
+            return
+        self._reported_at = now
+        values = {'progress': done, 'heartbeat_at': datetime.utcnow()}
+        if total is not None:
+            values['total'] = total
+        if message is not None:
+            values['message'] = message[:200]
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(db.update(Job).where(Job.id == self.job_id).values(**values))
+                cancelled = connection.execute(
+                    db.select(Job.cancel_requested).where(Job.id == self.job_id)).scalar()
+        except OperationalError:
+            # A locked database only delays the progress shown; the job goes on
+            current_app.logger.warning('Could not record progress of job %s', self.job_id)
+            return
+        if cancelled:
+            raise JobCancelled()
+
+    def open_result(self, filename, mimetype):
+        """Open the result file for binary writing
+
+        filename is the name offered on download. The file is kept under a
+        random name and only becomes downloadable once the job completes.
+        """
+        self.result_name = filename
+        self.result_mimetype = mimetype
+        extension = os.path.splitext(filename)[1]
+        self.result_path = os.path.join(results_dir(), f'{self.job_id}-{secrets.token_hex(8)}{extension}')
+        return open(self.result_path + '.part', 'wb')
+
+    def discard_result(self):
+        for path in (self.result_path, f'{self.result_path}.part'):
+            if self.result_path and os.path.exists(path):
+                os.remove(path)
+
+def enqueue(kind, params=None, user=None):
+    """Queue a job and wake this process's workers; returns the Job
+
+    params are the handler's keyword arguments and must be JSON
+    serializable (dates are stored as ISO strings).
+    """
+    if kind not in JOB_TYPES:
+        raise ValueError(f'Unknown job kind {kind}')
+    params = params or {}
+    try:
+        inspect.signature(job_handler(kind)).bind(None, **params)
+    except TypeError as error:
+        raise ValueError(f'Invalid parameters for {kind} job: {error}')
+    job = Job(kind=kind, params=json.dumps(params, default=str), status='queued',
+              created_by_id=user.id if user else None)
+    db.session.add(job)
+    db.session.commit()
+    workers = current_app.extensions.get('job_workers')
+    if workers:
+        workers.ensure_started()
+        workers.wake()
+    return job
+
+def cancel_job(job_id):
+    """Cancel a queued job now, or ask a running one to stop; returns whether it applied"""
+    if _update_job(job_id, Job.status == 'queued', status='cancelled', finished_at=datetime.utcnow(),
+                   message='Cancelled'):
+        return True
+    return _update_job(job_id, Job.status == 'running', cancel_requested=True, message='Cancelling')
+
+def claim_next_job(worker):
+    """Mark the oldest queued job as running for this worker; returns its ID or None
+
+    The update only matches a row still queued, so two workers cannot both
+    claim a job, whichever process they run in.
+    """
+    while True:
+        now = datetime.utcnow()
+        with db.engine.begin() as connection:
+            job_id = connection.execute(db.select(Job.id).where(Job.status == 'queued')
+                                        .order_by(Job.id).limit(1)).scalar()
+            if job_id is None:
+                return None
+            claimed = connection.execute(
+                db.update(Job).where(Job.id == job_id, Job.status == 'queued').values(
+                    status='running', worker=worker, started_at=now, heartbeat_at=now,
+                    attempts=Job.attempts + 1, progress=0)).rowcount
+        if claimed:
+            return job_id
+
+def run_job(job_id):
+    """Run a claimed job to completion, failure or cancellation"""
+    config = current_app.config
+    job = db.session.get(Job, job_id)
+    context = JobContext(job, config['JOB_PROGRESS_INTERVAL'])
+    try:
+        job_handler(job.kind)(context, **job.get_params())
+        db.session.commit()
+    except JobCancelled:
+        db.session.rollback()
+        context.discard_result()
+        _update_job(job_id, status='cancelled', finished_at=datetime.utcnow(), message='Cancelled')
+        return 'cancelled'
+    except Exception as error:
+        db.session.rollback()
+        context.discard_result()
+        current_app.logger.exception('Job %s (%s) failed', job_id, job.kind)
+        _update_job(job_id, status='failed', finished_at=datetime.utcnow(), error=str(error) or repr(error))
+        return 'failed'
+
+    finished = datetime.utcnow()
+    values = {'status': 'completed', 'finished_at': finished, 'heartbeat_at': finished,
+              'progress': db.func.coalesce(Job.total, Job.progress)}
+    if context.result_path:
+        os.replace(context.result_path + '.part', context.result_path)
+        values.update(result_path=context.result_path, result_name=context.result_name,
+                      result_mimetype=context.result_mimetype,
+                      result_size=os.path.getsize(context.result_path),
+                      expires_at=finished + timedelta(seconds=config['JOB_RESULT_TTL']))
+    _update_job(job_id, **values)
+    return 'completed'
+
+def run_pending(worker=None, limit=None):
+    """Run queued jobs in this thread until none are left; returns how many ran"""
+    worker = worker or f'{socket.gethostname()}:{os.getpid()}:cli'
+    count = 0
+    while limit is None or count < limit:
+        job_id = claim_next_job(worker)
+        if job_id is None:
+            break
+        run_job(job_id)
+        db.session.remove()
+        count += 1
+    return count
+
+def sweep_jobs():
+    """Requeue jobs whose worker stopped and delete expired results
+
+    A running job whose heartbeat is older than JOB_STALE_AFTER is queued
+    again, or failed once it has had JOB_MAX_ATTEMPTS (cancelled if that was
+    asked for). Returns counts of
+    (requeued, failed, expired) jobs.
+    """
+    config = current_app.config
+    now = datetime.utcnow()
+    stale = (Job.status == 'running', Job.heartbeat_at < now - timedelta(seconds=config['JOB_STALE_AFTER']))
+    with db.engine.begin() as connection:
+        stale_ids = connection.execute(db.select(Job.id).where(*stale)).scalars().all()
+        connection.execute(db.update(Job).where(*stale, Job.cancel_requested.is_(True)).values(
+            status='cancelled', finished_at=now, message='Cancelled'))
+        requeued = connection.execute(
+            db.update(Job).where(*stale, Job.attempts < config['JOB_MAX_ATTEMPTS']).values(
+                status='queued', worker=None, message='Requeued after its worker stopped')).rowcount
+        failed = connection.execute(db.update(Job).where(*stale).values(
+            status='failed', finished_at=now, error='Worker stopped responding')).rowcount
+        expired = connection.execute(db.select(Job.id, Job.result_path).where(
+            Job.status == 'completed', Job.expires_at < now)).all()
+        if expired:
+            connection.execute(db.update(Job).where(Job.id.in_([job_id for job_id, _ in expired])).values(
+                status='expired', result_path=None))
+    _remove_partial_results(stale_ids)
+    for _, path in expired:
+        if path and os.path.exists(path):
+            os.remove(path)
+    return requeued, failed, len(expired)
+
+def queue_daily_jobs():
+    """Queue each JOB_DAILY_KINDS job not yet queued today (UTC); returns the kinds queued
+
+    Every process with a job supervisor calls this, so a kind is queued
+    once a day whichever process gets there first.
+    """
+    kinds = current_app.config['JOB_DAILY_KINDS']
+    if not kinds:
+        return []
+    midnight = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    queued = set(db.session.execute(db.select(Job.kind).where(
+        Job.kind.in_(kinds), Job.created_at >= midnight)).scalars())
+    missing = [kind for kind in kinds if kind not in queued]
+    for kind in missing:
+        enqueue(kind)
+    return missing
+
+class JobWorkerPool:
+    """Worker threads running queued jobs, and one keeping their heartbeats
+
+    Started on the first request in each process, like the SQLite
+    maintenance thread, so gunicorn workers forked from a preloaded app each
+    get their own; "flask jobs work" runs one in the foreground.
+    """
+
+    def __init__(self, app, threads):
+        self.app = app
+        self.threads = threads
+        self.pid = None
+        self.running = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def ensure_started(self):
+        if self.pid == os.getpid():
+            return
+        with self._lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.running = set()
+            for index in range(self.threads):
+                name = f'{socket.gethostname()}:{self.pid}:{index}'
+                threading.Thread(target=self._work, args=(name,), name=f'job-worker-{index}', daemon=True).start()
+            threading.Thread(target=self._supervise, name='job-supervisor', daemon=True).start()
+
+    def wake(self):
+        """Have idle workers look for queued jobs now rather than at their next poll"""
+        self._wake.set()
+
+    def _work(self, name):
+        while True:
+            job_id = None
+            try:
+                with self.app.app_context():
+                    job_id = claim_next_job(name)
+                    if job_id is not None:
+                        self.running.add(job_id)
+                        try:
+                            run_job(job_id)
+                        finally:
+                            self.running.discard(job_id)
+            except Exception:
+                self.app.logger.exception('Job worker error')
+            if job_id is None:
+                self._wake.wait(self.app.config['JOB_POLL_INTERVAL'])
+                self._wake.clear()
+
+    def _supervise(self):
+        while True:
+            time.sleep(self.app.config['JOB_HEARTBEAT_INTERVAL'])
+            try:
+                with self.app.app_context():
+                    running = list(self.running)
+                    if running:
+                        with db.engine.begin() as connection:
+                            connection.execute(db.update(Job).where(
+                                Job.id.in_(running), Job.status == 'running').values(heartbeat_at=datetime.utcnow()))
+                    sweep_jobs()
+                    queue_daily_jobs()
+            except Exception:
+                self.app.logger.exception('Job supervisor error')
+
+@jobs_cli.command('work')
+@click.option('--threads', type=int, default=None, help='Worker threads (default JOB_WORKER_THREADS or 2).')
+@click.option('--once', is_flag=True, help='Run the jobs queued now and exit.')
+@with_appcontext
+def work_command(threads, once):
+    """Run queued jobs in this process"""
+    if once:
+        click.echo(f'{run_pending()} job(s) run')
+        return
+    pool = JobWorkerPool(current_app._get_current_object(), threads or current_app.config['JOB_WORKER_THREADS'] or 2)
+    pool.ensure_started()
+    click.echo(f'Working jobs with {pool.threads} thread(s); Ctrl+C to stop')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        # Jobs cut short are requeued once their heartbeat goes stale
+        click.echo(f'Stopped with {len(pool.running)} job(s) running')
+
+@jobs_cli.command('list')
+@click.option('--status', default=None, help='Only jobs with this status.')
+@click.option('--limit', type=int, default=20, show_default=True)
+@with_appcontext
+def list_command(status, limit):
+    """Show recent jobs"""
+    query = Job.query.order_by(Job.id.desc()).limit(limit)
+    if status:
+        query = query.filter(Job.status == status)
+    for job in query:
+        percent = job.percent_complete()
+        click.echo(f'{job.id:>6}  {job.kind:<14}{job.status:<11}'
+                   f'{"" if percent is None else f"{percent}%":>5}  {job.message or job.error or ""}')
+
+@jobs_cli.command('cancel')
+@click.argument('job_id', type=int)
+@with_appcontext
+def cancel_command(job_id):
+    """Cancel a queued or running job"""
+    click.echo('Cancelled' if cancel_job(job_id) else f'Job {job_id} is not queued or running')
+
+@jobs_cli.command('sweep')
+@with_appcontext
+def sweep_command():
+    """Requeue jobs of stopped workers and delete expired results"""
+    requeued, failed, expired = sweep_jobs()
+    click.echo(f'{requeued} requeued, {failed} failed, {expired} result(s) expired')
+
+def start_workers(app):
+    """Start JOB_WORKER_THREADS worker threads in this process
+
+    With none configured, queued jobs are left to "flask jobs work". An
+    in-memory SQLite database cannot be shared with worker threads.
+    """
+    if not app.config['JOB_WORKER_THREADS']:
+        return
+    with app.app_context():
+        url = db.engine.url
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return
+    workers = JobWorkerPool(app, app.config['JOB_WORKER_THREADS'])
+    app.extensions['job_workers'] = workers
+    app.before_request(workers.ensure_started)
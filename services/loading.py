@@ -0,0 +1,114 @@
+"""
+HomeCare Management System - Eager Loading Plans
+Professional Care Coordination Platform
+"""
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, contains_eager, joinedload
+from models import CareAction, ScheduledTask, Client, Employee
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in testing when a view issues more statements than allowed"""
+
+# Endpoint -> {model: (loader, relationship name)}; the relationships each
+# view's templates walk for every row it lists. Names are resolved on first
+# use because backrefs only exist once the mappers are configured.
+LOAD_PLANS = {
+    'actions.list_actions': {
+        CareAction: ((joinedload, 'client'), (joinedload, 'performed_by'))
+    },
+    'actions.view_action': {
+        CareAction: ((joinedload, 'client'), (joinedload, 'performed_by'), (joinedload, 'care_task'))
+    },
+    'tasks.list_tasks': {
+        ScheduledTask: ((joinedload, 'client'), (joinedload, 'assigned_to'))
+    },
+    'tasks.overdue_tasks': {
+        ScheduledTask: ((joinedload, 'client'), (joinedload, 'assigned_to'))
+    },
+    'tasks.view_task': {
+        ScheduledTask: ((joinedload, 'client'), (joinedload, 'assigned_to'), (joinedload, 'care_task'))
+    },
+    'clients.view_client': {
+        Client: ((joinedload, 'assigned_caregiver'),),
+        CareAction: ((joinedload, 'performed_by'),),
+        ScheduledTask: ((joinedload, 'assigned_to'),)
+    },
+    'clients.client_actions': {
+        CareAction: ((joinedload, 'performed_by'),)
+    },
+    'clients.client_tasks': {
+        ScheduledTask: ((joinedload, 'assigned_to'),)
+    },
+    'employees.list_employees': {
+        Employee: ((contains_eager, 'user'),)
+    },
+    'employees.view_employee': {
+        Employee: ((joinedload, 'user'),),
+        CareAction: ((joinedload, 'client'),),
+        ScheduledTask: ((joinedload, 'client'),)
+    }
+}
+
+_resolved_options = {}
+
+def register_load_plan(endpoint, model, *loaders):
+    """Declare the (loader, relationship name) pairs used by a view"""
+    LOAD_PLANS.setdefault(endpoint, {})[model] = loaders
+    _resolved_options.pop((endpoint, model), None)
+
+def load_options(endpoint, model):
+    """Get the loader options a view applies to a model's queries"""
+    key = (endpoint, model)
+    if key not in _resolved_options:
+        loaders = LOAD_PLANS.get(endpoint, {}).get(model, ())
+        _resolved_options[key] = tuple(loader(getattr(model, name)) for loader, name in loaders)
+    return _resolved_options[key]
+
+def _selected_model(statement):
+    """Get the model a statement loads whole rows of, if any"""
+    descriptions = statement.column_descriptions
+    if not descriptions:
+        return None
+    first = descriptions[0]
+    if first.get('entity') is None or first.get('expr') is not first.get('entity'):
+        return None
+    return first['entity']
+
+def apply_load_plan(orm_execute_state):
+    """Add the current view's eager-load options to its top-level queries"""
+    if not has_request_context() or request.endpoint not in LOAD_PLANS:
+        return
+    if not orm_execute_state.is_select or orm_execute_state.is_relationship_load \
+            or orm_execute_state.is_column_load:
+        return
+    model = _selected_model(orm_execute_state.statement)
+    options = load_options(request.endpoint, model)
+    if options:
+        orm_execute_state.statement = orm_execute_state.statement.options(*options)
+
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    """Count statements issued while handling a request"""
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+def check_query_budget(response):
+    """Fail a test request that issues more statements than its budget"""
+    count = g.get('query_count', 0)
+    config = current_app.config
+    if config['TESTING'] or config['DEBUG']:
+        response.headers['X-Query-Count'] = str(count)
+    budget = config['QUERY_BUDGETS'].get(request.endpoint, config['QUERY_BUDGET'])
+    if config['TESTING'] and budget is not None and count > budget:
+        raise QueryBudgetExceeded(
+            f'{request.endpoint} issued {count} statements (budget {budget})')
+    return response
+
+def init_loading(app):
+    """Register eager-load plans and the query budget guard"""
+    if not event.contains(Session, 'do_orm_execute', apply_load_plan):
+        event.listen(Session, 'do_orm_execute', apply_load_plan)
+        event.listen(Engine, 'before_cursor_execute', count_statement)
+    app.after_request(check_query_budget)
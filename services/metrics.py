@@ -0,0 +1,256 @@
+"""
+HomeCare Management System - Care Metrics Registry
+Professional Care Coordination Platform
+"""
+
+from datetime import date, datetime, time, timedelta
+from models import db, Client, CareActionRollup, ScheduledTaskRollup
+
+LABEL_FORMATS = {
+    'days': '%Y-%m-%d',
+    'weeks': '%Y-%m-%d',
+    'months': '%Y-%m'
+}
+
+class Metric:
+    """A metric declared once as a SQL aggregate over one model"""
+
+    def __init__(self, name, model, aggregate, date_column, denominator=None, cumulative=False):
+        self.name = name
+        self.model = model
+        self.aggregate = aggregate
+        self.date_column = date_column
+        self.denominator = denominator
+        self.cumulative = cumulative
+
+    def value(self, numerator, denominator):
+        """Turn folded aggregate values into the reported value"""
+        if self.denominator is None:
+            return numerator
+        if not denominator:
+            return 0
+        return round(100.0 * numerator / denominator, 1)
+
+    def __repr__(self):
+        return f'<Metric {self.name}>'
+
+METRICS = {}
+
+def register_metric(metric):
+    """Add a metric to the registry"""
+    METRICS[metric.name] = metric
+    return metric
+
+def count_rows(model):
+    """Aggregate counting every row"""
+    return db.func.count(model.id)
+
+def count_where(*conditions):
+    """Aggregate counting rows matching all conditions"""
+    return db.func.sum(db.case((db.and_(*conditions), 1), else_=0))
+
+def sum_rows(rollup_model, *conditions):
+    """Aggregate adding up rollup counts, optionally matching conditions"""
+    if not conditions:
+        return db.func.sum(rollup_model.row_count)
+    return db.func.sum(db.case((db.and_(*conditions), rollup_model.row_count), else_=0))
+
+register_metric(Metric('active_clients', Client,
+                       count_where(Client.status == 'active'),
+                       Client.created_at, cumulative=True))
+register_metric(Metric('urgent_cases', Client,
+                       count_where(Client.status == 'active', Client.care_level == 'urgent'),
+                       Client.created_at, cumulative=True))
+
+# Care action and scheduled task metrics read the daily rollup tables
+register_metric(Metric('care_actions', CareActionRollup,
+                       sum_rows(CareActionRollup),
+                       CareActionRollup.rollup_date))
+register_metric(Metric('scheduled_tasks', ScheduledTaskRollup,
+                       sum_rows(ScheduledTaskRollup),
+                       ScheduledTaskRollup.rollup_date))
+register_metric(Metric('completion_rate', ScheduledTaskRollup,
+                       sum_rows(ScheduledTaskRollup, ScheduledTaskRollup.status == 'completed'),
+                       ScheduledTaskRollup.rollup_date,
+                       denominator=sum_rows(ScheduledTaskRollup)))
+register_metric(Metric('pending_tasks', ScheduledTaskRollup,
+                       sum_rows(ScheduledTaskRollup, ScheduledTaskRollup.status == 'pending'),
+                       ScheduledTaskRollup.rollup_date))
+register_metric(Metric('urgent_tasks', ScheduledTaskRollup,
+                       sum_rows(ScheduledTaskRollup, ScheduledTaskRollup.status == 'pending',
+                                ScheduledTaskRollup.priority == 'urgent'),
+                       ScheduledTaskRollup.rollup_date))
+
+# Series shown on the analytics page
+ANALYTICS_METRICS = ('active_clients', 'care_actions', 'scheduled_tasks', 'urgent_cases', 'completion_rate')
+
+def period_start(value, group_by):
+    """Get the first day of the period containing a date"""
+    if group_by == 'weeks':
+        return value - timedelta(days=value.weekday())
+    if group_by == 'months':
+        return value.replace(day=1)
+    return value
+
+def next_period(value, group_by):
+    """Get the first day of the period following a period start"""
+    if group_by == 'weeks':
+        return value + timedelta(days=7)
+    if group_by == 'months':
+        if value.month == 12:
+            return value.replace(year=value.year + 1, month=1)
+        return value.replace(month=value.month + 1)
+    return value + timedelta(days=1)
+
+def iter_periods(start_date, end_date, group_by):
+    """Yield the start of every period between two dates"""
+    current = period_start(start_date, group_by)
+    while current <= end_date:
+        yield current
+        current = next_period(current, group_by)
+
+def as_date(value):
+    """Normalize a date bucket returned by the database"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+def _is_datetime(column):
+    """Check whether a date column stores timestamps"""
+    return isinstance(column.type, db.DateTime)
+
+def _bound(column, value):
+    """Convert a date bound to the column's type"""
+    if _is_datetime(column):
+        return datetime.combine(value, time.min)
+    return value
+
+def _range_filter(column, start_date, end_date):
+    """Filter a date or timestamp column to an inclusive date range"""
+    return db.and_(column >= _bound(column, start_date),
+                   column < _bound(column, end_date + timedelta(days=1)))
+
+def _batches(metrics):
+    """Group metrics that can be computed by the same query"""
+    batches = {}
+    for metric in metrics:
+        key = (metric.model, metric.date_column.key, metric.cumulative)
+        batches.setdefault(key, []).append(metric)
+    return list(batches.values())
+
+def _select_aggregates(metrics):
+    """Build the aggregate column list for a batch"""
+    columns = []
+    for metric in metrics:
+        columns.append(metric.aggregate)
+        if metric.denominator is not None:
+            columns.append(metric.denominator)
+    return columns
+
+def _unpack(metrics, values):
+    """Split a result row back into (numerator, denominator) per metric"""
+    result = {}
+    index = 0
+    for metric in metrics:
+        numerator = values[index] or 0
+        index += 1
+        denominator = 0
+        if metric.denominator is not None:
+            denominator = values[index] or 0
+            index += 1
+        result[metric.name] = (numerator, denominator)
+    return result
+
+def _daily_buckets(metrics, start_date, end_date):
+    """Run one grouped query for a batch and return per-day aggregate values
+
+    Cumulative metrics fold every row created before the range into the
+    first day so running totals start from the correct baseline.
+    """
+    column = metrics[0].date_column
+    day = db.func.date(column) if _is_datetime(column) else column
+
+    if metrics[0].cumulative:
+        bucket = db.case((column < _bound(column, start_date), db.literal(start_date, db.Date)), else_=day)
+        condition = column < _bound(column, end_date + timedelta(days=1))
+    else:
+        bucket = day
+        condition = _range_filter(column, start_date, end_date)
+
+    rows = db.session.query(bucket, *_select_aggregates(metrics))\
+        .filter(condition)\
+        .group_by(bucket).all()
+    return {as_date(row[0]): _unpack(metrics, row[1:]) for row in rows}
+
+def _fold(metric, buckets, periods, group_by, end_date):
+    """Fold daily buckets into (numerator, denominator) per period"""
+    totals = {}
+    if metric.cumulative:
+        # Running totals as of the end of each period
+        days = sorted(buckets)
+        index = 0
+        numerator = denominator = 0
+        for current in periods:
+            period_end = min(next_period(current, group_by) - timedelta(days=1), end_date)
+            while index < len(days) and days[index] <= period_end:
+                num, den = buckets[days[index]][metric.name]
+                numerator += num
+                denominator += den
+                index += 1
+            totals[current] = (numerator, denominator)
+    else:
+        for day, values in buckets.items():
+            num, den = values[metric.name]
+            key = period_start(day, group_by)
+            previous = totals.get(key, (0, 0))
+            totals[key] = (previous[0] + num, previous[1] + den)
+    return totals
+
+def calculate_series(start_date, end_date, group_by='days', names=None):
+    """Calculate metric series for a date range
+
+    Returns a dict of metric name to a list of {'date', 'value'} points, one
+    per period, using one grouped query per table.
+    """
+    if group_by not in LABEL_FORMATS:
+        group_by = 'days'
+    label_format = LABEL_FORMATS[group_by]
+    metrics = [METRICS[name] for name in (names or METRICS)]
+    periods = list(iter_periods(start_date, end_date, group_by))
+
+    folded = {}
+    for batch in _batches(metrics):
+        buckets = _daily_buckets(batch, start_date, end_date)
+        for metric in batch:
+            folded[metric.name] = _fold(metric, buckets, periods, group_by, end_date)
+
+    return {metric.name: [{
+        'date': current.strftime(label_format),
+        'value': metric.value(*folded[metric.name].get(current, (0, 0)))
+    } for current in periods] for metric in metrics}
+
+def calculate_totals(names, start_date=None, end_date=None):
+    """Calculate single values for metrics with one query per table
+
+    Without a date range every row counts; with one, rows are limited to
+    the range on each metric's date column.
+    """
+    batches = {}
+    for name in names:
+        metric = METRICS[name]
+        batches.setdefault((metric.model, metric.date_column.key), []).append(metric)
+
+    totals = {}
+    for batch in batches.values():
+        query = db.session.query(*_select_aggregates(batch))
+        if start_date is not None and end_date is not None:
+            query = query.filter(_range_filter(batch[0].date_column, start_date, end_date))
+        for name, values in _unpack(batch, query.one()).items():
+            totals[name] = METRICS[name].value(*values)
+    return totals
+
+def calculate_care_metrics(start_date, end_date, group_by='days'):
+    """Calculate care metrics for the analytics dashboard"""
+    return calculate_series(start_date, end_date, group_by, ANALYTICS_METRICS)
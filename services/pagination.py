@@ -0,0 +1,253 @@
+"""
+HomeCare Management System - Keyset Pagination
+Professional Care Coordination Platform
+"""
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from flask import abort, current_app, request, url_for
+from models import db
+
+TOTAL_MODES = ('exact', 'approximate', 'none')
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that is malformed or does not fit the ordering"""
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'t': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+def _nullable(expression):
+    """Check whether a sort expression can be NULL; only NOT NULL columns cannot"""
+    column = getattr(expression, 'expression', expression)
+    return not isinstance(column, db.Column) or column.nullable
+
+def _decode_value(value, expression):
+    """Decode one cursor key into its sort column's Python type"""
+    if value is None:
+        if not _nullable(expression):
+            raise InvalidCursor('cursor has a NULL key for a NOT NULL column')
+        return None
+    if isinstance(value, dict):
+        if list(value) == ['t']:
+            value = datetime.fromisoformat(value['t'])
+        elif list(value) == ['d']:
+            value = date.fromisoformat(value['d'])
+        else:
+            raise InvalidCursor('cursor has an unknown key type')
+    try:
+        python_type = expression.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is float and type(value) is int:
+        value = float(value)
+    if type(value) is not python_type:
+        raise InvalidCursor(f'cursor key {value!r} is not a {python_type.__name__}')
+    return value
+
+def encode_cursor(keys, direction):
+    """Encode a row's sort keys as an opaque cursor"""
+    payload = json.dumps({'k': [_encode_value(key) for key in keys], 'd': direction},
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, order_by):
+    """Decode a cursor into keys typed like the order_by columns
+
+    Returns None when there is no cursor and raises InvalidCursor when it
+    is malformed or its keys do not fit the ordering.
+    """
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        keys, direction = payload['k'], payload['d']
+        if direction not in ('next', 'prev') or not isinstance(keys, list) or len(keys) != len(order_by):
+            raise InvalidCursor('cursor does not match this listing')
+        return {'keys': [_decode_value(key, expression) for key, (expression, _) in zip(keys, order_by)],
+                'direction': direction}
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError, KeyError, binascii.Error) as error:
+        raise InvalidCursor('malformed cursor') from error
+
+def _sort(expression, descending):
+    """Order by an expression, with NULL after every value when ascending"""
+    if not _nullable(expression):
+        return expression.desc() if descending else expression.asc()
+    return expression.desc().nulls_first() if descending else expression.asc().nulls_last()
+
+def _equal(expression, key):
+    return expression.is_(None) if key is None else expression == key
+
+def _beyond(expression, key, descending):
+    """Select values that sort strictly after key, counting NULL as the largest value"""
+    if key is None:
+        return expression.isnot(None) if descending else db.false()
+    if descending:
+        return expression < key
+    if _nullable(expression):
+        return db.or_(expression > key, expression.is_(None))
+    return expression > key
+
+def _bound(expression, key, descending):
+    """Select values that sort at or after key, as a range the index can seek"""
+    if key is None:
+        return db.true() if descending else expression.is_(None)
+    if descending:
+        return expression <= key
+    if _nullable(expression):
+        return db.or_(expression >= key, expression.is_(None))
+    return expression >= key
+
+def after_keys(ordering, keys):
+    """Build the condition selecting rows that sort after the given keys
+
+    Expands (a, b, id) > (x, y, z) into ORs so each column can sort in its
+    own direction, with an extra bound on the leading column so the
+    database can seek into its index. NULL sorts after every value, the
+    same as the NULLS LAST / NULLS FIRST ordering _sort applies.
+    """
+    clauses = []
+    for i, (expression, descending) in enumerate(ordering):
+        equal = [_equal(ordering[j][0], keys[j]) for j in range(i)]
+        clauses.append(db.and_(*equal, _beyond(expression, keys[i], descending)))
+    lead, lead_descending = ordering[0]
+    return db.and_(_bound(lead, keys[0], lead_descending), db.or_(*clauses))
+
+def estimate_total(query):
+    """Approximate the number of rows without scanning all of them
+
+    PostgreSQL uses the planner's row estimate; other databases count at
+    most PAGINATION_COUNT_LIMIT rows.
+    """
+    statement = query.order_by(None)
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        sql = str(statement.statement.compile(dialect=connection.dialect,
+                                              compile_kwargs={'literal_binds': True}))
+        plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + sql).scalar()
+        return int(plan[0]['Plan']['Plan Rows']), True
+    limit = current_app.config['PAGINATION_COUNT_LIMIT']
+    bounded = statement.limit(limit + 1).subquery()
+    count = db.session.query(db.func.count()).select_from(bounded).scalar()
+    if count > limit:
+        return limit, True
+    return count, False
+
+class KeysetPage:
+    """One page of rows with opaque cursors to the neighbouring pages"""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None,
+                 total=None, total_is_approximate=False):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_is_approximate = total_is_approximate
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def url(self, cursor):
+        """Get the current view's URL at another cursor, keeping its filters"""
+        args = request.args.to_dict()
+        args.pop('page', None)
+        args.pop('cursor', None)
+        if cursor:
+            args['cursor'] = cursor
+        return url_for(request.endpoint, **dict(request.view_args or {}, **args))
+
+    @property
+    def next_url(self):
+        return self.url(self.next_cursor) if self.has_next else None
+
+    @property
+    def prev_url(self):
+        return self.url(self.prev_cursor) if self.has_prev else None
+
+    def to_dict(self, serialize):
+        """Build the JSON body for this page"""
+        return {
+            'items': [serialize(item) for item in self.items],
+            'per_page': self.per_page,
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'next_url': self.next_url,
+            'prev_url': self.prev_url,
+            'total': self.total,
+            'total_is_approximate': self.total_is_approximate
+        }
+
+def keyset_paginate(query, order_by, cursor=None, per_page=20, total='exact'):
+    """Fetch one page of a query by seeking past the previous page's last row
+
+    order_by is a list of (expression, descending) pairs whose last entry is
+    unique, normally the primary key. Each page is a single indexed range
+    read however deep it is. Raises InvalidCursor for a cursor that does
+    not fit order_by.
+    """
+    position = decode_cursor(cursor, order_by)
+    backwards = position is not None and position['direction'] == 'prev'
+
+    ordering = [(expression, descending != backwards) for expression, descending in order_by]
+    page_query = query.order_by(None)
+    if position is not None:
+        page_query = page_query.filter(after_keys(ordering, position['keys']))
+    page_query = page_query.add_columns(
+        *[expression.label(f'_key{i}') for i, (expression, _) in enumerate(order_by)]
+    ).order_by(*[_sort(expression, descending) for expression, descending in ordering])
+
+    rows = page_query.limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        has_next = True if backwards else more
+        has_prev = more if backwards else position is not None
+        if has_next:
+            next_cursor = encode_cursor(tuple(rows[-1])[1:], 'next')
+        if has_prev:
+            prev_cursor = encode_cursor(tuple(rows[0])[1:], 'prev')
+
+    count, approximate = None, False
+    if total == 'exact':
+        count = query.order_by(None).count()
+    elif total == 'approximate':
+        count, approximate = estimate_total(query)
+
+    return KeysetPage([row[0] for row in rows], per_page, next_cursor, prev_cursor,
+                      count, approximate)
+
+def total_mode():
+    """Get the total-count mode for the current request"""
+    mode = request.args.get('total')
+    if mode in TOTAL_MODES:
+        return mode
+    config = current_app.config
+    return config['PAGINATION_TOTALS'].get(request.endpoint, config['PAGINATION_TOTAL'])
+
+def paginate_request(query, order_by, per_page=20):
+    """Paginate a query using the current request's cursor and total mode
+
+    Aborts with 400 when the cursor does not fit the listing.
+    """
+    try:
+        return keyset_paginate(query, order_by, cursor=request.args.get('cursor'),
+                               per_page=per_page, total=total_mode())
+    except InvalidCursor as error:
+        abort(400, str(error))
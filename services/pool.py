@@ -0,0 +1,126 @@
+"""
+HomeCare Management System - Connection Pool Configuration and Metrics
+Professional Care Coordination Platform
+"""
+
+import threading
+import time
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from models import db
+
+# Upper bounds, in milliseconds, of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+class PoolStats:
+    """Checkout wait counters for one connection pool"""
+
+    def __init__(self, slow_threshold):
+        self.slow_threshold = slow_threshold
+        self.checkouts = 0
+        self.slow_checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, timed_out=False):
+        """Record how long one checkout waited for a connection"""
+        milliseconds = seconds * 1000
+        bucket = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if milliseconds <= bound),
+                      len(WAIT_BUCKETS_MS))
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self.histogram[bucket] += 1
+            if seconds >= self.slow_threshold:
+                self.slow_checkouts += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def to_dict(self):
+        with self._lock:
+            labels = [f'<={bound}ms' for bound in WAIT_BUCKETS_MS] + [f'>{WAIT_BUCKETS_MS[-1]}ms']
+            return {
+                'checkouts': self.checkouts,
+                'slow_checkouts': self.slow_checkouts,
+                'slow_threshold_ms': self.slow_threshold * 1000,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+                'wait_histogram': dict(zip(labels, self.histogram))
+            }
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits for a connection"""
+
+    def __init__(self, creator, slow_threshold=0.05, **kwargs):
+        super().__init__(creator, **kwargs)
+        self.stats = PoolStats(slow_threshold)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = PoolStats(self.stats.slow_threshold)
+        return pool
+
+def _is_memory_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def engine_options(config):
+    """Build SQLALCHEMY_ENGINE_OPTIONS from the DB_POOL_* settings
+
+    Explicit SQLALCHEMY_ENGINE_OPTIONS entries win. In-memory SQLite keeps
+    Flask-SQLAlchemy's single shared connection.
+    """
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.setdefault('pool_pre_ping', config['DB_POOL_PRE_PING'])
+    options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+    if not _is_memory_sqlite(config['SQLALCHEMY_DATABASE_URI']):
+        options.setdefault('poolclass', InstrumentedQueuePool)
+        options.setdefault('pool_size', config['DB_POOL_SIZE'])
+        options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+        options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+        if options['poolclass'] is InstrumentedQueuePool:
+            options.setdefault('slow_threshold', config['DB_POOL_SLOW_CHECKOUT'])
+    return options
+
+def dispose_engines(app):
+    """Drop pooled connections inherited from the parent after a fork
+
+    close=False leaves the parent's sockets alone; the child opens its own.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+def pool_stats():
+    """Get pool occupancy and checkout wait metrics for this process"""
+    stats = {}
+    for bind, engine in db.engines.items():
+        pool = engine.pool
+        entry = {'pool': type(pool).__name__, 'status': pool.status()}
+        if isinstance(pool, QueuePool):
+            entry.update(size=pool.size(), checked_out=pool.checkedout(),
+                         overflow=pool.overflow(), checked_in=pool.checkedin())
+        if isinstance(pool, InstrumentedQueuePool):
+            entry.update(pool.stats.to_dict())
+        stats[bind or 'default'] = entry
+    return stats
+
+def configure_engine(app):
+    """Apply pool settings; call before db.init_app creates the engines"""
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
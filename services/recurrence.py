@@ -0,0 +1,335 @@
+"""
+HomeCare Management System - Care Plan Recurrence
+Professional Care Coordination Platform
+
+Expands recurring care plan tasks into dated occurrences and materializes
+the occurrences of a rolling horizon as scheduled tasks. Each generated
+task records its care plan task and occurrence date, so a re-run only adds
+what is missing. Exceptions skip one occurrence or override its date,
+time, caregiver, priority or notes.
+"""
+
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy.orm import joinedload
+from models import db, Client, CarePlan, CarePlanTask, CarePlanTaskException, ScheduledTask
+from services.changes import mark_changed
+from services.rollups import record_rows
+
+schedule_cli = AppGroup('schedule', help='Generate scheduled tasks from care plans.')
+
+# Care plan frequency keywords -> equivalent rule; as_needed never recurs
+FREQUENCY_RULES = {
+    'daily': 'FREQ=DAILY',
+    'weekly': 'FREQ=WEEKLY',
+    'monthly': 'FREQ=MONTHLY',
+    'as_needed': None
+}
+
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+EXCEPTION_ACTIONS = ('skip', 'override')
+
+# Exception fields that replace the care plan's value when set
+OVERRIDE_FIELDS = ('scheduled_date', 'scheduled_time', 'assigned_to_id', 'priority', 'notes')
+
+# Plan task statuses that no longer generate occurrences
+FINISHED_STATUSES = ('completed', 'cancelled')
+
+class Recurrence:
+    """A recurrence rule in a subset of iCalendar RRULE syntax
+
+    FREQ is DAILY, WEEKLY or MONTHLY, with optional INTERVAL, BYDAY weekday
+    codes and BYMONTHDAY days (negative days count back from the month
+    end). Periods are counted from an anchor date, the care plan's start:
+    WEEKLY defaults to the anchor's weekday and MONTHLY to its day of the
+    month. Unlike RRULE, a month too short for a day gets its last day.
+    """
+
+    def __init__(self, freq, interval=1, weekdays=None, monthdays=None):
+        self.freq = freq
+        self.interval = interval
+        self.weekdays = weekdays
+        self.monthdays = monthdays
+
+    @classmethod
+    def parse(cls, frequency):
+        """Parse a CarePlanTask.frequency, None for tasks that never recur
+
+        Raises ValueError for a rule this engine does not understand.
+        """
+        frequency = (frequency or '').strip()
+        if frequency.lower() in FREQUENCY_RULES:
+            frequency = FREQUENCY_RULES[frequency.lower()]
+            if frequency is None:
+                return None
+        parts = {}
+        for part in frequency.upper().removeprefix('RRULE:').split(';'):
+            name, _, value = part.partition('=')
+            parts[name.strip()] = value.strip()
+        freq = parts.pop('FREQ', None)
+        if freq not in ('DAILY', 'WEEKLY', 'MONTHLY'):
+            raise ValueError(f'Unsupported frequency {frequency!r}')
+        try:
+            interval = int(parts.pop('INTERVAL', 1))
+            weekdays = tuple(sorted({WEEKDAYS.index(day.strip()) for day in parts.pop('BYDAY').split(',')})) \
+                if 'BYDAY' in parts else None
+            monthdays = tuple(int(day) for day in parts.pop('BYMONTHDAY').split(',')) \
+                if 'BYMONTHDAY' in parts else None
+        except ValueError:
+            raise ValueError(f'Invalid recurrence rule {frequency!r}') from None
+        if parts or interval < 1 or (monthdays and not all(1 <= abs(day) <= 31 for day in monthdays)):
+            raise ValueError(f'Invalid recurrence rule {frequency!r}')
+        return cls(freq, interval, weekdays, monthdays)
+
+    def between(self, anchor, start, end):
+        """Yield the occurrence dates from start to end inclusive, none before the anchor"""
+        start = max(start, anchor)
+        if start > end:
+            return
+        if self.freq == 'DAILY':
+            offset = (start - anchor).days
+            day = start + timedelta(days=-offset % self.interval)
+            while day <= end:
+                if self.weekdays is None or day.weekday() in self.weekdays:
+                    yield day
+                day += timedelta(days=self.interval)
+        elif self.freq == 'WEEKLY':
+            weekdays = self.weekdays or (anchor.weekday(),)
+            week = start - timedelta(days=start.weekday())
+            weeks = (week - (anchor - timedelta(days=anchor.weekday()))).days // 7
+            week += timedelta(weeks=-weeks % self.interval)
+            while week <= end:
+                for weekday in weekdays:
+                    day = week + timedelta(days=weekday)
+                    if start <= day <= end:
+                        yield day
+                week += timedelta(weeks=self.interval)
+        else:
+            monthdays = self.monthdays or (anchor.day,)
+            months = (start.year - anchor.year) * 12 + start.month - anchor.month
+            index = months + -months % self.interval
+            while True:
+                year, month = divmod(anchor.month - 1 + index, 12)
+                year, month = anchor.year + year, month + 1
+                if date(year, month, 1) > end:
+                    break
+                length = monthrange(year, month)[1]
+                days = {min(day, length) if day > 0 else max(length + day + 1, 1) for day in monthdays}
+                for day in sorted(days):
+                    occurrence = date(year, month, day)
+                    if start <= occurrence <= end:
+                        yield occurrence
+                index += self.interval
+
+def recurring_plan_tasks(start, end, client_ids=None, plan_task_ids=None):
+    """Select the plan tasks of active clients' active care plans overlapping a window"""
+    query = db.select(CarePlanTask.id, CarePlanTask.task_id, CarePlanTask.task_name, CarePlanTask.task_category,
+                      CarePlanTask.priority, CarePlanTask.frequency, CarePlanTask.assigned_to_id,
+                      CarePlan.client_id, CarePlan.start_date, CarePlan.end_date, Client.assigned_caregiver_id) \
+        .join(CarePlan, CarePlan.id == CarePlanTask.care_plan_id) \
+        .join(Client, Client.id == CarePlan.client_id) \
+        .where(CarePlan.status == 'active', Client.status == 'active',
+               CarePlanTask.status.notin_(FINISHED_STATUSES),
+               CarePlan.start_date <= end, db.or_(CarePlan.end_date.is_(None), CarePlan.end_date >= start)) \
+        .order_by(CarePlan.client_id, CarePlanTask.id)
+    if client_ids is not None:
+        query = query.where(CarePlan.client_id.in_(client_ids))
+    if plan_task_ids is not None:
+        query = query.where(CarePlanTask.id.in_(plan_task_ids))
+    return db.session.execute(query).all()
+
+def load_exceptions(start, end, client_ids=None, plan_task_ids=None):
+    """Get {(care plan task ID, occurrence date): exception} for a window"""
+    query = CarePlanTaskException.query.filter(CarePlanTaskException.occurrence_date.between(start, end))
+    if client_ids is not None:
+        query = query.join(CarePlanTask).join(CarePlan).filter(CarePlan.client_id.in_(client_ids))
+    if plan_task_ids is not None:
+        query = query.filter(CarePlanTaskException.care_plan_task_id.in_(plan_task_ids))
+    return {(exception.care_plan_task_id, exception.occurrence_date): exception for exception in query}
+
+def expand_occurrences(start, end, client_ids=None, plan_task_ids=None):
+    """Yield the care plan occurrences between two dates, lazily
+
+    Each occurrence is a dict of the scheduled task it would create plus
+    care_plan_task_id, occurrence_date and exception (None, 'skip' or
+    'override'). assigned_to_id falls back from the exception to the plan
+    task to the client's caregiver, and may still be None. Tasks whose
+    frequency cannot be parsed are logged and left out.
+    """
+    exceptions = load_exceptions(start, end, client_ids, plan_task_ids)
+    rules = {}
+    for plan_task in recurring_plan_tasks(start, end, client_ids, plan_task_ids):
+        if plan_task.frequency not in rules:
+            try:
+                rules[plan_task.frequency] = Recurrence.parse(plan_task.frequency)
+            except ValueError as error:
+                current_app.logger.warning('Care plan task %s: %s', plan_task.id, error)
+                rules[plan_task.frequency] = None
+        rule = rules[plan_task.frequency]
+        if rule is None:
+            continue
+        last = min(end, plan_task.end_date) if plan_task.end_date else end
+        for occurrence_date in rule.between(plan_task.start_date, start, last):
+            occurrence = {
+                'care_plan_task_id': plan_task.id,
+                'occurrence_date': occurrence_date,
+                'client_id': plan_task.client_id,
+                'task_id': plan_task.task_id,
+                'task_name': plan_task.task_name,
+                'task_category': plan_task.task_category,
+                'scheduled_date': occurrence_date,
+                'scheduled_time': None,
+                'assigned_to_id': plan_task.assigned_to_id or plan_task.assigned_caregiver_id,
+                'priority': plan_task.priority or 'normal',
+                'notes': None,
+                'exception': None
+            }
+            exception = exceptions.get((plan_task.id, occurrence_date))
+            if exception is not None:
+                occurrence['exception'] = exception.action
+                for field in OVERRIDE_FIELDS:
+                    if getattr(exception, field) is not None:
+                        occurrence[field] = getattr(exception, field)
+            yield occurrence
+
+def materialized_occurrences(start, end, client_ids=None):
+    """Get {(care plan task ID, occurrence date): scheduled task ID} already generated in a window"""
+    query = db.select(ScheduledTask.care_plan_task_id, ScheduledTask.occurrence_date, ScheduledTask.id) \
+        .where(ScheduledTask.care_plan_task_id.is_not(None), ScheduledTask.occurrence_date.between(start, end))
+    if client_ids is not None:
+        query = query.where(ScheduledTask.client_id.in_(client_ids))
+    return {(plan_task_id, day): id for plan_task_id, day, id in db.session.execute(query)}
+
+def _insert_tasks(rows):
+    """Insert generated scheduled tasks and keep the rollups in step"""
+    now = datetime.utcnow()
+    for row in rows:
+        row.update(status='pending', created_at=now, updated_at=now)
+    db.session.execute(ScheduledTask.__table__.insert(), rows)
+    # Bulk statements bypass the flush listeners
+    record_rows(db.session.connection(), ScheduledTask, rows)
+
+def materialize_schedule(start=None, days=None, client_ids=None, progress=None):
+    """Create the scheduled tasks of every care plan occurrence in a window
+
+    The window runs for days (default SCHEDULE_HORIZON_DAYS) from start
+    (default today). Occurrences already generated, skipped by an exception
+    or with nobody to assign are left out, so re-running is safe. Rows are
+    inserted SCHEDULE_BATCH_SIZE at a time and the caller commits. Returns
+    the window and counts of created, existing, skipped and unassigned
+    occurrences.
+    """
+    config = current_app.config
+    start = start or date.today()
+    end = start + timedelta(days=(days or config['SCHEDULE_HORIZON_DAYS']) - 1)
+    batch_size = config['SCHEDULE_BATCH_SIZE']
+    existing = materialized_occurrences(start, end, client_ids)
+
+    counts = dict.fromkeys(('created', 'existing', 'skipped', 'unassigned'), 0)
+    batch, changed = [], set()
+    for occurrence in expand_occurrences(start, end, client_ids):
+        if (occurrence['care_plan_task_id'], occurrence['occurrence_date']) in existing:
+            counts['existing'] += 1
+        elif occurrence.pop('exception') == 'skip':
+            counts['skipped'] += 1
+        elif occurrence['assigned_to_id'] is None:
+            counts['unassigned'] += 1
+        else:
+            batch.append(occurrence)
+            changed.add(occurrence['client_id'])
+            if len(batch) >= batch_size:
+                _insert_tasks(batch)
+                counts['created'] += len(batch)
+                batch = []
+                if progress:
+                    progress(counts['created'])
+    if batch:
+        _insert_tasks(batch)
+        counts['created'] += len(batch)
+    if changed:
+        mark_changed(db.session, ScheduledTask, changed)
+    return dict(counts, start=start, end=end)
+
+def set_occurrence_exception(plan_task_id, occurrence_date, action, created_by_id=None, **overrides):
+    """Skip or override one occurrence of a care plan task, or clear it with action=None
+
+    Overrides are OVERRIDE_FIELDS values; fields not given keep the care
+    plan's value. A scheduled task already generated for the occurrence is
+    updated while still pending, and one cancelled by a skip is restored
+    when the skip is lifted. Raises ValueError when the date is not an
+    occurrence of the task. The caller commits. Returns the exception (None
+    once cleared) and the generated scheduled task, if any.
+    """
+    plan_task = db.session.get(CarePlanTask, plan_task_id, options=[joinedload(CarePlanTask.care_plan)])
+    if plan_task is None:
+        raise ValueError(f'Care plan task {plan_task_id} does not exist')
+    if action is not None and action not in EXCEPTION_ACTIONS:
+        raise ValueError(f"action must be one of {', '.join(EXCEPTION_ACTIONS)}")
+    unknown = set(overrides) - set(OVERRIDE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown override {', '.join(sorted(unknown))}")
+    plan = plan_task.care_plan
+    rule = Recurrence.parse(plan_task.frequency)
+    if rule is None or (plan.end_date and occurrence_date > plan.end_date) or \
+            next(rule.between(plan.start_date, occurrence_date, occurrence_date), None) is None:
+        raise ValueError(f'{occurrence_date} is not an occurrence of care plan task {plan_task_id}')
+
+    exception = plan_task.exceptions.filter_by(occurrence_date=occurrence_date).first()
+    previous = exception.action if exception else None
+    if action is None:
+        if exception is not None:
+            db.session.delete(exception)
+            exception = None
+    else:
+        if exception is None:
+            exception = CarePlanTaskException(care_plan_task_id=plan_task_id, occurrence_date=occurrence_date)
+            db.session.add(exception)
+        exception.action = action
+        exception.created_by_id = created_by_id
+        for field in OVERRIDE_FIELDS:
+            setattr(exception, field, overrides.get(field) if action == 'override' else None)
+    db.session.flush()
+
+    task = ScheduledTask.query.filter_by(care_plan_task_id=plan_task_id, occurrence_date=occurrence_date).first()
+    restorable = task is not None and (task.status == 'pending' or (task.status == 'cancelled' and previous == 'skip'))
+    if restorable:
+        # Nothing is expanded once the plan or client is no longer active
+        occurrence = next(expand_occurrences(occurrence_date, occurrence_date, plan_task_ids=[plan_task_id]), None)
+        if occurrence is None:
+            pass
+        elif occurrence['exception'] == 'skip':
+            task.status = 'cancelled'
+        else:
+            task.status = 'pending'
+            for field in OVERRIDE_FIELDS:
+                if field != 'assigned_to_id' or occurrence[field] is not None:
+                    setattr(task, field, occurrence[field])
+    return exception, task
+
+def materialize_job(context, start=None, days=None, client_ids=None):
+    """Background job handler generating scheduled tasks from care plans"""
+    start = date.fromisoformat(start) if start else None
+    context.progress(0, message='Generating scheduled tasks')
+    result = materialize_schedule(start, days, client_ids, progress=context.progress)
+    db.session.commit()
+    context.progress(result['created'], result['created'],
+                     message=f"{result['created']} created, {result['existing']} existing, "
+                             f"{result['skipped']} skipped, {result['unassigned']} unassigned", force=True)
+
+@schedule_cli.command('materialize')
+@click.option('--from', 'start', type=click.DateTime(['%Y-%m-%d']), default=None,
+              help='First day to generate (default: today).')
+@click.option('--days', type=int, default=None, help='Days to generate (default: SCHEDULE_HORIZON_DAYS).')
+@click.option('--client', 'client_ids', type=int, multiple=True,
+              help='Client to generate for, repeatable (default: every active client).')
+@with_appcontext
+def materialize_command(start, days, client_ids):
+    """Create scheduled tasks for the care plan occurrences of the coming days"""
+    result = materialize_schedule(start.date() if start else None, days, list(client_ids) or None)
+    db.session.commit()
+    click.echo(f"{result['start']} to {result['end']}: {result['created']} created, {result['existing']} existing, "
+               f"{result['skipped']} skipped, {result['unassigned']} without a caregiver")
@@ -0,0 +1,88 @@
+"""
+HomeCare Management System - Reference Data Cache
+Professional Care Coordination Platform
+"""
+
+from collections import namedtuple
+from flask import g, has_app_context
+from models import db, Client, User, CareTask
+from services.cache import SnapshotCache, get_cache
+from services.changes import on_commit
+
+ClientInfo = namedtuple('ClientInfo', 'id name')
+CaregiverInfo = namedtuple('CaregiverInfo', 'id name')
+
+class CareTaskInfo(namedtuple('CareTaskInfo', 'id name category description is_common is_active')):
+    """Cached copy of a care task catalog row"""
+
+    __slots__ = ()
+
+    get_category_class = CareTask.get_category_class
+
+class ReferenceData:
+    """Snapshot of the clients, caregivers and care tasks forms choose from"""
+
+    def __init__(self, clients, caregivers, care_tasks):
+        self.clients = clients
+        self.caregivers = caregivers
+        self.care_tasks = {task.id: task for task in care_tasks}
+        self.active_tasks = sorted((task for task in care_tasks if task.is_active), key=lambda task: task.name)
+        self.tasks_by_category = sorted(self.active_tasks, key=lambda task: (task.category, task.name))
+
+    def client_choices(self):
+        return [(client.id, client.name) for client in self.clients]
+
+    def caregiver_choices(self):
+        return [(caregiver.id, caregiver.name) for caregiver in self.caregivers]
+
+    def task_choices(self):
+        return [(task.id, f"{task.name} ({task.category})") for task in self.active_tasks]
+
+    def get_task(self, task_id):
+        """Look up a care task by ID, or None if it does not exist"""
+        return self.care_tasks.get(task_id)
+
+def load_reference_data():
+    """Read the reference tables in one query each"""
+    clients = [ClientInfo(*row) for row in db.session.query(Client.id, Client.name)
+               .filter_by(status='active').order_by(Client.name)]
+    caregivers = [CaregiverInfo(user.id, user.get_full_name()) for user in
+                  User.query.filter_by(is_active=True).order_by(User.first_name, User.last_name)]
+    care_tasks = [CareTaskInfo(*row) for row in db.session.query(
+        CareTask.id, CareTask.name, CareTask.category, CareTask.description,
+        CareTask.is_common, CareTask.is_active)]
+    return ReferenceData(clients, caregivers, care_tasks)
+
+def reference_data():
+    """Get the reference data, reusing it for the rest of the request"""
+    if 'reference_data' not in g:
+        g.reference_data = get_cache('reference').get_or_build('data', load_reference_data)
+    return g.reference_data
+
+def get_care_task(task_id):
+    """Cached replacement for CareTask.query.get()"""
+    return reference_data().get_task(task_id)
+
+def populate_choices(form):
+    """Fill a form's client, caregiver and care task select fields"""
+    data = reference_data()
+    if hasattr(form, 'client_id'):
+        form.client_id.choices = data.client_choices()
+    if hasattr(form, 'assigned_to_id'):
+        form.assigned_to_id.choices = data.caregiver_choices()
+    if hasattr(form, 'task_id'):
+        form.task_id.choices = data.task_choices()
+    return form
+
+def _forget_request_copy(changes):
+    """Drop the request's copy once the reference tables change"""
+    if has_app_context() and changes.touches(Client, User, CareTask):
+        g.pop('reference_data', None)
+
+def init_reference_data(app):
+    """Register the reference data cache, sharing the snapshot cache backend"""
+    caches = app.extensions['snapshot_caches']
+    backend = caches['dashboard'].backend
+    caches['reference'] = SnapshotCache('reference', backend, app.config['REFERENCE_CACHE_TTL'],
+                                        models=(Client, User, CareTask))
+    on_commit(_forget_request_copy)
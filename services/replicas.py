@@ -0,0 +1,213 @@
+"""
+HomeCare Management System - Read Replica Routing
+Professional Care Coordination Platform
+
+Read-only requests listed in REPLICA_ENDPOINTS run their queries on a read
+replica; everything else, and anything in the same session after a write,
+uses the primary. This module must not import models: models.py imports
+RoutingSession from here.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+import click
+from flask import current_app, has_request_context, request, session
+from flask.cli import AppGroup, with_appcontext
+from flask_sqlalchemy.session import Session
+from services.changes import on_commit
+
+# Session.info key: this session may read from a replica
+REPLICA_READS_KEY = 'homecare_replica_reads'
+
+# Session.info key: the replica engine this session has read from
+REPLICA_ENGINE_KEY = 'homecare_replica_engine'
+
+# Flask session key: read from the primary until this timestamp
+PRIMARY_UNTIL_KEY = 'read_primary_until'
+
+# Seconds a PostgreSQL standby trails its primary; 0 when caught up
+POSTGRES_LAG_SQL = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+replicas_cli = AppGroup('replicas', help='Inspect and refresh read replicas.')
+
+def replica_bind_key(index):
+    return f'replica_{index}'
+
+class Replica:
+    """Health and lag of one replica, refreshed at most every check interval"""
+
+    def __init__(self, bind_key):
+        self.bind_key = bind_key
+        self.healthy = True
+        self.lag = None
+        self.error = None
+        self.checked_at = None
+        self._lock = threading.Lock()
+
+    def probe(self, engine):
+        """Check the replica answers and measure how far behind it is"""
+        try:
+            with engine.connect() as connection:
+                if engine.dialect.name == 'postgresql':
+                    self.lag = float(connection.exec_driver_sql(POSTGRES_LAG_SQL).scalar() or 0)
+                else:
+                    # Local copies (e.g. SQLite files) report no replication lag
+                    connection.exec_driver_sql('SELECT 1')
+                    self.lag = 0.0
+            self.healthy = True
+            self.error = None
+        except Exception as error:
+            self.healthy = False
+            self.error = str(error).splitlines()[0]
+            current_app.logger.warning('Read replica %s unavailable: %s', self.bind_key, self.error)
+
+    def usable(self, engine, max_lag, check_interval):
+        """Check whether reads may go to this replica, probing when due
+
+        A probe already running in another thread is not waited for.
+        """
+        due = self.checked_at is None or time.monotonic() - self.checked_at >= check_interval
+        if due and self._lock.acquire(blocking=False):
+            try:
+                self.probe(engine)
+                self.checked_at = time.monotonic()
+            finally:
+                self._lock.release()
+        return self.healthy and self.lag is not None and self.lag <= max_lag
+
+class ReplicaSet:
+    """The app's replicas, handed out round robin"""
+
+    def __init__(self, bind_keys, max_lag, check_interval):
+        self.replicas = [Replica(bind_key) for bind_key in bind_keys]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def choose(self, engines):
+        """Get a healthy replica engine that is within the staleness limit, or None"""
+        count = len(self.replicas)
+        with self._lock:
+            start = self._next
+            self._next = (start + 1) % count if count else 0
+        for offset in range(count):
+            replica = self.replicas[(start + offset) % count]
+            engine = engines[replica.bind_key]
+            if replica.usable(engine, self.max_lag, self.check_interval):
+                return engine
+        return None
+
+class RoutingSession(Session):
+    """Session that sends read-only work to a replica when allowed
+
+    A session reads from a replica only while REPLICA_READS_KEY is set in
+    its info, and sticks to one replica for consistent reads. Any write
+    (a flush, pending changes or a DML statement) switches it to the
+    primary for the rest of its life. Falls back to the primary when no
+    replica is healthy and within REPLICA_MAX_LAG.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not self.info.get(REPLICA_READS_KEY):
+            return engine
+        if self._flushing or getattr(clause, 'is_dml', False) or self.new or self.deleted or self.dirty:
+            self.info.pop(REPLICA_READS_KEY, None)
+            self.info.pop(REPLICA_ENGINE_KEY, None)
+            return engine
+        if engine is not self._db.engines.get(None):
+            return engine
+        if REPLICA_ENGINE_KEY not in self.info:
+            replicas = current_app.extensions.get('replicas')
+            self.info[REPLICA_ENGINE_KEY] = replicas.choose(self._db.engines) if replicas else None
+        return self.info[REPLICA_ENGINE_KEY] or engine
+
+@contextmanager
+def replica_reads(db_session=None):
+    """Let a block of read-only code outside a listed endpoint use a replica"""
+    db_session = db_session or current_app.extensions['sqlalchemy'].session
+    previous = db_session.info.get(REPLICA_READS_KEY)
+    db_session.info[REPLICA_READS_KEY] = True
+    try:
+        yield db_session
+    finally:
+        if previous is None:
+            db_session.info.pop(REPLICA_READS_KEY, None)
+            db_session.info.pop(REPLICA_ENGINE_KEY, None)
+
+def _route_request_reads():
+    """Allow replica reads for listed read-only endpoints"""
+    if request.method not in ('GET', 'HEAD') or request.endpoint not in current_app.config['REPLICA_ENDPOINTS']:
+        return
+    if time.time() < session.get(PRIMARY_UNTIL_KEY, 0):
+        # This user wrote recently; a replica may not have their change yet
+        return
+    current_app.extensions['sqlalchemy'].session.info[REPLICA_READS_KEY] = True
+
+def _read_own_writes(changes):
+    """Keep a user who just committed on the primary until replicas catch up"""
+    if has_request_context() and current_app.extensions.get('replicas'):
+        session[PRIMARY_UNTIL_KEY] = time.time() + current_app.config['REPLICA_MAX_LAG']
+
+@replicas_cli.command('status')
+@with_appcontext
+def status_command():
+    """Probe every replica and show its health and lag"""
+    replicas = current_app.extensions.get('replicas')
+    if not replicas:
+        click.echo('No read replicas configured (set DATABASE_REPLICA_URLS)')
+        return
+    engines = current_app.extensions['sqlalchemy'].engines
+    for replica in replicas.replicas:
+        replica.probe(engines[replica.bind_key])
+        state = 'ok' if replica.healthy else f'unavailable ({replica.error})'
+        lag = f', lag {replica.lag:.1f}s' if replica.lag is not None and replica.healthy else ''
+        click.echo(f'{replica.bind_key} {engines[replica.bind_key].url!r}: {state}{lag}')
+
+@replicas_cli.command('refresh')
+@with_appcontext
+def refresh_command():
+    """Copy the primary SQLite database onto SQLite replica files"""
+    replicas = current_app.extensions.get('replicas')
+    engines = current_app.extensions['sqlalchemy'].engines
+    primary = engines[None]
+    if not replicas or primary.dialect.name != 'sqlite':
+        raise click.ClickException('refresh only copies a SQLite primary to SQLite replicas')
+    for replica in replicas.replicas:
+        engine = engines[replica.bind_key]
+        if engine.dialect.name != 'sqlite':
+            continue
+        source = primary.raw_connection()
+        target = engine.raw_connection()
+        try:
+            source.driver_connection.backup(target.driver_connection)
+        finally:
+            target.close()
+            source.close()
+        click.echo(f'Copied primary to {engine.url.database}')
+
+def init_replicas(app):
+    """Register replica binds, request routing and CLI commands
+
+    Call before db.init_app so the replica engines are created with the rest.
+    """
+    app.cli.add_command(replicas_cli)
+    urls = app.config['SQLALCHEMY_REPLICAS']
+    if not urls:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    bind_keys = []
+    for index, url in enumerate(urls, start=1):
+        binds[replica_bind_key(index)] = url
+        bind_keys.append(replica_bind_key(index))
+    app.config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['replicas'] = ReplicaSet(bind_keys, app.config['REPLICA_MAX_LAG'],
+                                            app.config['REPLICA_CHECK_INTERVAL'])
+    app.before_request(_route_request_reads)
+    on_commit(_read_own_writes)
@@ -0,0 +1,183 @@
+"""
+HomeCare Management System - Care Report Generation
+Professional Care Coordination Platform
+
+Drafts CareReport rows for a whole caseload from grouped aggregates, so a
+monthly run costs a handful of statements rather than several per client.
+"""
+
+from datetime import date, datetime, timedelta
+import click
+from flask.cli import AppGroup, with_appcontext
+from models import db, Client, User, CareReport, IncidentReport, CareActionRollup, ScheduledTaskRollup
+from services.changes import mark_changed
+
+reports_cli = AppGroup('reports', help='Generate care reports.')
+
+# Report type -> metrics period it covers
+REPORT_PERIODS = {
+    'daily': 'days',
+    'weekly': 'weeks',
+    'monthly': 'months'
+}
+
+STAT_FIELDS = ('total_actions', 'completed_tasks', 'pending_tasks', 'urgent_issues')
+
+URGENT_SEVERITIES = ('high', 'critical')
+
+def report_period(report_type, day):
+    """Get the (first, last) day of the report period containing a date"""
+    from services.metrics import period_start, next_period
+    group_by = REPORT_PERIODS[report_type]
+    start = period_start(day, group_by)
+    return start, next_period(start, group_by) - timedelta(days=1)
+
+def _count_if(condition, column=None):
+    return db.func.sum(db.case((condition, column if column is not None else 1), else_=0))
+
+def client_report_stats(start_date, end_date, client_ids=None):
+    """Get {client_id: {stat field: count}} for every client active in a period
+
+    One statement aggregates the daily care action and scheduled task
+    rollups and the incident reports, grouped by client:
+    total_actions counts care actions that were not cancelled,
+    completed_tasks and pending_tasks count scheduled tasks by status, and
+    urgent_issues counts high or critical severity or urgent incidents plus
+    urgent scheduled tasks still pending.
+    """
+    def part(client_id, **counts):
+        # One labelled column per stat, zero where this source adds nothing
+        return db.select(client_id.label('client_id'), *[
+            counts.get(field, db.literal(0)).label(field) for field in STAT_FIELDS]).group_by(client_id)
+
+    actions = part(
+        CareActionRollup.client_id,
+        total_actions=_count_if(CareActionRollup.status != 'cancelled', CareActionRollup.row_count)
+    ).where(CareActionRollup.rollup_date.between(start_date, end_date))
+    tasks = part(
+        ScheduledTaskRollup.client_id,
+        completed_tasks=_count_if(ScheduledTaskRollup.status == 'completed', ScheduledTaskRollup.row_count),
+        pending_tasks=_count_if(ScheduledTaskRollup.status == 'pending', ScheduledTaskRollup.row_count),
+        urgent_issues=_count_if(db.and_(ScheduledTaskRollup.status == 'pending',
+                                        ScheduledTaskRollup.priority == 'urgent'), ScheduledTaskRollup.row_count)
+    ).where(ScheduledTaskRollup.rollup_date.between(start_date, end_date))
+    incidents = part(
+        IncidentReport.client_id,
+        urgent_issues=_count_if(db.or_(IncidentReport.severity.in_(URGENT_SEVERITIES),
+                                       IncidentReport.priority == 'urgent'))
+    ).where(IncidentReport.incident_date.between(start_date, end_date))
+    if client_ids is not None:
+        actions = actions.where(CareActionRollup.client_id.in_(client_ids))
+        tasks = tasks.where(ScheduledTaskRollup.client_id.in_(client_ids))
+        incidents = incidents.where(IncidentReport.client_id.in_(client_ids))
+
+    combined = db.union_all(actions, tasks, incidents).subquery()
+    query = db.select(combined.c.client_id, *[db.func.sum(combined.c[field]) for field in STAT_FIELDS]) \
+        .group_by(combined.c.client_id)
+    return {row[0]: dict(zip(STAT_FIELDS, (int(value or 0) for value in row[1:])))
+            for row in db.session.execute(query)}
+
+def _title(report_type, client_name, start_date, end_date):
+    if report_type == 'monthly':
+        period = start_date.strftime('%B %Y')
+    elif report_type == 'weekly':
+        period = f'week of {start_date:%d %b %Y}'
+    else:
+        period = f'{start_date:%d %b %Y}'
+    return f'{report_type.title()} Care Report: {client_name}, {period}'[:200]
+
+def _summary(stats):
+    return (f"{stats['total_actions']} care action(s) logged, {stats['completed_tasks']} scheduled task(s) "
+            f"completed and {stats['pending_tasks']} pending, {stats['urgent_issues']} urgent issue(s).")
+
+def generate_care_reports(report_type, day, created_by_id, client_ids=None, refresh=False):
+    """Draft a report of the given type for every client in the caseload
+
+    The caseload is every active client plus any client with activity in
+    the period containing day. Clients that already have a report for the
+    period are skipped; with refresh=True the figures of their draft
+    reports are recalculated. Rows are written with bulk statements and the
+    caller commits. Returns counts of created, refreshed and skipped
+    reports.
+    """
+    start_date, end_date = report_period(report_type, day)
+    stats = client_report_stats(start_date, end_date, client_ids)
+
+    clients = db.select(Client.id, Client.name, Client.status)
+    if client_ids is not None:
+        clients = clients.where(Client.id.in_(client_ids))
+    caseload = [(id, name) for id, name, status in db.session.execute(clients)
+                if status == 'active' or id in stats]
+
+    existing = {client_id: (id, status) for id, client_id, status in db.session.execute(
+        db.select(CareReport.id, CareReport.client_id, CareReport.status).where(
+            CareReport.report_type == report_type,
+            CareReport.report_period_start == start_date,
+            CareReport.report_period_end == end_date))}
+
+    empty = dict.fromkeys(STAT_FIELDS, 0)
+    now = datetime.utcnow()
+    new_rows, refreshed_rows, changed = [], [], set()
+    for client_id, name in caseload:
+        client_stats = stats.get(client_id, empty)
+        if client_id not in existing:
+            new_rows.append(dict(
+                client_stats, client_id=client_id, created_by_id=created_by_id, report_type=report_type,
+                report_date=end_date, report_period_start=start_date, report_period_end=end_date,
+                title=_title(report_type, name, start_date, end_date), summary=_summary(client_stats),
+                follow_up_required=client_stats['urgent_issues'] > 0, status='draft',
+                created_at=now, updated_at=now))
+        elif refresh and existing[client_id][1] == 'draft':
+            refreshed_rows.append(dict(client_stats, report_id=existing[client_id][0],
+                                       summary=_summary(client_stats), updated_at=now))
+        else:
+            continue
+        changed.add(client_id)
+
+    if new_rows:
+        db.session.execute(db.insert(CareReport), new_rows)
+    if refreshed_rows:
+        table = CareReport.__table__
+        db.session.execute(table.update().where(table.c.id == db.bindparam('report_id')), refreshed_rows)
+    # Bulk statements bypass the flush listeners
+    if changed:
+        mark_changed(db.session, CareReport, changed)
+    return {'period_start': start_date, 'period_end': end_date, 'created': len(new_rows),
+            'refreshed': len(refreshed_rows), 'skipped': len(caseload) - len(new_rows) - len(refreshed_rows)}
+
+def care_reports_job(context, report_type, day=None, client_ids=None, refresh=False):
+    """Background job handler drafting care reports for the caseload"""
+    if report_type not in REPORT_PERIODS:
+        raise ValueError(f"report_type must be one of {', '.join(REPORT_PERIODS)}")
+    day = date.fromisoformat(day) if day else date.today()
+    context.progress(0, message=f'Generating {report_type} reports')
+    result = generate_care_reports(report_type, day, context.created_by_id, client_ids, refresh)
+    db.session.commit()
+    written = result['created'] + result['refreshed']
+    context.progress(written, written,
+                     message=f"{result['created']} created, {result['refreshed']} refreshed, "
+                             f"{result['skipped']} skipped", force=True)
+
+@reports_cli.command('generate')
+@click.option('--type', 'report_type', type=click.Choice(list(REPORT_PERIODS)), default='monthly',
+              show_default=True)
+@click.option('--date', 'day', type=click.DateTime(['%Y-%m-%d']), default=None,
+              help='A day in the period to report on (default: the previous period).')
+@click.option('--user', 'username', default=None, help='Author of the reports (default: the first admin).')
+@click.option('--refresh', is_flag=True, help='Recalculate existing draft reports.')
+@with_appcontext
+def generate_command(report_type, day, username, refresh):
+    """Draft care reports for every client in the caseload"""
+    if day:
+        day = day.date()
+    else:
+        start, _ = report_period(report_type, date.today())
+        day = start - timedelta(days=1)
+    author = User.query.filter_by(username=username).first() if username else \
+        User.query.filter_by(role='admin').order_by(User.id).first()
+    if author is None:
+        raise click.ClickException(f'No user {username}' if username else 'No admin user to author the reports')
+    result = generate_care_reports(report_type, day, author.id, refresh=refresh)
+    db.session.commit()
+    click.echo(f"{report_type.title()} reports for {result['period_start']} to {result['period_end']}: "
+               f"{result['created']} created, {result['refreshed']} refreshed, {result['skipped']} skipped")
@@ -0,0 +1,210 @@
+"""
+HomeCare Management System - Early-Warning Scores
+Professional Care Coordination Platform
+
+Scores clients NEWS2-style from their latest assessment readings and recent
+incidents and stores the result in client_risk_scores, so ranking the
+caseload reads one small table. Commits that touch a client's assessments
+or incidents rescore just that client, and a daily job rescores everyone so
+readings and incidents age out of the scoring windows.
+"""
+
+import json
+from datetime import date, datetime, timedelta
+import click
+from flask import current_app, has_app_context
+from flask.cli import AppGroup, with_appcontext
+from models import db, ClientRiskScore, IncidentReport, MedicalAssessment
+
+risk_cli = AppGroup('risk', help='Maintain client early-warning scores.')
+
+# Assessment parameter -> (highest value, points) bands in ascending order;
+# a reading scores the points of the first band it fits, None has no limit.
+# Vitals use the NEWS2 bands; pain level is a local addition.
+SCORE_BANDS = {
+    'heart_rate': ((40, 3), (50, 1), (90, 0), (110, 1), (130, 2), (None, 3)),
+    'blood_pressure_systolic': ((90, 3), (100, 2), (110, 1), (219, 0), (None, 3)),
+    'oxygen_saturation': ((91, 3), (93, 2), (95, 1), (None, 0)),
+    'temperature': ((35.0, 3), (36.0, 1), (38.0, 0), (39.0, 1), (None, 2)),
+    'pain_level': ((3, 0), (6, 1), (None, 2))
+}
+
+# Cognitive status points, standing in for the NEWS2 level of consciousness
+COGNITIVE_POINTS = {'alert': 0, 'confused': 3, 'disoriented': 3}
+
+# Points for the most severe incident in the last RISK_INCIDENT_DAYS
+INCIDENT_POINTS = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+
+# Parameters that raise the risk level on their own when they score 3
+RED_FLAG_PARAMETERS = ('heart_rate', 'blood_pressure_systolic', 'oxygen_saturation', 'temperature',
+                       'cognitive_status')
+
+# Assessment columns read, in query column order
+ASSESSMENT_PARAMETERS = tuple(SCORE_BANDS) + ('cognitive_status',)
+
+# Lowest to highest
+RISK_LEVELS = ('low', 'low_medium', 'medium', 'high')
+
+def band_points(parameter, value):
+    """Get the points for one reading"""
+    for limit, points in SCORE_BANDS[parameter]:
+        if limit is None or value <= limit:
+            return points
+
+def risk_level(score, red_flag):
+    """Get the NEWS2 clinical risk for a total score"""
+    if score >= 7:
+        return 'high'
+    if score >= 5:
+        return 'medium'
+    return 'low_medium' if red_flag else 'low'
+
+def score_client(readings, incident_severity=None):
+    """Score one client
+
+    readings maps assessment parameters to their latest recorded value.
+    Returns (score, risk level, red flag, components), where components
+    holds the value and points of every parameter that was scored.
+    """
+    components = {}
+    for parameter, value in readings.items():
+        if parameter == 'cognitive_status':
+            points = COGNITIVE_POINTS.get(str(value).lower())
+        else:
+            points = band_points(parameter, value)
+        if points is not None:
+            components[parameter] = {'value': value, 'points': points}
+    if incident_severity in INCIDENT_POINTS:
+        components['incidents'] = {'value': incident_severity, 'points': INCIDENT_POINTS[incident_severity]}
+    score = sum(component['points'] for component in components.values())
+    red_flag = any(components[parameter]['points'] == 3
+                   for parameter in RED_FLAG_PARAMETERS if parameter in components)
+    return score, risk_level(score, red_flag), red_flag, components
+
+def latest_readings(connection, since, client_ids=None):
+    """Get {client_id: (latest assessment date, {parameter: latest value})}
+
+    Each parameter takes the newest assessment since the given date that
+    recorded it, so a check-up that skipped a vital keeps the previous one.
+    """
+    query = db.select(MedicalAssessment.client_id, MedicalAssessment.assessment_date,
+                      *[getattr(MedicalAssessment, name) for name in ASSESSMENT_PARAMETERS]) \
+        .where(MedicalAssessment.assessment_date >= since) \
+        .order_by(MedicalAssessment.client_id, MedicalAssessment.assessment_date.desc(),
+                  MedicalAssessment.assessment_time.desc(), MedicalAssessment.id.desc())
+    if client_ids is not None:
+        query = query.where(MedicalAssessment.client_id.in_(client_ids))
+    readings = {}
+    for client_id, assessment_date, *values in connection.execute(query):
+        if client_id not in readings:
+            readings[client_id] = (assessment_date, {})
+        latest = readings[client_id][1]
+        for parameter, value in zip(ASSESSMENT_PARAMETERS, values):
+            if value is not None and parameter not in latest:
+                latest[parameter] = value
+    return readings
+
+def worst_incidents(connection, since, client_ids=None):
+    """Get {client_id: severity} of each client's most severe incident since a date"""
+    query = db.select(IncidentReport.client_id, IncidentReport.severity) \
+        .where(IncidentReport.incident_date >= since) \
+        .group_by(IncidentReport.client_id, IncidentReport.severity)
+    if client_ids is not None:
+        query = query.where(IncidentReport.client_id.in_(client_ids))
+    worst = {}
+    for client_id, severity in connection.execute(query):
+        if INCIDENT_POINTS.get(severity, -1) > INCIDENT_POINTS.get(worst.get(client_id), -1):
+            worst[client_id] = severity
+    return worst
+
+def rescore_clients(client_ids=None, connection=None, today=None):
+    """Recompute and store the scores of the given clients, or of every client
+
+    Clients with no assessment or incident inside the scoring windows lose
+    their score. Only scores that changed are written. Returns counts of
+    created, updated, removed and unchanged scores.
+    """
+    connection = connection or db.session.connection()
+    config = current_app.config
+    today = today or date.today()
+    readings = latest_readings(connection, today - timedelta(days=config['RISK_ASSESSMENT_DAYS']), client_ids)
+    incidents = worst_incidents(connection, today - timedelta(days=config['RISK_INCIDENT_DAYS']), client_ids)
+
+    table = ClientRiskScore.__table__
+    query = db.select(table.c.id, table.c.client_id, table.c.score, table.c.risk_level,
+                      table.c.components, table.c.assessment_date)
+    if client_ids is not None:
+        query = query.where(table.c.client_id.in_(client_ids))
+    existing = {row.client_id: row for row in connection.execute(query)}
+
+    now = datetime.utcnow()
+    new_rows, changed_rows, unchanged = [], [], 0
+    for client_id in set(readings) | set(incidents):
+        assessment_date, latest = readings.get(client_id, (None, {}))
+        score, level, red_flag, components = score_client(latest, incidents.get(client_id))
+        row = dict(client_id=client_id, score=score, risk_level=level, red_flag=red_flag,
+                   components=json.dumps(components, sort_keys=True), assessment_date=assessment_date,
+                   updated_at=now)
+        current = existing.pop(client_id, None)
+        if current is None:
+            new_rows.append(row)
+        elif (current.score, current.risk_level, current.components, current.assessment_date) != \
+                (score, level, row['components'], assessment_date):
+            changed_rows.append(dict(row, score_id=current.id))
+        else:
+            unchanged += 1
+
+    if new_rows:
+        connection.execute(table.insert(), new_rows)
+    if changed_rows:
+        connection.execute(table.update().where(table.c.id == db.bindparam('score_id')), changed_rows)
+    if existing:
+        connection.execute(table.delete().where(table.c.id.in_([row.id for row in existing.values()])))
+    return {'created': len(new_rows), 'updated': len(changed_rows), 'removed': len(existing),
+            'unchanged': unchanged}
+
+def score_to_dict(risk_score, client_name=None):
+    """Serialize a stored score for the at-risk API"""
+    return {
+        'client_id': risk_score.client_id,
+        'client_name': client_name,
+        'score': risk_score.score,
+        'risk_level': risk_score.risk_level,
+        'red_flag': bool(risk_score.red_flag),
+        'components': risk_score.get_components(),
+        'assessment_date': risk_score.assessment_date.isoformat() if risk_score.assessment_date else None,
+        'updated_at': risk_score.updated_at.isoformat() if risk_score.updated_at else None
+    }
+
+def rescore_on_commit(changes):
+    """Rescore the clients whose assessments or incidents were committed"""
+    if not has_app_context():
+        return
+    client_ids = changes.clients_for(MedicalAssessment, IncidentReport)
+    if not client_ids:
+        return
+    try:
+        with db.engine.begin() as connection:
+            rescore_clients(client_ids, connection)
+    except Exception:
+        # The triggering commit stands; the next batch rescore catches up
+        current_app.logger.exception('Rescoring clients %s failed', sorted(client_ids))
+
+def rescore_job(context):
+    """Background job handler rescoring every client, queued daily so old readings age out"""
+    context.progress(0, message='Rescoring clients')
+    result = rescore_clients()
+    db.session.commit()
+    context.progress(1, 1, message=f"{result['created']} created, {result['updated']} updated, "
+                                   f"{result['removed']} removed", force=True)
+
+@risk_cli.command('rescore')
+@click.option('--client', 'client_ids', type=int, multiple=True,
+              help='Client to rescore, repeatable (default: every client).')
+@with_appcontext
+def rescore_command(client_ids):
+    """Recompute early-warning scores from the latest assessments and incidents"""
+    result = rescore_clients(list(client_ids) or None)
+    db.session.commit()
+    click.echo(f"{result['created']} created, {result['updated']} updated, {result['removed']} removed, "
+               f"{result['unchanged']} unchanged")
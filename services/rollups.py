@@ -0,0 +1,180 @@
+"""
+HomeCare Management System - Daily Rollups
+Professional Care Coordination Platform
+"""
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from models import db, CareAction, ScheduledTask, CareActionRollup, ScheduledTaskRollup
+
+# Source model -> (rollup model, source date attribute)
+ROLLUP_SOURCES = {
+    CareAction: (CareActionRollup, 'action_date'),
+    ScheduledTask: (ScheduledTaskRollup, 'scheduled_date')
+}
+
+KEY_ATTRIBUTES = ('client_id', 'task_category', 'priority', 'status')
+
+rollups_cli = AppGroup('rollups', help='Maintain the daily care rollup tables.')
+
+def _attribute_value(state, name, previous):
+    """Get the current or pre-flush value of an attribute"""
+    history = state.attrs[name].history
+    if previous and history.deleted:
+        return history.deleted[0]
+    if history.added:
+        return history.added[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return state.attrs[name].value
+
+def _rollup_key(obj, date_attribute, previous=False):
+    """Build the rollup key for a source row"""
+    state = inspect(obj)
+    key = {'rollup_date': _attribute_value(state, date_attribute, previous)}
+    for name in KEY_ATTRIBUTES:
+        key[name] = _attribute_value(state, name, previous)
+    return normalize_key(key)
+
+def normalize_key(key):
+    """Replace NULL key parts with empty strings so they stay comparable"""
+    for name in ('task_category', 'priority', 'status'):
+        if key.get(name) is None:
+            key[name] = ''
+    return key
+
+def _key_changed(obj, date_attribute):
+    """Check whether a flush changes any part of a row's rollup key"""
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes()
+               for name in (date_attribute,) + KEY_ATTRIBUTES)
+
+def _add_delta(deltas, rollup_model, key, amount):
+    """Accumulate a count change for one rollup key"""
+    bucket = deltas.setdefault(rollup_model, {})
+    frozen = tuple(sorted(key.items()))
+    bucket[frozen] = bucket.get(frozen, 0) + amount
+
+def collect_deltas(session):
+    """Work out rollup count changes for the objects in a flush"""
+    deltas = {}
+    for obj in session.new:
+        source = ROLLUP_SOURCES.get(type(obj))
+        if source:
+            _add_delta(deltas, source[0], _rollup_key(obj, source[1]), 1)
+    for obj in session.deleted:
+        source = ROLLUP_SOURCES.get(type(obj))
+        if source:
+            _add_delta(deltas, source[0], _rollup_key(obj, source[1], previous=True), -1)
+    for obj in session.dirty:
+        source = ROLLUP_SOURCES.get(type(obj))
+        if source and obj not in session.deleted and _key_changed(obj, source[1]):
+            _add_delta(deltas, source[0], _rollup_key(obj, source[1], previous=True), -1)
+            _add_delta(deltas, source[0], _rollup_key(obj, source[1]), 1)
+    return deltas
+
+def _upsert_statement(connection, table):
+    """Build an increment-or-insert statement for the connection's dialect"""
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif connection.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    statement = insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=['rollup_date'] + list(KEY_ATTRIBUTES),
+        set_={'row_count': table.c.row_count + statement.excluded.row_count}
+    )
+
+def apply_deltas(connection, deltas):
+    """Apply accumulated count changes to the rollup tables
+
+    Rollup rows whose count drops to zero are deleted.
+    """
+    for rollup_model, changes in deltas.items():
+        table = rollup_model.__table__
+        rows = [dict(key, row_count=amount) for key, amount in changes.items() if amount]
+        if not rows:
+            continue
+        statement = _upsert_statement(connection, table)
+        if statement is not None:
+            connection.execute(statement, rows)
+        else:
+            # Portable fallback: increment existing rows, insert the rest
+            for row in rows:
+                conditions = [table.c[name] == row[name] for name in ['rollup_date'] + list(KEY_ATTRIBUTES)]
+                result = connection.execute(table.update().where(*conditions)
+                                            .values(row_count=table.c.row_count + row['row_count']))
+                if result.rowcount == 0:
+                    connection.execute(table.insert().values(**row))
+        emptied = [{f'key_{name}': row[name] for name in ['rollup_date'] + list(KEY_ATTRIBUTES)}
+                   for row in rows if row['row_count'] < 0]
+        if emptied:
+            conditions = [table.c[name] == db.bindparam(f'key_{name}')
+                          for name in ['rollup_date'] + list(KEY_ATTRIBUTES)]
+            connection.execute(table.delete().where(*conditions, table.c.row_count <= 0), emptied)
+
+def record_rows(connection, source_model, rows, amount=1):
+    """Apply rollup changes for rows written outside the ORM unit of work
+
+    Bulk inserts and deletes bypass the flush events, so callers pass the
+    written rows as dicts of column values.
+    """
+    rollup_model, date_attribute = ROLLUP_SOURCES[source_model]
+    deltas = {}
+    for row in rows:
+        key = {'rollup_date': row[date_attribute]}
+        for name in KEY_ATTRIBUTES:
+            key[name] = row.get(name)
+        _add_delta(deltas, rollup_model, normalize_key(key), amount)
+    apply_deltas(connection, deltas)
+
+def update_rollups_after_flush(session, flush_context):
+    """Keep the rollup tables in step with the rows written by a flush"""
+    deltas = collect_deltas(session)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+def rebuild_rollups(connection=None):
+    """Recompute every rollup table from its source rows"""
+    connection = connection or db.session.connection()
+    counts = {}
+    for source_model, (rollup_model, date_attribute) in ROLLUP_SOURCES.items():
+        table = rollup_model.__table__
+        columns = [getattr(source_model, date_attribute)] + \
+            [getattr(source_model, 'client_id')] + \
+            [db.func.coalesce(getattr(source_model, name), '') for name in KEY_ATTRIBUTES[1:]]
+        grouped = db.select(*columns, db.func.count(source_model.id)).group_by(*columns)
+        connection.execute(table.delete())
+        connection.execute(table.insert().from_select(
+            ['rollup_date'] + list(KEY_ATTRIBUTES) + ['row_count'], grouped))
+        counts[table.name] = connection.execute(
+            db.select(db.func.count()).select_from(table)).scalar()
+    return counts
+
+@rollups_cli.command('rebuild')
+def rebuild_command():
+    """Backfill or rebuild the daily rollups from source rows"""
+    counts = rebuild_rollups()
+    db.session.commit()
+    for table_name, count in counts.items():
+        click.echo(f'{table_name}: {count} rollup rows')
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    """No-op set listener; registering it with active_history is what matters"""
+
+def init_rollups(app):
+    """Register the rollup flush listener and CLI commands
+
+    Key attributes load their old value before being set, even when
+    expired, so the flush can take the row off its previous rollup.
+    """
+    if not event.contains(Session, 'after_flush', update_rollups_after_flush):
+        event.listen(Session, 'after_flush', update_rollups_after_flush)
+        for source_model, (_, date_attribute) in ROLLUP_SOURCES.items():
+            for name in (date_attribute,) + KEY_ATTRIBUTES:
+                event.listen(getattr(source_model, name), 'set', _load_previous_value, active_history=True)
+    app.cli.add_command(rollups_cli)
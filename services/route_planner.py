@@ -0,0 +1,259 @@
+"""
+HomeCare Management System - Caregiver Route Planning
+Professional Care Coordination Platform
+
+Orders a caregiver's visits for a day to cut travel while keeping each
+visit inside its time window. Travel comes from straight-line (haversine)
+distances between client coordinates, so no map service is needed. A
+time-oriented nearest neighbour tour is improved with 2-opt and or-opt
+moves; every move of an iteration is scored at once as NumPy arrays.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from time import perf_counter
+import numpy as np
+from flask import current_app
+from models import db, Client, CarePlanTask, ScheduledTask
+
+EARTH_RADIUS_KM = 6371.0
+
+# Travel minutes one minute of lateness costs, so a shorter route never
+# wins by breaking a time window it could have kept
+LATE_PENALTY = 100.0
+
+# Longest segment moved by an or-opt move
+OR_OPT_LENGTHS = (1, 2, 3)
+
+def haversine_matrix(latitudes, longitudes, to_latitudes=None, to_longitudes=None):
+    """Great-circle distances in km between two sets of points, by default all pairs of one set"""
+    lat1 = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lng1 = np.radians(np.asarray(longitudes, dtype=np.float64))
+    if to_latitudes is None:
+        lat2, lng2 = lat1, lng1
+    else:
+        lat2 = np.radians(np.asarray(to_latitudes, dtype=np.float64))
+        lng2 = np.radians(np.asarray(to_longitudes, dtype=np.float64))
+    a = np.sin((lat2[None, :] - lat1[:, None]) / 2) ** 2 + \
+        np.cos(lat1[:, None]) * np.cos(lat2[None, :]) * np.sin((lng2[None, :] - lng1[:, None]) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def travel_minutes(distance_km, config=None):
+    """Driving minutes for straight-line distances"""
+    config = config or current_app.config
+    return distance_km * config['ROUTE_DETOUR_FACTOR'] / config['ROUTE_SPEED_KMH'] * 60
+
+def minutes(value):
+    """Minutes since midnight of a time or 'HH:MM' string"""
+    if isinstance(value, str):
+        value = datetime.strptime(value, '%H:%M').time()
+    return value.hour * 60 + value.minute + value.second / 60
+
+def clock(value):
+    """Format minutes since midnight as HH:MM"""
+    value = int(round(value))
+    return f'{value // 60:02d}:{value % 60:02d}'
+
+@lru_cache(maxsize=64)
+def neighbourhood(size):
+    """Position permutations of every 2-opt and or-opt move on a route of a given length
+
+    Moves only rearrange positions, so one table serves every route of
+    that length: route[moves] gives all the neighbouring routes.
+    """
+    positions = list(range(size))
+    moves = []
+    for i in range(size - 1):
+        for j in range(i + 2, size + 1):
+            moves.append(positions[:i] + positions[i:j][::-1] + positions[j:])
+    for length in OR_OPT_LENGTHS:
+        for i in range(size - length + 1):
+            segment = positions[i:i + length]
+            rest = positions[:i] + positions[i + length:]
+            for j in range(len(rest) + 1):
+                if j != i:
+                    moves.append(rest[:j] + segment + rest[j:])
+    if not moves:
+        return np.zeros((0, size), dtype=np.intp)
+    return np.unique(np.array(moves, dtype=np.intp), axis=0)
+
+class RouteProblem:
+    """Travel times and visit windows for one caregiver's day, in minutes
+
+    travel[i, j] is the drive from stop i to stop j and start_travel[i]
+    the drive from the starting point, zero when the route starts at its
+    first stop. A visit must start between earliest[i] and latest[i] and
+    lasts service[i].
+    """
+
+    def __init__(self, travel, distance, start_travel, start_distance, earliest, latest, service, start_time):
+        self.travel = travel
+        self.distance = distance
+        self.start_travel = start_travel
+        self.start_distance = start_distance
+        self.earliest = earliest
+        self.latest = latest
+        self.service = service
+        self.start_time = start_time
+        self.size = len(earliest)
+
+    def evaluate(self, routes):
+        """Score routes given as rows of stop indexes
+
+        Returns (cost, travel minutes, late minutes, visit start times);
+        visits start on arrival or when their window opens.
+        """
+        first = routes[:, 0]
+        leg = self.start_travel[first]
+        begin = np.maximum(self.start_time + leg, self.earliest[first])
+        starts = [begin]
+        total_travel = leg.copy()
+        late = np.maximum(begin - self.latest[first], 0.0)
+        for step in range(1, routes.shape[1]):
+            previous, current = routes[:, step - 1], routes[:, step]
+            leg = self.travel[previous, current]
+            begin = np.maximum(begin + self.service[previous] + leg, self.earliest[current])
+            starts.append(begin)
+            total_travel += leg
+            late += np.maximum(begin - self.latest[current], 0.0)
+        return total_travel + LATE_PENALTY * late, total_travel, late, np.stack(starts, axis=1)
+
+    def nearest_neighbour(self):
+        """Build a route visiting next the stop with the least travel, wait and slack"""
+        unvisited = np.ones(self.size, dtype=bool)
+        route = []
+        legs, now = self.start_travel, self.start_time
+        for _ in range(self.size):
+            arrival = now + legs
+            begin = np.maximum(arrival, self.earliest)
+            # Drive and wait until the visit starts, plus how long it could
+            # still wait; stops whose window is closing come first
+            score = (begin - now) + np.maximum(self.latest - begin, 0.0)
+            score = np.where(unvisited, score, np.inf)
+            stop = int(np.argmin(score))
+            route.append(stop)
+            unvisited[stop] = False
+            now = begin[stop] + self.service[stop]
+            legs = self.travel[stop]
+        return np.array(route, dtype=np.intp)
+
+    def improve(self, route, deadline):
+        """Apply the best improving 2-opt or or-opt move until none is left or time runs out"""
+        moves = neighbourhood(self.size)
+        cost = self.evaluate(route[None, :])[0][0]
+        while len(moves) and perf_counter() < deadline:
+            candidates = route[moves]
+            costs = self.evaluate(candidates)[0]
+            best = int(np.argmin(costs))
+            if costs[best] >= cost - 1e-6:
+                break
+            route, cost = candidates[best], costs[best]
+        return route
+
+    def solve(self, initial, time_budget):
+        """Get the cheapest of the given order and the improved nearest neighbour route"""
+        deadline = perf_counter() + time_budget
+        routes = [initial]
+        if self.size > 1:
+            routes.append(self.improve(self.nearest_neighbour(), deadline))
+            routes.append(self.improve(initial, deadline))
+        costs = self.evaluate(np.stack(routes))[0]
+        return routes[int(np.argmin(costs))]
+
+def load_stops(caregiver_id, day):
+    """Get a caregiver's pending visits for a day, in scheduled time order
+
+    Tasks for the same client at the same time make one stop. Visit
+    length comes from the care plan task, or ROUTE_VISIT_MINUTES.
+    """
+    config = current_app.config
+    rows = db.session.execute(
+        db.select(ScheduledTask.id, ScheduledTask.task_name, ScheduledTask.scheduled_time, ScheduledTask.client_id,
+                  Client.name, Client.latitude, Client.longitude, CarePlanTask.duration_minutes)
+        .join(Client, Client.id == ScheduledTask.client_id)
+        .outerjoin(CarePlanTask, CarePlanTask.id == ScheduledTask.care_plan_task_id)
+        .where(ScheduledTask.assigned_to_id == caregiver_id, ScheduledTask.scheduled_date == day,
+               ScheduledTask.status == 'pending')
+        .order_by(ScheduledTask.scheduled_time.is_(None), ScheduledTask.scheduled_time, ScheduledTask.id)).all()
+    stops = {}
+    for row in rows:
+        stop = stops.get((row.client_id, row.scheduled_time))
+        if stop is None:
+            stop = stops[(row.client_id, row.scheduled_time)] = {
+                'client_id': row.client_id, 'client_name': row.name, 'latitude': row.latitude,
+                'longitude': row.longitude, 'scheduled_time': row.scheduled_time, 'task_ids': [],
+                'task_names': [], 'duration_minutes': 0}
+        stop['task_ids'].append(row.id)
+        stop['task_names'].append(row.task_name)
+        stop['duration_minutes'] += row.duration_minutes or config['ROUTE_VISIT_MINUTES']
+    return list(stops.values())
+
+def plan_route(stops, start_time=None, start_location=None):
+    """Order stops into a short route that keeps their time windows
+
+    stops are load_stops() dicts in their current order. A stop with a
+    scheduled_time may start ROUTE_TIME_WINDOW_MINUTES either side of it,
+    others any time in the working day. start_location is an optional
+    (latitude, longitude) the caregiver sets out from at start_time
+    (default ROUTE_DAY_START). Stops without coordinates cannot be placed
+    and are returned separately. The result is never worse than the
+    current order, which it reports for comparison.
+    """
+    config = current_app.config
+    start = minutes(start_time or config['ROUTE_DAY_START'])
+    day_end = minutes(config['ROUTE_DAY_END'])
+    slack = config['ROUTE_TIME_WINDOW_MINUTES']
+    located = [stop for stop in stops if stop['latitude'] is not None and stop['longitude'] is not None]
+    unrouted = [stop for stop in stops if stop['latitude'] is None or stop['longitude'] is None]
+    result = {'stops': [], 'unrouted': unrouted, 'total_distance_km': 0.0, 'total_travel_minutes': 0.0,
+              'late_minutes': 0.0, 'current': None}
+    if not located:
+        return result
+
+    service = np.array([stop['duration_minutes'] for stop in located], dtype=np.float64)
+    scheduled = [minutes(stop['scheduled_time']) if stop['scheduled_time'] else None for stop in located]
+    earliest = np.array([start if at is None else at - slack for at in scheduled])
+    latest = np.array([max(day_end - length, start) if at is None else at + slack
+                       for at, length in zip(scheduled, service)])
+    latitudes = [stop['latitude'] for stop in located]
+    longitudes = [stop['longitude'] for stop in located]
+    distance = haversine_matrix(latitudes, longitudes)
+    if start_location:
+        start_distance = haversine_matrix([start_location[0]], [start_location[1]], latitudes, longitudes)[0]
+    else:
+        start_distance = np.zeros(len(located))
+    problem = RouteProblem(travel_minutes(distance, config), distance, travel_minutes(start_distance, config),
+                           start_distance, earliest, latest, service, start)
+
+    current = np.arange(len(located), dtype=np.intp)
+    route = problem.solve(current, config['ROUTE_TIME_BUDGET'])
+    _, travel, late, starts = problem.evaluate(np.stack([route, current]))
+    previous = None
+    for position, index in enumerate(route.tolist()):
+        leg_km = problem.start_distance[index] if previous is None else problem.distance[previous, index]
+        leg_minutes = problem.start_travel[index] if previous is None else problem.travel[previous, index]
+        begin = starts[0, position]
+        result['stops'].append(dict(
+            located[index], scheduled_time=located[index]['scheduled_time'].strftime('%H:%M')
+            if located[index]['scheduled_time'] else None,
+            sequence=position + 1, distance_km=round(float(leg_km), 2),
+            travel_minutes=round(float(leg_minutes), 1),
+            window=[clock(earliest[index]), clock(latest[index])], start=clock(begin),
+            end=clock(begin + service[index]), late_minutes=round(float(max(begin - latest[index], 0.0)), 1)))
+        previous = index
+    route_km, current_km = [problem.start_distance[order[0]] + problem.distance[order[:-1], order[1:]].sum()
+                            for order in (route, current)]
+    result.update(
+        total_distance_km=round(float(route_km), 2),
+        total_travel_minutes=round(float(travel[0]), 1), late_minutes=round(float(late[0]), 1),
+        current={'total_distance_km': round(float(current_km), 2),
+                 'total_travel_minutes': round(float(travel[1]), 1), 'late_minutes': round(float(late[1]), 1)})
+    return result
+
+def caregiver_route(caregiver_id, day, start_time=None, start_location=None):
+    """Plan a caregiver's route for a day from their pending scheduled tasks"""
+    stops = load_stops(caregiver_id, day)
+    route = plan_route(stops, start_time, start_location)
+    for stop in route['unrouted']:
+        stop['scheduled_time'] = stop['scheduled_time'].strftime('%H:%M') if stop['scheduled_time'] else None
+    return dict(route, caregiver_id=caregiver_id, date=day.isoformat())
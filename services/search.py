@@ -0,0 +1,311 @@
+"""
+HomeCare Management System - Full-Text Search
+Professional Care Coordination Platform
+"""
+
+import re
+import weakref
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from markupsafe import Markup, escape
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from models import db, Client, CareAction
+
+# Fields indexed for each searchable document type
+CLIENT_FIELDS = ('description', 'medical_conditions', 'medications', 'special_instructions')
+
+# Private-use markers wrapped around matches before HTML escaping
+HIGHLIGHT_START = '\ue000'
+HIGHLIGHT_END = '\ue001'
+
+# Engines whose index table is known to exist
+_indexed_engines = weakref.WeakSet()
+
+search_cli = AppGroup('search', help='Maintain the full-text search index.')
+
+def search_terms(text):
+    """Split user input into safe search terms"""
+    return re.findall(r'\w+', text or '', re.UNICODE)[:10]
+
+def highlight(snippet):
+    """Escape a snippet and turn match markers into <mark> tags"""
+    if not snippet:
+        return Markup('')
+    escaped = str(escape(snippet))
+    return Markup(escaped.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
+
+def client_document(client):
+    """Build the search document for a client"""
+    body = '\n'.join(filter(None, (getattr(client, field) for field in CLIENT_FIELDS)))
+    return {'doc_type': 'client', 'doc_id': client.id, 'client_id': client.id,
+            'title': client.name or '', 'body': body}
+
+def action_document(action):
+    """Build the search document for a care action's notes"""
+    return {'doc_type': 'care_note', 'doc_id': action.id, 'client_id': action.client_id,
+            'title': action.task_name or '', 'body': action.notes or ''}
+
+class SQLiteSearchBackend:
+    """Search backend using an SQLite FTS5 virtual table"""
+
+    name = 'fts5'
+    table = 'search_index'
+
+    def create(self, connection):
+        connection.exec_driver_sql(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+            "title, body, doc_type UNINDEXED, doc_id UNINDEXED, client_id UNINDEXED, "
+            "tokenize='porter unicode61', prefix='2 3')"
+        )
+
+    def delete(self, connection, doc_type, doc_ids=(), client_ids=()):
+        if doc_ids:
+            connection.execute(db.text(
+                'DELETE FROM search_index WHERE doc_type = :doc_type AND doc_id IN :ids'
+            ).bindparams(db.bindparam('ids', expanding=True)), {'doc_type': doc_type, 'ids': list(doc_ids)})
+        if client_ids:
+            connection.execute(db.text(
+                'DELETE FROM search_index WHERE client_id IN :ids'
+            ).bindparams(db.bindparam('ids', expanding=True)), {'ids': list(client_ids)})
+
+    def insert(self, connection, documents):
+        if documents:
+            connection.execute(db.text(
+                'INSERT INTO search_index (title, body, doc_type, doc_id, client_id) '
+                'VALUES (:title, :body, :doc_type, :doc_id, :client_id)'
+            ), documents)
+
+    def clear(self, connection):
+        connection.exec_driver_sql('DELETE FROM search_index')
+
+    def search(self, connection, terms, doc_types, limit):
+        match = ' '.join('"%s"*' % term for term in terms)
+        rows = connection.execute(db.text(
+            "SELECT doc_type, doc_id, client_id, title, -bm25(search_index, 10.0, 1.0) AS rank, "
+            "snippet(search_index, -1, :start, :end, '…', 16) AS snippet "
+            "FROM search_index WHERE search_index MATCH :match AND doc_type IN :doc_types "
+            "ORDER BY rank DESC LIMIT :limit"
+        ).bindparams(db.bindparam('doc_types', expanding=True)), {
+            'match': match, 'start': HIGHLIGHT_START, 'end': HIGHLIGHT_END,
+            'doc_types': list(doc_types), 'limit': limit
+        })
+        return [dict(row._mapping) for row in rows]
+
+class PostgresSearchBackend:
+    """Search backend using a tsvector column with a GIN index"""
+
+    name = 'tsvector'
+    table = 'search_documents'
+
+    def create(self, connection):
+        connection.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS search_documents ("
+            "doc_type VARCHAR(20) NOT NULL, doc_id INTEGER NOT NULL, client_id INTEGER, "
+            "title TEXT, body TEXT, document TSVECTOR, PRIMARY KEY (doc_type, doc_id))"
+        )
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_search_documents_document "
+            "ON search_documents USING GIN (document)"
+        )
+
+    def delete(self, connection, doc_type, doc_ids=(), client_ids=()):
+        if doc_ids:
+            connection.execute(db.text(
+                'DELETE FROM search_documents WHERE doc_type = :doc_type AND doc_id = ANY(:ids)'
+            ), {'doc_type': doc_type, 'ids': list(doc_ids)})
+        if client_ids:
+            connection.execute(db.text(
+                'DELETE FROM search_documents WHERE client_id = ANY(:ids)'
+            ), {'ids': list(client_ids)})
+
+    def insert(self, connection, documents):
+        if documents:
+            connection.execute(db.text(
+                "INSERT INTO search_documents (doc_type, doc_id, client_id, title, body, document) "
+                "VALUES (:doc_type, :doc_id, :client_id, :title, :body, "
+                "setweight(to_tsvector('english', :title), 'A') || "
+                "setweight(to_tsvector('english', :body), 'B'))"
+            ), documents)
+
+    def clear(self, connection):
+        connection.exec_driver_sql('DELETE FROM search_documents')
+
+    def search(self, connection, terms, doc_types, limit):
+        query = ' & '.join('%s:*' % term for term in terms)
+        rows = connection.execute(db.text(
+            "SELECT doc_type, doc_id, client_id, title, "
+            "ts_rank_cd(document, to_tsquery('english', :query)) AS rank, "
+            "ts_headline('english', CASE WHEN to_tsvector('english', body) @@ to_tsquery('english', :query) "
+            "THEN body ELSE title END, to_tsquery('english', :query), :options) AS snippet "
+            "FROM search_documents WHERE document @@ to_tsquery('english', :query) "
+            "AND doc_type = ANY(:doc_types) ORDER BY rank DESC LIMIT :limit"
+        ), {
+            'query': query, 'doc_types': list(doc_types), 'limit': limit,
+            'options': f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=20, MinWords=8'
+        })
+        return [dict(row._mapping) for row in rows]
+
+SEARCH_BACKENDS = {
+    'sqlite': SQLiteSearchBackend(),
+    'postgresql': PostgresSearchBackend()
+}
+
+def get_backend(connection):
+    """Get the search backend for a connection's dialect, if supported"""
+    return SEARCH_BACKENDS.get(connection.dialect.name)
+
+def index_ready(connection, backend):
+    """Check that the backend's index table exists on the connection's database"""
+    if connection.engine in _indexed_engines:
+        return True
+    if not inspect(connection).has_table(backend.table):
+        return False
+    _indexed_engines.add(connection.engine)
+    return True
+
+def search(text, doc_types=('client', 'care_note'), limit=50):
+    """Run a ranked prefix search
+
+    Returns dicts with doc_type, doc_id, client_id, title, rank and a
+    highlighted snippet, best match first. Until the index exists this
+    falls back to an unranked LIKE search.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return []
+    connection = db.session.connection()
+    backend = get_backend(connection)
+    if backend is None or not index_ready(connection, backend):
+        return _fallback_search(terms, doc_types, limit)
+    results = backend.search(connection, terms, doc_types, limit)
+    for result in results:
+        result['snippet'] = highlight(result['snippet'])
+    return results
+
+def _fallback_search(terms, doc_types, limit):
+    """Unranked LIKE search for databases without a full-text backend"""
+    results = []
+    if 'client' in doc_types:
+        conditions = [db.or_(Client.name.contains(term),
+                             *[getattr(Client, field).contains(term) for field in CLIENT_FIELDS])
+                      for term in terms]
+        for client in Client.query.filter(*conditions).limit(limit):
+            results.append({'doc_type': 'client', 'doc_id': client.id, 'client_id': client.id,
+                            'title': client.name, 'rank': 0.0, 'snippet': Markup('')})
+    if 'care_note' in doc_types:
+        conditions = [CareAction.notes.contains(term) for term in terms]
+        for action in CareAction.query.filter(*conditions).limit(limit):
+            results.append({'doc_type': 'care_note', 'doc_id': action.id, 'client_id': action.client_id,
+                            'title': action.task_name, 'rank': 0.0, 'snippet': highlight(action.notes)})
+    return results[:limit]
+
+def search_client_ids(text, limit=500):
+    """Get client IDs matching a search, best match first, with snippets"""
+    ranked = {}
+    for result in search(text, limit=limit):
+        client_id = result['client_id']
+        if client_id not in ranked:
+            ranked[client_id] = result['snippet']
+    return ranked
+
+def _changed(obj, fields):
+    """Check whether a flush changed any indexed field"""
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+def sync_search_after_flush(session, flush_context):
+    """Keep the search index in step with client and care note changes"""
+    connection = session.connection()
+    backend = get_backend(connection)
+    if backend is None:
+        return
+    if not index_ready(connection, backend):
+        current_app.logger.warning('Search index %s is missing; run "flask search rebuild"', backend.table)
+        return
+
+    deleted_clients = set()
+    deleted_actions = set()
+    documents = {'client': [], 'care_note': []}
+    for obj in session.deleted:
+        if isinstance(obj, Client):
+            deleted_clients.add(obj.id)
+        elif isinstance(obj, CareAction):
+            deleted_actions.add(obj.id)
+    for obj in list(session.new) + list(session.dirty):
+        if obj in session.deleted:
+            continue
+        if isinstance(obj, Client) and (obj in session.new or _changed(obj, ('name',) + CLIENT_FIELDS)):
+            documents['client'].append(client_document(obj))
+        elif isinstance(obj, CareAction) and (obj in session.new or
+                                              _changed(obj, ('notes', 'task_name', 'client_id'))):
+            if obj.notes:
+                documents['care_note'].append(action_document(obj))
+            else:
+                deleted_actions.add(obj.id)
+
+    if not (deleted_clients or deleted_actions or documents['client'] or documents['care_note']):
+        return
+    backend.delete(connection, 'client', client_ids=deleted_clients)
+    backend.delete(connection, 'care_note', doc_ids=deleted_actions)
+    for doc_type, docs in documents.items():
+        backend.delete(connection, doc_type, doc_ids=[doc['doc_id'] for doc in docs])
+        backend.insert(connection, docs)
+
+def index_care_notes(connection, rows):
+    """Index care notes written outside the ORM unit of work
+
+    Rows are dicts of care action column values including the new id.
+    """
+    backend = get_backend(connection)
+    if backend is None or not index_ready(connection, backend):
+        return
+    backend.insert(connection, [{'doc_type': 'care_note', 'doc_id': row['id'], 'client_id': row['client_id'],
+                                 'title': row.get('task_name') or '', 'body': row['notes']}
+                                for row in rows if row.get('notes')])
+
+def rebuild_search_index(connection=None, batch_size=1000):
+    """Recreate the search index from clients and care notes"""
+    connection = connection or db.session.connection()
+    backend = get_backend(connection)
+    if backend is None:
+        return 0
+    backend.create(connection)
+    _indexed_engines.add(connection.engine)
+    backend.clear(connection)
+    count = 0
+    for query, build in ((Client.query, client_document),
+                         (CareAction.query.filter(CareAction.notes.isnot(None), CareAction.notes != ''),
+                          action_document)):
+        batch = []
+        for obj in query.yield_per(batch_size):
+            batch.append(build(obj))
+            if len(batch) >= batch_size:
+                backend.insert(connection, batch)
+                count += len(batch)
+                batch = []
+        backend.insert(connection, batch)
+        count += len(batch)
+    return count
+
+@search_cli.command('rebuild')
+def rebuild_command():
+    """Create and fill the full-text search index"""
+    count = rebuild_search_index()
+    db.session.commit()
+    click.echo(f'Indexed {count} document(s)')
+
+def create_search_index(target, connection, **kw):
+    """Create the search index alongside the model tables"""
+    backend = get_backend(connection)
+    if backend is not None:
+        backend.create(connection)
+        _indexed_engines.add(connection.engine)
+
+def init_search(app):
+    """Register the search sync listener and CLI commands"""
+    if not event.contains(Session, 'after_flush', sync_search_after_flush):
+        event.listen(Session, 'after_flush', sync_search_after_flush)
+        event.listen(db.metadata, 'after_create', create_search_index)
+    app.cli.add_command(search_cli)
@@ -0,0 +1,35 @@
+"""
+HomeCare Management System - JSON Serialization
+Professional Care Coordination Platform
+"""
+
+from datetime import date, datetime, time
+from flask import request
+from sqlalchemy import inspect
+
+# Columns never included in JSON output
+PRIVATE_FIELDS = {'password_hash'}
+
+def to_json_value(value):
+    """Convert a column value to a JSON-safe value"""
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return value
+
+def model_fields(model):
+    """Get the public column names of a model"""
+    return [column.key for column in inspect(model).column_attrs if column.key not in PRIVATE_FIELDS]
+
+def model_to_dict(obj, fields=None):
+    """Serialize a model instance's columns, optionally limited to some fields"""
+    names = model_fields(type(obj))
+    if fields:
+        names = [name for name in names if name in fields or name == 'id']
+    return {name: to_json_value(getattr(obj, name)) for name in names}
+
+def wants_json():
+    """Check whether the current request asked for a JSON response"""
+    if request.args.get('format') == 'json':
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', 'text/html'])
+    return best == 'application/json' and request.accept_mimetypes[best] > request.accept_mimetypes['text/html']
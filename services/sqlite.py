@@ -0,0 +1,141 @@
+"""
+HomeCare Management System - SQLite Tuning and Maintenance
+Professional Care Coordination Platform
+"""
+
+import os
+import threading
+import time
+import click
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import event
+from models import db
+
+# Applied first so the remaining pragmas wait out a locked database
+PRAGMA_ORDER = ('busy_timeout', 'journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store')
+
+# Pragmas that only make sense for a database file
+FILE_PRAGMAS = ('journal_mode', 'mmap_size')
+
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+sqlite_cli = AppGroup('sqlite', help='Inspect and maintain the SQLite database.')
+
+def is_memory_database(engine):
+    return engine.url.database in (None, '', ':memory:')
+
+def sqlite_engines():
+    """Get the current app's engines that use SQLite"""
+    return [engine for engine in db.engines.values() if engine.dialect.name == 'sqlite']
+
+def connection_pragmas(engine, pragmas):
+    """Get the (name, value) pairs to apply to each connection of an engine"""
+    memory = is_memory_database(engine)
+    return [(name, pragmas[name]) for name in PRAGMA_ORDER
+            if pragmas.get(name) is not None and not (memory and name in FILE_PRAGMAS)]
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """Run PRAGMA statements on a new DBAPI connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+def tune_engine(engine, pragmas):
+    """Apply pragmas to every connection an SQLite engine opens"""
+    pragmas = connection_pragmas(engine, pragmas)
+    event.listen(engine, 'connect', lambda dbapi_connection, record: apply_pragmas(dbapi_connection, pragmas))
+
+def read_pragmas(connection):
+    """Get the effective value of each tuned pragma on a connection"""
+    return {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in PRAGMA_ORDER}
+
+def run_maintenance(engine, checkpoint_mode='PASSIVE'):
+    """Checkpoint the WAL into the database file and refresh planner statistics
+
+    PASSIVE never blocks readers or writers; TRUNCATE also empties the WAL
+    file but waits for them. Returns the checkpoint counters.
+    """
+    with engine.connect() as connection:
+        busy, log_frames, checkpointed = connection.exec_driver_sql(
+            f'PRAGMA wal_checkpoint({checkpoint_mode})').one()
+        connection.exec_driver_sql('PRAGMA optimize')
+        connection.commit()
+    return {'busy': bool(busy), 'wal_frames': log_frames, 'checkpointed_frames': checkpointed}
+
+class MaintenanceThread:
+    """Background thread running run_maintenance() every interval seconds
+
+    Started on the first request in each process, so gunicorn workers forked
+    from a preloaded app each get their own.
+    """
+
+    def __init__(self, app, interval, checkpoint_mode):
+        self.app = app
+        self.interval = interval
+        self.checkpoint_mode = checkpoint_mode
+        self.pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self.pid == os.getpid():
+            return
+        with self._lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            threading.Thread(target=self._run, name='sqlite-maintenance', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                with self.app.app_context():
+                    for engine in sqlite_engines():
+                        if not is_memory_database(engine):
+                            run_maintenance(engine, self.checkpoint_mode)
+            except Exception:
+                self.app.logger.exception('SQLite maintenance failed')
+
+@sqlite_cli.command('pragmas')
+@with_appcontext
+def pragmas_command():
+    """Show the pragmas in effect on a new connection"""
+    for engine in sqlite_engines():
+        with engine.connect() as connection:
+            click.echo(f'{engine.url.database or ":memory:"}')
+            for name, value in read_pragmas(connection).items():
+                click.echo(f'  {name} = {value}')
+
+@sqlite_cli.command('maintain')
+@click.option('--mode', type=click.Choice(CHECKPOINT_MODES, case_sensitive=False), default='TRUNCATE',
+              show_default=True, help='WAL checkpoint mode.')
+@with_appcontext
+def maintain_command(mode):
+    """Checkpoint the WAL and run PRAGMA optimize"""
+    for engine in sqlite_engines():
+        if is_memory_database(engine):
+            continue
+        result = run_maintenance(engine, mode.upper())
+        click.echo(f'{engine.url.database}: checkpointed {result["checkpointed_frames"]} of '
+                   f'{result["wal_frames"]} WAL frame(s){" (busy)" if result["busy"] else ""}')
+
+def init_sqlite(app):
+    """Tune new SQLite connections and schedule WAL maintenance
+
+    Call right after db.init_app, before any connection is opened.
+    """
+    app.cli.add_command(sqlite_cli)
+    if not app.config['SQLITE_TUNING']:
+        return
+    with app.app_context():
+        engines = sqlite_engines()
+    for engine in engines:
+        tune_engine(engine, app.config['SQLITE_PRAGMAS'])
+
+    interval = app.config['SQLITE_MAINTENANCE_INTERVAL']
+    if interval and any(not is_memory_database(engine) for engine in engines):
+        maintenance = MaintenanceThread(app, interval, app.config['SQLITE_CHECKPOINT_MODE'])
+        app.before_request(maintenance.ensure_started)
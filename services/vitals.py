@@ -0,0 +1,254 @@
+"""
+HomeCare Management System - Vitals Analytics
+Professional Care Coordination Platform
+
+Loads assessment vitals for many clients in one query into NumPy column
+arrays, sorted by client and date, and computes trends for every client at
+once with grouped array operations instead of a Python loop per row.
+"""
+
+from datetime import date, timedelta
+import numpy as np
+from models import db, Client, MedicalAssessment
+
+# Vitals loaded per assessment, in query column order after client and date
+VITAL_COLUMNS = ('blood_pressure_systolic', 'blood_pressure_diastolic', 'heart_rate', 'temperature',
+                 'oxygen_saturation', 'weight', 'height')
+
+# Vitals trended per client
+TREND_METRICS = ('heart_rate', 'oxygen_saturation', 'temperature', 'weight')
+
+# Same bands as MedicalAssessment.get_blood_pressure_category, by code
+BP_CATEGORIES = ('normal', 'elevated', 'high_stage_1', 'high_stage_2', 'hypertensive_crisis')
+
+# Metric -> (worrying direction, change per week, latest z-score, latest value
+# limit or None); a client is flagged when any is reached in that direction
+DETERIORATION_RULES = {
+    'heart_rate': (1, 5.0, 2.0, 110),
+    'oxygen_saturation': (-1, 1.0, 2.0, 92),
+    'temperature': (1, 0.3, 2.0, 38.0),
+    'weight': (-1, 1.0, 2.0, None)
+}
+
+# Smallest spread used for z-scores, so a client with near-identical
+# readings is not flagged for an ordinary small change
+MIN_SPREAD = {
+    'heart_rate': 3.0,
+    'oxygen_saturation': 1.0,
+    'temperature': 0.2,
+    'weight': 0.5
+}
+
+# Readings needed before a slope or z-score is reported
+MIN_READINGS = 3
+
+class VitalsHistory:
+    """Assessment vitals as column arrays, sorted by client then date
+
+    Rows of one client are contiguous: group holds each row's client index
+    and starts the first row of each client.
+    """
+
+    def __init__(self, rows):
+        columns = list(zip(*rows)) or [()] * (len(VITAL_COLUMNS) + 2)
+        self.client_ids = np.array(columns[0], dtype=np.int64)
+        self.days = np.array([day.toordinal() for day in columns[1]], dtype=np.float64)
+        # None becomes NaN in a float array
+        self.values = {name: np.array(column, dtype=np.float64)
+                       for name, column in zip(VITAL_COLUMNS, columns[2:])}
+        self.size = len(self.client_ids)
+        boundaries = np.flatnonzero(self.client_ids[1:] != self.client_ids[:-1]) + 1
+        self.starts = np.concatenate(([0], boundaries)) if self.size else np.zeros(0, dtype=np.int64)
+        self.clients = self.client_ids[self.starts]
+        self.group = np.repeat(np.arange(len(self.starts)), np.diff(np.append(self.starts, self.size)))
+
+    def __len__(self):
+        return self.size
+
+def load_vitals(start_date=None, client_ids=None):
+    """Load every assessment's vitals since a date in one query"""
+    query = db.select(MedicalAssessment.client_id, MedicalAssessment.assessment_date,
+                      *[getattr(MedicalAssessment, name) for name in VITAL_COLUMNS]) \
+        .order_by(MedicalAssessment.client_id, MedicalAssessment.assessment_date,
+                  MedicalAssessment.assessment_time, MedicalAssessment.id)
+    if start_date:
+        query = query.where(MedicalAssessment.assessment_date >= start_date)
+    if client_ids is not None:
+        query = query.where(MedicalAssessment.client_id.in_(client_ids))
+    return VitalsHistory(db.session.execute(query).all())
+
+def bmi(weight, height):
+    """BMI for arrays of weight (kg) and height (cm), NaN where either is missing"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = weight / (height / 100) ** 2
+    return np.round(np.where(height > 0, values, np.nan), 1)
+
+def blood_pressure_categories(systolic, diastolic):
+    """Index into BP_CATEGORIES for each reading, -1 where either value is missing"""
+    missing = np.isnan(systolic) | np.isnan(diastolic) | (systolic == 0) | (diastolic == 0)
+    codes = np.select(
+        [systolic < 120, systolic < 130, (systolic < 140) | (diastolic < 90), (systolic < 180) | (diastolic < 120)],
+        [np.where(diastolic < 80, 0, 2), np.where(diastolic < 80, 1, 2), 2, 3],
+        default=4)
+    return np.where(missing, -1, codes)
+
+def rolling_mean(history, values, window):
+    """Mean of each row and the client's previous window - 1 rows, ignoring NaN"""
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    rows = np.arange(history.size)
+    first = np.maximum(rows - window + 1, history.starts[history.group])
+    count = counts[rows + 1] - counts[first]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, (sums[rows + 1] - sums[first]) / count, np.nan)
+
+def latest_rows(history, valid):
+    """Index of each client's last row with a valid reading, -1 if none"""
+    if not history.size:
+        return np.zeros(0, dtype=np.int64)
+    return np.maximum.reduceat(np.where(valid, np.arange(history.size), -1), history.starts)
+
+def _group_sum(history, weights):
+    return np.bincount(history.group, weights=weights, minlength=len(history.starts))
+
+def slopes(history, values):
+    """Least-squares change per day of each client's valid readings, NaN if too few"""
+    valid = ~np.isnan(values)
+    weight = valid.astype(np.float64)
+    # Days since the client's first assessment keep the sums small
+    x = history.days - history.days[history.starts][history.group]
+    y = np.where(valid, values, 0.0)
+    n, sx, sy = _group_sum(history, weight), _group_sum(history, x * weight), _group_sum(history, y)
+    sxx, sxy = _group_sum(history, x * x * weight), _group_sum(history, x * y)
+    denominator = n * sxx - sx * sx
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = (n * sxy - sx * sy) / denominator
+    return np.where((n >= MIN_READINGS) & (denominator > 0), result, np.nan)
+
+def latest_z_scores(history, values, latest, min_spread):
+    """z-score of each client's latest reading against their earlier readings"""
+    valid = ~np.isnan(values)
+    y = np.where(valid, values, 0.0)
+    has_latest = latest >= 0
+    last = np.where(has_latest, values[np.maximum(latest, 0)] if history.size else 0.0, 0.0)
+    n = _group_sum(history, valid.astype(np.float64)) - has_latest
+    total = _group_sum(history, y) - last
+    squares = _group_sum(history, y * y) - last * last
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / n
+        spread = np.sqrt(np.maximum(squares / n - mean * mean, 0.0))
+        result = (last - mean) / np.maximum(spread, min_spread)
+    return np.where(has_latest & (n >= MIN_READINGS), result, np.nan)
+
+def _take(values, rows):
+    """Values at row indexes, NaN where the index is -1"""
+    if not len(values):
+        return np.full(len(rows), np.nan)
+    return np.where(rows >= 0, values[np.maximum(rows, 0)], np.nan)
+
+def _sparklines(history, values, valid, points):
+    """Each client's last readings, oldest first"""
+    if not history.size:
+        return []
+    position = np.cumsum(valid) - 1
+    per_client = _group_sum(history, valid.astype(np.float64)).astype(np.int64)
+    before = np.concatenate(([0], np.cumsum(per_client)[:-1]))
+    from_end = per_client[history.group] - (position - before[history.group])
+    keep = valid & (from_end <= points)
+    selected = values[keep]
+    return np.split(np.round(selected, 1), np.cumsum(np.bincount(history.group[keep],
+                                                                   minlength=len(history.starts)))[:-1])
+
+def _number(value):
+    return None if np.isnan(value) else round(float(value), 2)
+
+def analyze_vitals(history, window=3, sparkline_points=12):
+    """Compute every client's vitals trends at once
+
+    Returns per-client arrays: for each trend metric its latest reading,
+    rolling mean at that reading, change per week and latest z-score, plus
+    latest BMI and blood pressure category, the flag reasons and sparkline
+    readings.
+    """
+    clients = len(history.starts)
+    trends = {}
+    flagged = np.zeros(clients, dtype=bool)
+    reasons = [[] for _ in range(clients)]
+    for name in TREND_METRICS:
+        values = history.values[name]
+        valid = ~np.isnan(values)
+        latest = latest_rows(history, valid)
+        metric = {
+            'latest': _take(values, latest),
+            'rolling_mean': _take(rolling_mean(history, values, window), latest),
+            'weekly_change': slopes(history, values) * 7,
+            'z_score': latest_z_scores(history, values, latest, MIN_SPREAD[name]),
+            'sparkline': _sparklines(history, values, valid, sparkline_points)
+        }
+        direction, weekly_change, z_score, limit = DETERIORATION_RULES[name]
+        checks = [(direction * metric['weekly_change'] >= weekly_change, 'trend'),
+                  (direction * metric['z_score'] >= z_score, 'deviation')]
+        if limit is not None:
+            checks.append((direction * (metric['latest'] - limit) >= 0, 'limit'))
+        for hit, kind in checks:
+            # NaN comparisons are False, so missing readings never flag
+            flagged |= hit
+            for index in np.flatnonzero(hit):
+                reasons[index].append(f'{name} {kind}')
+        trends[name] = metric
+
+    bmis = bmi(history.values['weight'], history.values['height'])
+    categories = blood_pressure_categories(history.values['blood_pressure_systolic'],
+                                           history.values['blood_pressure_diastolic'])
+    last_rows = np.append(history.starts[1:], history.size) - 1 if clients else np.zeros(0, dtype=np.int64)
+    return {
+        'client_ids': history.clients,
+        'assessments': np.bincount(history.group, minlength=clients),
+        'last_assessed': history.days[last_rows] if clients else np.zeros(0),
+        'bmi': _take(bmis, latest_rows(history, ~np.isnan(bmis))),
+        'bp_category': _take(categories, latest_rows(history, categories >= 0)),
+        'trends': trends,
+        'flagged': flagged,
+        'reasons': reasons
+    }
+
+def trend_summaries(analysis, names=None, indexes=None):
+    """Turn analyze_vitals() arrays into one JSON-ready dict per client, or per client index given"""
+    names = names or {}
+    if indexes is None:
+        indexes = range(len(analysis['client_ids']))
+    summaries = []
+    for index in indexes:
+        client_id = int(analysis['client_ids'][index])
+        category = analysis['bp_category'][index]
+        summaries.append({
+            'client_id': client_id,
+            'client_name': names.get(client_id),
+            'assessments': int(analysis['assessments'][index]),
+            'last_assessed': date.fromordinal(int(analysis['last_assessed'][index])).isoformat(),
+            'bmi': _number(analysis['bmi'][index]),
+            'bp_category': None if np.isnan(category) else BP_CATEGORIES[int(category)],
+            'deteriorating': bool(analysis['flagged'][index]),
+            'reasons': analysis['reasons'][index],
+            'trends': {name: {
+                'latest': _number(metric['latest'][index]),
+                'rolling_mean': _number(metric['rolling_mean'][index]),
+                'weekly_change': _number(metric['weekly_change'][index]),
+                'z_score': _number(metric['z_score'][index]),
+                'sparkline': metric['sparkline'][index].tolist() if len(metric['sparkline']) else []
+            } for name, metric in analysis['trends'].items()}
+        })
+    return summaries
+
+def vitals_trends(days=90, client_ids=None, flagged_only=False, window=3, sparkline_points=12):
+    """Get trend summaries for clients assessed in the last days, deteriorating first"""
+    history = load_vitals(date.today() - timedelta(days=days), client_ids)
+    analysis = analyze_vitals(history, window, sparkline_points)
+    indexes = np.flatnonzero(analysis['flagged']) if flagged_only else np.arange(len(analysis['client_ids']))
+    ids = analysis['client_ids'][indexes].tolist()
+    names = dict(db.session.execute(db.select(Client.id, Client.name).where(Client.id.in_(ids))).all()) if ids else {}
+    summaries = trend_summaries(analysis, names, indexes)
+    summaries.sort(key=lambda summary: (not summary['deteriorating'], -len(summary['reasons']),
+                                        summary['client_id']))
+    return summaries
@@ -0,0 +1,40 @@
+"""
+HomeCare Management System - Test Configuration
+Professional Care Coordination Platform
+"""
+
+import os
+import sys
+import pytest
+
+# Import the application modules from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, User
+from services.bootstrap import bootstrap
+
+@pytest.fixture
+def app():
+    """An application on an empty in-memory database at the current schema"""
+    app = create_app('testing')
+    with app.app_context():
+        bootstrap(seed_data=False)
+    yield app
+
+@pytest.fixture
+def user(app):
+    with app.app_context():
+        user = User(username='supervisor', email='supervisor@example.com', password_hash='x', role='supervisor')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+@pytest.fixture
+def client(app, user):
+    """A test client logged in as a supervisor"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user)
+        session['_fresh'] = True
+    return client
@@ -0,0 +1,45 @@
+"""
+HomeCare Management System - JSON API Tests
+Professional Care Coordination Platform
+"""
+
+import pytest
+import config
+from app import create_app
+from models import db, Client
+from services.bootstrap import bootstrap
+
+@pytest.fixture(params=['memory', 'file'])
+def app(request, tmp_path, monkeypatch):
+    """The testing app on its in-memory database and on a pooled database file"""
+    name = 'testing'
+    if request.param == 'file':
+        class FileConfig(config.TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'api.db'}"
+        name = 'file'
+        monkeypatch.setitem(config.config, name, FileConfig)
+    app = create_app(name)
+    with app.app_context():
+        bootstrap(seed_data=False)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+def test_api_pages_and_batches(app, client):
+    with app.app_context():
+        db.session.add_all([Client(name='Ada', status='active'), Client(name='Ben', status='active')])
+        db.session.commit()
+        ids = [row.id for row in Client.query.order_by(Client.id)]
+
+    page = client.get('/api/v1/clients?fields=name&limit=1')
+    assert page.status_code == 200
+    assert page.json == {'items': [{'id': ids[0], 'name': 'Ada'}], 'next_after': ids[0]}
+
+    batch = client.get(f'/api/v1/batch?clients={ids[1]},999&fields[clients]=name')
+    assert batch.status_code == 200
+    assert batch.json['clients'] == {'items': [{'id': ids[1], 'name': 'Ben'}], 'missing': [999]}
+
+    item = client.get(f'/api/v1/clients/{ids[0]}?fields=status')
+    assert item.json == {'id': ids[0], 'status': 'active'}
+    assert client.get(f'/api/v1/clients/{ids[0]}?fields=status',
+                      headers={'If-None-Match': item.headers['ETag']}).status_code == 304
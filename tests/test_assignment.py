@@ -0,0 +1,80 @@
+"""
+HomeCare Management System - Visit Assignment Tests
+Professional Care Coordination Platform
+"""
+
+from datetime import date, time
+import numpy as np
+from models import db, CareTask, Client, ScheduledTask, User
+from services.assignment import AssignmentProblem
+from services.route_planner import minutes
+
+DAY = date(2026, 3, 2)
+
+def _clashing(proposals):
+    """Pairs of one caregiver's proposed visits whose times overlap"""
+    by_caregiver = {}
+    for proposal in proposals:
+        start = minutes(proposal['scheduled_time'])
+        by_caregiver.setdefault(proposal['assigned_to_id'], []).append((start, start + proposal['duration_minutes']))
+    return [(first, second) for spans in by_caregiver.values()
+            for index, first in enumerate(spans) for second in spans[index + 1:]
+            if first[0] < second[1] and second[0] < first[1]]
+
+def test_solver_never_books_clashing_visits():
+    generator = np.random.default_rng(7)
+    for _ in range(20):
+        size, caregivers = 30, 4
+        start = generator.integers(0, 16, size) * 30.0
+        duration = np.full(size, 45.0)
+        clashes = (start[:, None] < start[None, :] + duration[None, :]) & \
+            (start[None, :] < start[:, None] + duration[:, None])
+        problem = AssignmentProblem(generator.uniform(0, 100, (size, caregivers)), np.full(size, 1000.0),
+                                    duration, np.full(caregivers, 480.0), clashes)
+        assignment, _, lower_bound, _ = problem.solve(0.2)
+        np.fill_diagonal(clashes, False)
+        for caregiver in range(caregivers):
+            booked = np.flatnonzero(assignment == caregiver)
+            assert not clashes[np.ix_(booked, booked)].any()
+        assert problem.loads(assignment).max() <= 480
+        assert problem.total(assignment) >= lower_bound - 1e-6
+
+def test_proposal_keeps_one_caregiver_to_one_visit_at_a_time(app, client, user):
+    with app.app_context():
+        caregiver = User(username='carer', email='carer@example.com', password_hash='x', role='caregiver')
+        task = CareTask(name='Companionship', category='social')
+        clients = [Client(name=f'Client {number}', status='active') for number in range(20)]
+        db.session.add_all([caregiver, task] + clients)
+        db.session.flush()
+        db.session.add_all([ScheduledTask(client_id=client_row.id, assigned_to_id=user, task_id=task.id,
+                                          task_name=task.name, scheduled_date=DAY, status='pending',
+                                          scheduled_time=time(9 + number // 10))
+                            for number, client_row in enumerate(clients)])
+        db.session.commit()
+
+    result = client.get(f'/tasks/assignments?date={DAY.isoformat()}&scope=all').json
+    assert [proposal['scheduled_time'] for proposal in result['proposals']] == ['09:00', '10:00']
+    assert len(result['unassigned']) == 18
+    assert not _clashing(result['proposals'])
+
+def test_proposal_avoids_visits_the_caregiver_keeps(app, client, user):
+    with app.app_context():
+        caregiver = User(username='carer', email='carer@example.com', password_hash='x', role='caregiver')
+        task = CareTask(name='Companionship', category='social')
+        kept, moved = Client(name='Kept', status='active'), Client(name='Moved', status='active')
+        db.session.add_all([caregiver, task, kept, moved])
+        db.session.flush()
+        db.session.add(ScheduledTask(client_id=kept.id, assigned_to_id=caregiver.id, task_id=task.id,
+                                     task_name=task.name, scheduled_date=DAY, scheduled_time=time(11),
+                                     status='pending'))
+        replan = [ScheduledTask(client_id=moved.id, assigned_to_id=user, task_id=task.id, task_name=task.name,
+                                scheduled_date=DAY, scheduled_time=time(hour, 15), status='pending')
+                  for hour in (10, 11)]
+        db.session.add_all(replan)
+        db.session.commit()
+        task_ids = [task_row.id for task_row in replan]
+
+    query = '&'.join(f'task_id={task_id}' for task_id in task_ids)
+    result = client.get(f'/tasks/assignments?date={DAY.isoformat()}&{query}').json
+    assert [proposal['scheduled_time'] for proposal in result['proposals']] == ['10:15']
+    assert [visit['scheduled_time'] for visit in result['unassigned']] == ['11:15']
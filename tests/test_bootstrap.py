@@ -0,0 +1,73 @@
+"""
+HomeCare Management System - Bootstrap Tests
+Professional Care Coordination Platform
+"""
+
+from datetime import date
+import pytest
+from sqlalchemy import MetaData, Table, create_engine, inspect, text
+import config
+from app import create_app
+from models import db
+from services.bootstrap import SCHEMA_VERSION, bootstrap, current_schema_version
+
+# Tables of the schema before versioning began
+BASELINE_TABLES = ('users', 'clients', 'care_actions', 'care_tasks', 'scheduled_tasks', 'employees',
+                   'care_plans', 'care_plan_tasks', 'medical_assessments', 'care_reports',
+                   'incident_reports', 'notifications', 'care_templates', 'weather_data')
+
+# Columns numbered migrations added to baseline tables
+MIGRATED_COLUMNS = {
+    'scheduled_tasks': {'care_plan_task_id', 'occurrence_date'},
+    'employees': {'gender', 'languages'}
+}
+
+def create_baseline_schema(engine):
+    """Create the baseline tables without migrated columns or declared composite indexes"""
+    metadata = MetaData()
+    for name in BASELINE_TABLES:
+        table = db.metadata.tables[name]
+        Table(name, metadata, *[column._copy() for column in table.columns
+                                if column.name not in MIGRATED_COLUMNS.get(name, ())])
+    metadata.create_all(engine)
+
+@pytest.fixture
+def baseline_app(tmp_path, monkeypatch):
+    uri = f"sqlite:///{tmp_path / 'baseline.db'}"
+    engine = create_engine(uri)
+    create_baseline_schema(engine)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO users (username, email, password_hash, role) "
+                                "VALUES ('carer', 'carer@example.com', 'x', 'caregiver')"))
+        connection.execute(text("INSERT INTO clients (name, status) VALUES ('Client', 'active')"))
+        connection.execute(text("INSERT INTO care_tasks (name, category) VALUES ('Bathing', 'Personal Care')"))
+        connection.execute(text("INSERT INTO scheduled_tasks (client_id, assigned_to_id, task_id, task_name, "
+                                "task_category, scheduled_date, status, priority) "
+                                "VALUES (1, 1, 1, 'Bathing', 'Personal Care', :day, 'pending', 'normal')"),
+                           {'day': date.today()})
+    engine.dispose()
+
+    class BaselineConfig(config.TestingConfig):
+        SQLALCHEMY_DATABASE_URI = uri
+
+    monkeypatch.setitem(config.config, 'baseline', BaselineConfig)
+    return create_app('baseline')
+
+def test_bootstrap_adopts_baseline_database(baseline_app):
+    with baseline_app.app_context():
+        steps, _, _ = bootstrap()
+        assert steps[0] == 'adopted existing database'
+        assert current_schema_version() == SCHEMA_VERSION
+
+        inspector = inspect(db.engine)
+        columns = {column['name'] for column in inspector.get_columns('scheduled_tasks')}
+        assert MIGRATED_COLUMNS['scheduled_tasks'] <= columns
+        indexes = {index['name'] for index in inspector.get_indexes('scheduled_tasks')}
+        assert {index.name for index in db.metadata.tables['scheduled_tasks'].indexes} <= indexes
+
+        # The derived tables were backfilled from the existing rows
+        rollups = db.session.execute(text('SELECT SUM(row_count) FROM scheduled_task_rollups')).scalar()
+        assert rollups == 1
+
+        # A second run has nothing left to do
+        assert bootstrap()[0] == []
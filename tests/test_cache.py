@@ -0,0 +1,19 @@
+"""
+HomeCare Management System - Snapshot Cache Tests
+Professional Care Coordination Platform
+"""
+
+from services.cache import LocalCacheBackend, SnapshotCache
+
+def test_eviction_never_resets_the_generation():
+    backend = LocalCacheBackend(max_entries=2)
+    cache = SnapshotCache('dashboard', backend, ttl=None)
+    assert cache.get_or_build('page', lambda: 'old') == 'old'
+    cache.invalidate()
+    # Fill the cache past its limit so every entry is evicted at least once
+    for index in range(5):
+        backend.set(f'other:{index}', index)
+    assert backend.size() == 2
+    assert backend.get_generation('dashboard') == 1
+    assert cache.get_or_build('page', lambda: 'new') == 'new'
+    assert cache.stats()['invalidations'] == 1
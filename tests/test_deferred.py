@@ -0,0 +1,31 @@
+"""
+HomeCare Management System - Deferred Service Tests
+Professional Care Coordination Platform
+"""
+
+import os
+import subprocess
+import sys
+from datetime import date
+from models import db, Client, ClientRiskScore, MedicalAssessment
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_handler_modules_stay_out_of_boot():
+    code = ('import sys; from app import create_app; create_app("testing"); '
+            'print(",".join(m for m in ("services.jobs", "services.reports", "services.risk", '
+            '"services.recurrence", "wtforms") if m in sys.modules))')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=ROOT)
+    assert result.stdout.strip() == ''
+
+def test_committed_assessment_is_rescored(app, user):
+    with app.app_context():
+        client = Client(name='Client', status='active')
+        db.session.add(client)
+        db.session.flush()
+        db.session.add(MedicalAssessment(client_id=client.id, performed_by_id=user, assessment_type='routine',
+                                         assessment_date=date.today(), oxygen_saturation=90))
+        db.session.commit()
+        score = db.session.execute(db.select(ClientRiskScore).filter_by(client_id=client.id)).scalar_one()
+        assert score.red_flag
@@ -0,0 +1,27 @@
+"""
+HomeCare Management System - HTTP Caching Tests
+Professional Care Coordination Platform
+"""
+
+from models import db, Client
+
+def test_list_revalidates_by_etag_only(app, client):
+    with app.app_context():
+        db.session.add_all([Client(name='Kept', status='active'), Client(name='Removed', status='active')])
+        db.session.commit()
+        removed = Client.query.filter_by(name='Removed').one().id
+
+    first = client.get('/clients/?format=json')
+    assert first.status_code == 200
+    assert first.headers.get('ETag')
+    assert 'Last-Modified' not in first.headers
+    assert client.get('/clients/?format=json', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    with app.app_context():
+        db.session.delete(db.session.get(Client, removed))
+        db.session.commit()
+    stale = {'If-None-Match': first.headers['ETag'], 'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'}
+    assert client.get('/clients/?format=json', headers=stale).status_code == 200
+    since_only = client.get('/clients/?format=json', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+    assert since_only.status_code == 200
+    assert 'Removed' not in since_only.get_data(as_text=True)
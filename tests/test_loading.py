@@ -0,0 +1,93 @@
+"""
+HomeCare Management System - Eager Loading Tests
+Professional Care Coordination Platform
+"""
+
+from datetime import date, timedelta
+import pytest
+from jinja2 import ChoiceLoader, DictLoader
+from models import db, CareAction, CareTask, Client, Employee, ScheduledTask, User
+import services.loading as loading
+
+# Stand-ins for the page templates, walking the relationships each one shows
+ROW_TEMPLATES = {
+    'actions/list.html': '{% for a in actions.items %}{{ a.client.name }}{{ a.performed_by.username }}{% endfor %}',
+    'actions/view.html': '{{ action.client.name }}{{ action.performed_by.username }}{{ action.care_task.name }}',
+    'tasks/list.html': '{% for t in tasks.items %}{{ t.client.name }}{{ t.assigned_to.username }}{% endfor %}',
+    'tasks/overdue.html': '{% for t in tasks.items %}{{ t.client.name }}{{ t.assigned_to.username }}{% endfor %}',
+    'tasks/view.html': '{{ task.client.name }}{{ task.assigned_to.username }}{{ task.care_task.name }}',
+    'clients/view.html': '{{ client.assigned_caregiver.username }}'
+                         '{% for a in recent_actions %}{{ a.performed_by.username }}{% endfor %}'
+                         '{% for t in upcoming_tasks %}{{ t.assigned_to.username }}{% endfor %}',
+    'clients/actions.html': '{% for a in actions.items %}{{ a.performed_by.username }}{% endfor %}',
+    'clients/tasks.html': '{% for t in tasks.items %}{{ t.assigned_to.username }}{% endfor %}',
+    'employees/list.html': '{% for e in employees.items %}{{ e.user.username }}{% endfor %}',
+    'employees/view.html': '{{ employee.user.username }}{% for a in recent_actions %}{{ a.client.name }}{% endfor %}'
+                           '{% for t in upcoming_tasks %}{{ t.client.name }}{% endfor %}'
+}
+
+@pytest.fixture
+def app(app):
+    app.jinja_loader = ChoiceLoader([DictLoader(ROW_TEMPLATES), app.jinja_loader])
+    return app
+
+def add_records(size, user):
+    """Add caregivers, each with a client, past care actions and overdue and upcoming tasks"""
+    care_task = CareTask.query.first() or CareTask(name='Bathing', category='Personal Care')
+    db.session.add(care_task)
+    start = Client.query.count()
+    for number in range(start, start + size):
+        caregiver = User(username=f'carer{number}', email=f'carer{number}@example.com', password_hash='x',
+                         role='caregiver', first_name='Carer', last_name=str(number))
+        db.session.add(caregiver)
+        db.session.flush()
+        client = Client(name=f'Client {number}', status='active', assigned_caregiver_id=caregiver.id)
+        db.session.add_all([client, Employee(user_id=caregiver.id, employee_id=f'E{number}', status='active')])
+        db.session.flush()
+        for days in (-1, 1):
+            db.session.add(CareAction(client_id=client.id, performed_by_id=caregiver.id, task_id=care_task.id,
+                                      task_name=care_task.name, task_category=care_task.category,
+                                      action_date=date.today() - timedelta(days=abs(days))))
+            db.session.add(ScheduledTask(client_id=client.id, assigned_to_id=caregiver.id, task_id=care_task.id,
+                                         task_name=care_task.name, task_category=care_task.category,
+                                         scheduled_date=date.today() + timedelta(days=days), status='pending'))
+    db.session.commit()
+    return client.id, caregiver.id
+
+def page_urls(client_id, caregiver_id):
+    employee_id = Employee.query.filter_by(user_id=caregiver_id).one().id
+    action_id = CareAction.query.filter_by(client_id=client_id).first().id
+    task_id = ScheduledTask.query.filter_by(client_id=client_id).first().id
+    return ['/actions/', f'/actions/{action_id}', '/tasks/', '/tasks/overdue', f'/tasks/{task_id}',
+            f'/clients/{client_id}', f'/clients/{client_id}/actions', f'/clients/{client_id}/tasks',
+            '/employees/', f'/employees/{employee_id}']
+
+def query_counts(client, urls):
+    counts = {}
+    for url in urls:
+        response = client.get(url)
+        assert response.status_code == 200, url
+        counts[url] = int(response.headers['X-Query-Count'])
+    return counts
+
+def test_listed_views_stay_within_budget_as_rows_grow(app, client, user):
+    with app.app_context():
+        urls = page_urls(*add_records(2, user))
+    few = query_counts(client, urls)
+    with app.app_context():
+        add_records(8, user)
+    many = query_counts(client, urls)
+    adapter = app.url_map.bind('localhost')
+    for url, count in many.items():
+        endpoint = adapter.match(url)[0]
+        assert count <= app.config['QUERY_BUDGETS'].get(endpoint, app.config['QUERY_BUDGET']), url
+    # Eager loading keeps the statement count independent of the rows listed
+    assert many == few
+
+def test_budget_catches_lazy_loading(app, client, user, monkeypatch):
+    with app.app_context():
+        add_records(12, user)
+    monkeypatch.setitem(loading.LOAD_PLANS, 'actions.list_actions', {})
+    monkeypatch.setattr(loading, '_resolved_options', {})
+    with pytest.raises(loading.QueryBudgetExceeded):
+        client.get('/actions/')
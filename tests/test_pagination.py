@@ -0,0 +1,72 @@
+"""
+HomeCare Management System - Keyset Pagination Tests
+Professional Care Coordination Platform
+"""
+
+from datetime import datetime, timedelta
+import pytest
+from models import db, Client
+from services.pagination import encode_cursor
+
+def add_clients(count):
+    """Add clients with tied and NULL creation times, returning their IDs in list order"""
+    start = datetime(2024, 1, 1)
+    clients = [Client(name=f'Client {number}', status='active', created_at=start + timedelta(days=number // 3))
+               for number in range(count)]
+    db.session.add_all(clients)
+    db.session.flush()
+    for client in clients[::7]:
+        client.created_at = None
+    db.session.commit()
+    # Newest first with NULL sorting after every time, so NULLs lead a descending list
+    ordered = sorted(clients, key=lambda client: (client.created_at is None, client.created_at or start, client.id),
+                     reverse=True)
+    return [client.id for client in ordered]
+
+def get_page(client, cursor=None):
+    response = client.get('/clients/', query_string={'format': 'json', 'cursor': cursor or ''})
+    assert response.status_code == 200
+    return response.get_json()
+
+def walk_forward(client):
+    pages = [get_page(client)]
+    while pages[-1]['next_cursor']:
+        pages.append(get_page(client, pages[-1]['next_cursor']))
+    return pages
+
+def page_ids(page):
+    return [item['id'] for item in page['items']]
+
+@pytest.mark.parametrize('count, sizes', [(20, [20]), (21, [20, 1]), (40, [20, 20]), (45, [20, 20, 5])])
+def test_pages_cover_every_row_once_across_boundaries(app, client, count, sizes):
+    with app.app_context():
+        expected = add_clients(count)
+    pages = walk_forward(client)
+    assert [len(page['items']) for page in pages] == sizes
+    assert [client_id for page in pages for client_id in page_ids(page)] == expected
+    assert pages[0]['prev_cursor'] is None
+
+def test_prev_cursors_retrace_next_cursors(app, client):
+    with app.app_context():
+        add_clients(65)
+    pages = walk_forward(client)
+    assert len(pages) == 4
+    for before, after in zip(pages, pages[1:]):
+        previous = get_page(client, after['prev_cursor'])
+        assert page_ids(previous) == page_ids(before)
+        assert previous['next_cursor'] == before['next_cursor']
+    assert get_page(client, pages[1]['prev_cursor'])['prev_cursor'] is None
+
+@pytest.mark.parametrize('cursor', [
+    'not-a-cursor',
+    encode_cursor(('2024-01-01T00:00:00', 5), 'next'),
+    encode_cursor((datetime(2024, 1, 1).date(), 5), 'next'),
+    encode_cursor((datetime(2024, 1, 1), '5'), 'next'),
+    encode_cursor((datetime(2024, 1, 1), None), 'next'),
+    encode_cursor((datetime(2024, 1, 1), 5), 'sideways'),
+    encode_cursor((5,), 'next')
+])
+def test_cursors_not_matching_the_sort_columns_are_rejected(app, client, cursor):
+    with app.app_context():
+        add_clients(3)
+    assert client.get('/clients/', query_string={'format': 'json', 'cursor': cursor}).status_code == 400
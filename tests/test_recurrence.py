@@ -0,0 +1,103 @@
+"""
+HomeCare Management System - Care Plan Recurrence Tests
+Professional Care Coordination Platform
+"""
+
+from datetime import date, time
+import pytest
+from models import db, CarePlan, CarePlanTask, CareTask, Client, ScheduledTask
+from services.recurrence import Recurrence, materialize_schedule, set_occurrence_exception
+
+def occurrences(rule, anchor, start, end):
+    return list(Recurrence.parse(rule).between(anchor, start, end))
+
+def test_weekly_interval_counts_weeks_from_the_anchor():
+    # Anchored on a Wednesday: that week's Monday is before the anchor
+    rule = 'FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH'
+    assert occurrences(rule, date(2026, 3, 4), date(2026, 2, 1), date(2026, 4, 5)) == [
+        date(2026, 3, 5), date(2026, 3, 16), date(2026, 3, 19), date(2026, 3, 30), date(2026, 4, 2)]
+    # A window opening in an off week starts at the next on week
+    assert occurrences(rule, date(2026, 3, 4), date(2026, 3, 9), date(2026, 3, 22)) == [
+        date(2026, 3, 16), date(2026, 3, 19)]
+    assert occurrences('weekly', date(2026, 3, 4), date(2026, 3, 5), date(2026, 3, 25)) == [
+        date(2026, 3, 11), date(2026, 3, 18), date(2026, 3, 25)]
+
+def test_daily_interval_and_weekdays():
+    assert occurrences('FREQ=DAILY;INTERVAL=3', date(2026, 3, 1), date(2026, 3, 5), date(2026, 3, 14)) == [
+        date(2026, 3, 7), date(2026, 3, 10), date(2026, 3, 13)]
+    assert occurrences('FREQ=DAILY;BYDAY=SA,SU', date(2026, 3, 1), date(2026, 3, 1), date(2026, 3, 8)) == [
+        date(2026, 3, 1), date(2026, 3, 7), date(2026, 3, 8)]
+
+def test_monthly_days_clamp_to_the_month_end():
+    assert occurrences('FREQ=MONTHLY;BYMONTHDAY=31', date(2026, 1, 31), date(2026, 1, 1), date(2026, 4, 30)) == [
+        date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)]
+    assert occurrences('monthly', date(2028, 1, 30), date(2028, 2, 1), date(2028, 3, 31)) == [
+        date(2028, 2, 29), date(2028, 3, 30)]
+    assert occurrences('FREQ=MONTHLY;BYMONTHDAY=-1,-2', date(2026, 1, 1), date(2026, 2, 1), date(2026, 2, 28)) == [
+        date(2026, 2, 27), date(2026, 2, 28)]
+    # -31 is the first day of a 31-day month and clamps to the first elsewhere
+    assert occurrences('FREQ=MONTHLY;BYMONTHDAY=-31', date(2026, 1, 1), date(2026, 1, 1), date(2026, 2, 28)) == [
+        date(2026, 1, 1), date(2026, 2, 1)]
+    assert occurrences('FREQ=MONTHLY;INTERVAL=2;BYMONTHDAY=15', date(2026, 1, 15), date(2026, 2, 1),
+                       date(2026, 6, 30)) == [date(2026, 3, 15), date(2026, 5, 15)]
+
+def test_parse_rejects_unsupported_rules():
+    assert Recurrence.parse('as_needed') is None
+    for rule in ('FREQ=YEARLY', 'FREQ=DAILY;INTERVAL=0', 'FREQ=WEEKLY;BYDAY=XX', 'FREQ=MONTHLY;BYMONTHDAY=32',
+                 'FREQ=DAILY;COUNT=3'):
+        with pytest.raises(ValueError):
+            Recurrence.parse(rule)
+
+@pytest.fixture
+def plan_task(app, user):
+    """A weekly Monday and Thursday care plan task from Monday 2 March 2026"""
+    with app.app_context():
+        care_task = CareTask(name='Bathing', category='Personal Care')
+        client_row = Client(name='Ada', status='active', assigned_caregiver_id=user)
+        db.session.add_all([care_task, client_row])
+        db.session.flush()
+        plan = CarePlan(client_id=client_row.id, created_by_id=user, title='Plan', status='active',
+                        start_date=date(2026, 3, 2))
+        db.session.add(plan)
+        db.session.flush()
+        plan_task = CarePlanTask(care_plan_id=plan.id, task_id=care_task.id, task_name=care_task.name,
+                                 frequency='FREQ=WEEKLY;BYDAY=MO,TH')
+        db.session.add(plan_task)
+        db.session.commit()
+        return plan_task.id
+
+def test_materialize_is_idempotent(app, plan_task):
+    with app.app_context():
+        first = materialize_schedule(date(2026, 3, 2), 14)
+        db.session.commit()
+        second = materialize_schedule(date(2026, 3, 2), 14)
+        db.session.commit()
+        assert (first['created'], first['existing']) == (4, 0)
+        assert (second['created'], second['existing']) == (0, 4)
+        assert ScheduledTask.query.count() == 4
+
+def test_skip_then_clear_restores_the_task(app, plan_task):
+    with app.app_context():
+        materialize_schedule(date(2026, 3, 2), 7)
+        db.session.commit()
+        day = date(2026, 3, 5)
+        _, task = set_occurrence_exception(plan_task, day, 'skip')
+        db.session.commit()
+        assert task.status == 'cancelled'
+
+        exception, task = set_occurrence_exception(plan_task, day, None)
+        db.session.commit()
+        assert exception is None and task.status == 'pending'
+
+        _, task = set_occurrence_exception(plan_task, day, 'override', scheduled_time=time(9, 30), priority='high')
+        db.session.commit()
+        assert (task.status, task.scheduled_time, task.priority) == ('pending', time(9, 30), 'high')
+
+        # A skipped occurrence not yet generated stays out of a later run
+        set_occurrence_exception(plan_task, date(2026, 3, 9), 'skip')
+        db.session.commit()
+        result = materialize_schedule(date(2026, 3, 9), 7)
+        assert (result['created'], result['skipped']) == (1, 1)
+
+        with pytest.raises(ValueError):
+            set_occurrence_exception(plan_task, date(2026, 3, 4), 'skip')
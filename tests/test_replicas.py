@@ -0,0 +1,69 @@
+"""
+HomeCare Management System - Read Replica Tests
+Professional Care Coordination Platform
+"""
+
+import time
+from datetime import date
+import pytest
+import config
+from app import create_app
+from models import db, CareTask, Client, ScheduledTask
+from services.bootstrap import bootstrap
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """An app on a primary SQLite file with a replica file copied from it
+
+    Both have one client and one pending task; a second client is then
+    added on the primary only, so reads show which database they hit.
+    """
+    class ReplicaConfig(config.TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        SQLALCHEMY_REPLICAS = [f"sqlite:///{tmp_path / 'replica.db'}"]
+
+    monkeypatch.setitem(config.config, 'replica', ReplicaConfig)
+    app = create_app('replica')
+    with app.app_context():
+        bootstrap(seed_data=False)
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+@pytest.fixture
+def task(app, user):
+    with app.app_context():
+        care_task = CareTask(name='Bathing', category='Personal Care')
+        client_row = Client(name='Copied', status='active')
+        db.session.add_all([care_task, client_row])
+        db.session.flush()
+        task = ScheduledTask(client_id=client_row.id, assigned_to_id=user, task_id=care_task.id,
+                             task_name=care_task.name, scheduled_date=date.today(), status='pending')
+        db.session.add(task)
+        db.session.commit()
+        result = app.test_cli_runner().invoke(args=['replicas', 'refresh'])
+        assert result.exit_code == 0, result.output
+        db.session.add(Client(name='Primary only', status='active'))
+        db.session.commit()
+        return task.id
+
+def test_listed_endpoint_reads_the_replica(client, task):
+    assert client.get('/api/stats').json['total_clients'] == 1
+
+def test_reads_follow_own_writes_to_the_primary(app, client, task):
+    assert client.post(f'/tasks/{task}/complete').status_code == 302
+    stats = client.get('/api/stats').json
+    assert stats['pending_tasks'] == 0
+    assert stats['total_clients'] == 2
+
+    # Once the window passes, reads go back to the replica
+    with client.session_transaction() as session:
+        session['read_primary_until'] = time.time() - 1
+    assert client.get('/api/stats').json['pending_tasks'] == 1
+
+def test_lagging_replica_falls_back_to_the_primary(app, client, task):
+    replica = app.extensions['replicas'].replicas[0]
+    replica.lag = app.config['REPLICA_MAX_LAG'] + 1
+    replica.checked_at = time.monotonic()
+    assert client.get('/api/stats').json['total_clients'] == 2
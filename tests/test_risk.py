@@ -0,0 +1,33 @@
+"""
+HomeCare Management System - Early-Warning Score Tests
+Professional Care Coordination Platform
+"""
+
+from datetime import date, time, timedelta
+from models import db, Client, ClientRiskScore, IncidentReport, Job
+from services.jobs import queue_daily_jobs, run_pending
+
+def test_daily_job_ages_out_old_incidents(app, user):
+    with app.app_context():
+        client = Client(name='Client', status='active')
+        db.session.add(client)
+        db.session.flush()
+        incident = IncidentReport(client_id=client.id, reported_by_id=user, incident_type='fall', title='Fall',
+                                  description='Fell in the kitchen', incident_date=date.today(),
+                                  incident_time=time(9), severity='high')
+        db.session.add(incident)
+        db.session.commit()
+        client_id = client.id
+        assert ClientRiskScore.query.filter_by(client_id=client_id).count() == 1
+
+        # The incident leaves the scoring window without any commit touching it
+        db.session.execute(db.update(IncidentReport).where(IncidentReport.id == incident.id).values(
+            incident_date=date.today() - timedelta(days=app.config['RISK_INCIDENT_DAYS'] + 1)))
+        db.session.commit()
+        assert ClientRiskScore.query.filter_by(client_id=client_id).count() == 1
+
+        assert queue_daily_jobs() == ['risk_rescore']
+        assert queue_daily_jobs() == []
+        assert run_pending() == 1
+        assert Job.query.filter_by(kind='risk_rescore').one().status == 'completed'
+        assert ClientRiskScore.query.filter_by(client_id=client_id).count() == 0
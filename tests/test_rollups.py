@@ -0,0 +1,109 @@
+"""
+HomeCare Management System - Daily Rollup Tests
+Professional Care Coordination Platform
+"""
+
+from datetime import date, timedelta
+import pytest
+from models import db, CareAction, CareActionRollup, CareTask, Client, ScheduledTask, ScheduledTaskRollup
+from services.rollups import KEY_ATTRIBUTES, ROLLUP_SOURCES, rebuild_rollups, record_rows
+
+DAY = date(2026, 3, 2)
+
+def rollup_counts(source_model):
+    """Counts held in a source model's rollup table, by key"""
+    rollup_model = ROLLUP_SOURCES[source_model][0]
+    rows = db.session.execute(db.select(rollup_model.rollup_date, *[getattr(rollup_model, name)
+                                                                    for name in KEY_ATTRIBUTES],
+                                        rollup_model.row_count)).all()
+    assert all(row[-1] > 0 for row in rows), 'empty rollup rows were kept'
+    return {tuple(row[:-1]): row[-1] for row in rows}
+
+def grouped_counts(source_model):
+    """The same counts by GROUP BY over the source rows"""
+    date_column = getattr(source_model, ROLLUP_SOURCES[source_model][1])
+    columns = [date_column, source_model.client_id] + \
+        [db.func.coalesce(getattr(source_model, name), '') for name in KEY_ATTRIBUTES[1:]]
+    rows = db.session.execute(db.select(*columns, db.func.count()).group_by(*columns)).all()
+    return {tuple(row[:-1]): row[-1] for row in rows}
+
+def assert_rollups_exact():
+    for source_model in ROLLUP_SOURCES:
+        assert rollup_counts(source_model) == grouped_counts(source_model)
+
+@pytest.fixture
+def records(app, user):
+    """Two clients, a care task and a few tasks and actions for them"""
+    with app.app_context():
+        care_task = CareTask(name='Bathing', category='Personal Care')
+        clients = [Client(name='Ada', status='active'), Client(name='Ben', status='active')]
+        db.session.add_all([care_task] + clients)
+        db.session.flush()
+        for offset, client_row in enumerate(clients * 2):
+            db.session.add(ScheduledTask(client_id=client_row.id, assigned_to_id=user, task_id=care_task.id,
+                                         task_name=care_task.name, task_category=care_task.category,
+                                         scheduled_date=DAY + timedelta(days=offset % 2), status='pending'))
+            db.session.add(CareAction(client_id=client_row.id, performed_by_id=user, task_id=care_task.id,
+                                      task_name=care_task.name, task_category=care_task.category,
+                                      action_date=DAY, priority='high' if offset else None))
+        db.session.commit()
+        return {'user': user, 'task': care_task.id, 'clients': [client_row.id for client_row in clients]}
+
+def test_inserts_are_counted(app, records):
+    with app.app_context():
+        assert_rollups_exact()
+        assert sum(rollup_counts(ScheduledTask).values()) == 4
+
+def test_key_changes_move_counts(app, records):
+    with app.app_context():
+        tasks = ScheduledTask.query.order_by(ScheduledTask.id).all()
+        tasks[0].scheduled_date = DAY + timedelta(days=7)
+        tasks[1].status = 'completed'
+        tasks[2].priority = 'urgent'
+        tasks[3].notes = 'No key change'
+        actions = CareAction.query.order_by(CareAction.id).all()
+        actions[0].action_date = DAY - timedelta(days=1)
+        actions[1].priority = None
+        actions[2].client_id = records['clients'][1]
+        db.session.commit()
+        assert_rollups_exact()
+
+        # Moving a row away and back in one flush leaves the counts alone
+        tasks[0].scheduled_date = DAY
+        db.session.flush()
+        tasks[0].scheduled_date = DAY + timedelta(days=7)
+        db.session.commit()
+        assert_rollups_exact()
+
+def test_deletes_remove_emptied_rollup_rows(app, records):
+    with app.app_context():
+        for task in ScheduledTask.query.filter_by(client_id=records['clients'][0]).all():
+            db.session.delete(task)
+        db.session.delete(CareAction.query.order_by(CareAction.id).first())
+        db.session.commit()
+        assert_rollups_exact()
+        assert {key[1] for key in rollup_counts(ScheduledTask)} == {records['clients'][1]}
+
+def test_bulk_writes_apply_recorded_rows(app, records):
+    with app.app_context():
+        row = {'client_id': records['clients'][0], 'assigned_to_id': records['user'], 'task_id': records['task'],
+               'task_name': 'Bathing', 'task_category': 'Personal Care', 'scheduled_date': DAY,
+               'priority': 'normal', 'status': 'pending'}
+        connection = db.session.connection()
+        task_id = connection.execute(ScheduledTask.__table__.insert().values(**row)).inserted_primary_key[0]
+        record_rows(connection, ScheduledTask, [row])
+        db.session.commit()
+        assert_rollups_exact()
+
+        connection = db.session.connection()
+        connection.execute(ScheduledTask.__table__.delete().where(ScheduledTask.__table__.c.id == task_id))
+        record_rows(connection, ScheduledTask, [row], amount=-1)
+        db.session.commit()
+        assert_rollups_exact()
+
+def test_rebuild_matches_incremental_counts(app, records):
+    with app.app_context():
+        before = {source_model: rollup_counts(source_model) for source_model in ROLLUP_SOURCES}
+        rebuild_rollups()
+        db.session.commit()
+        assert {source_model: rollup_counts(source_model) for source_model in ROLLUP_SOURCES} == before
@@ -0,0 +1,43 @@
+"""
+HomeCare Management System - Full-Text Search Tests
+Professional Care Coordination Platform
+"""
+
+import weakref
+from datetime import date
+from models import db, CareAction, CareTask, Client
+import services.search as search
+
+def test_snippet_comes_from_the_matching_field(app):
+    with app.app_context():
+        db.session.add_all([Client(name='Margaret Hale', status='active'),
+                            Client(name='Tom Reed', status='active', special_instructions='Uses a walker indoors')])
+        db.session.commit()
+        by_name = search.search('margaret')
+        by_details = search.search('walker')
+    assert [result['title'] for result in by_name] == ['Margaret Hale']
+    assert str(by_name[0]['snippet']) == '<mark>Margaret</mark> Hale'
+    assert [result['title'] for result in by_details] == ['Tom Reed']
+    assert str(by_details[0]['snippet']) == 'Uses a <mark>walker</mark> indoors'
+
+def test_writes_and_search_work_without_the_index(app, user, monkeypatch):
+    with app.app_context():
+        db.session.execute(db.text('DROP TABLE search_index'))
+        db.session.commit()
+        monkeypatch.setattr(search, '_indexed_engines', weakref.WeakSet())
+        client = Client(name='Margaret Hale', status='active')
+        care_task = CareTask(name='Bathing', category='Personal Care')
+        db.session.add_all([client, care_task])
+        db.session.flush()
+        db.session.add(CareAction(client_id=client.id, performed_by_id=user, task_id=care_task.id, task_name='Bathing',
+                                  action_date=date.today(), notes='Skin check done'))
+        db.session.commit()
+        assert [result['title'] for result in search.search('margaret')] == ['Margaret Hale']
+
+        assert search.rebuild_search_index() == 2
+        db.session.commit()
+        client.name = 'Margaret North'
+        db.session.commit()
+        results = search.search('north')
+    assert [(result['doc_type'], result['title']) for result in results] == [('client', 'Margaret North')]
+    assert results[0]['rank'] > 0
@@ -0,0 +1,11 @@
+"""
+HomeCare Management System - WSGI Entry Point
+Professional Care Coordination Platform
+
+Serve with: gunicorn wsgi:app -c gunicorn.conf.py
+"""
+
+import os
+from app import create_app
+
+app = create_app(os.environ.get('FLASK_CONFIG', 'production'))